@@ -0,0 +1,91 @@
+from typing import Dict, Any, List
+from datetime import datetime, timedelta
+import random
+
+CARRIERS = ['InPost', 'DPD', 'DHL', 'Poczta Polska', 'GLS']
+CITIES = ['Warszawa', 'Kraków', 'Gdańsk', 'Poznań', 'Wrocław', 'Łódź']
+WORDS = ['etui', 'kabel', 'ładowarka', 'słuchawki', 'lampka', 'kubek', 'plecak', 'torba', 'zegarek', 'pasek', 'uchwyt', 'podkładka']
+BUYER_LINES = [
+    'Kiedy wyślecie paczkę?',
+    'Produkt przyszedł uszkodzony, reklamacja pilne',
+    'Czy jest możliwość faktury VAT?',
+    'Dziękuję, wszystko w porządku',
+    'Nie dostałem jeszcze przesyłki, proszę o numer śledzenia',
+    'Czy mogę zwrócić towar?',
+]
+
+
+def products(n: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """Synthetic catalogue: prices, costs, lead times and a short sales history per SKU."""
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1)
+    out = []
+    for i in range(n):
+        cost = round(rng.uniform(5, 300), 2)
+        price = round(cost * rng.uniform(1.05, 2.2), 2)
+        history = [{'date': (base + timedelta(days=d)).isoformat(), 'qty': rng.randint(0, 6)} for d in sorted(rng.sample(range(90), 5))]
+        out.append({
+            'id': f'P{i}',
+            'sku': f'SKU-{i:06d}',
+            'name': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+            'price': price,
+            'cost': cost,
+            'min_price': round(cost * 1.1, 2),
+            'packaging_cost': 1.5,
+            'shipping_cost': round(rng.uniform(0, 15), 2),
+            'marketplace_fee_pct': 0.15,
+            'our_lead_time_days': rng.choice([1, 1, 2, 3]),
+            'our_rating': round(rng.uniform(4.2, 5.0), 2),
+            'lead_time_days': rng.choice([7, 14, 21]),
+            'stock': rng.randint(0, 120),
+            'sales_history': history,
+        })
+    return out
+
+
+def competitors(product: Dict[str, Any], rng: random.Random, k: int = 3) -> List[Dict[str, Any]]:
+    price = float(product['price'])
+    return [{'seller': f'S{j}', 'price': round(price * rng.uniform(0.85, 1.15), 2), 'lead_time_days': rng.choice([1, 2, 3, 5, 7]),
+             'rating': round(rng.uniform(4.0, 5.0), 2)} for j in range(k)]
+
+
+def offers(catalog: List[Dict[str, Any]], seed: int = 2) -> List[Dict[str, Any]]:
+    """One buyer offer per product, 60-105% of list price."""
+    rng = random.Random(seed)
+    return [{'offer_id': f'O{i}', 'product': p, 'client_offer': round(p['price'] * rng.uniform(0.6, 1.05), 2),
+             'customer_history': {'orders': rng.randint(0, 5), 'rating': round(rng.uniform(4.0, 5.0), 2)},
+             'inventory_count': p['stock']} for i, p in enumerate(catalog)]
+
+
+def orders(catalog: List[Dict[str, Any]], n: int = None, seed: int = 3) -> List[Dict[str, Any]]:
+    """Orders of 1-3 catalogue items shipped to Polish cities."""
+    rng = random.Random(seed)
+    n = len(catalog) if n is None else n
+    out = []
+    for i in range(n):
+        items = []
+        for p in rng.sample(catalog, min(len(catalog), rng.randint(1, 3))):
+            items.append({'id': p['id'], 'sku': p['sku'], 'product_name': p['name'], 'qty': rng.randint(1, 3), 'price': p['price'],
+                          'cost': p['cost'], 'location': f"{rng.choice('ABCDEF')}/{rng.randint(1, 40)}/{rng.randint(1, 6)}",
+                          'sales_history': p['sales_history'], 'lead_time_days': p['lead_time_days']})
+        out.append({
+            'order_id': f'B{i}',
+            'items': items,
+            'total_price': round(sum(it['price'] * it['qty'] for it in items), 2),
+            'shipping_cost': round(rng.uniform(0, 15), 2),
+            'preferred_carrier': rng.choice(CARRIERS),
+            'shipping_to': {'city': rng.choice(CITIES), 'country': 'PL'},
+            'weight_kg': round(rng.uniform(0.1, 10), 2),
+            'lang': 'pl',
+        })
+    return out
+
+
+def discussions(n: int, seed: int = 4) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    base = datetime(2026, 3, 1)
+    out = []
+    for i in range(n):
+        msgs = [{'from': 'buyer', 'text': rng.choice(BUYER_LINES), 'ts': (base + timedelta(minutes=i + j)).isoformat()} for j in range(rng.randint(1, 3))]
+        out.append({'id': f'D{i}', 'order_id': f'B{i}', 'messages': msgs, 'buyer_history': {'orders': rng.randint(0, 10)}})
+    return out
@@ -0,0 +1,86 @@
+from typing import Dict, Any, List
+import argparse
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+
+from benchmarks import catalog
+from benchmarks.fake_backend import fake_backend
+from benchmarks.run import _percentile
+from modules.ai import base
+from modules.ai.guard import ProviderGuard
+
+# healthy -> provider outage (every call hangs for the timeout, then fails) -> provider back
+PHASES = (('healthy', 0.0), ('outage', 1.0), ('recovery', 0.0))
+
+
+def run(guarded: bool, phase_s: float, threads: int, latency_ms: float, timeout_ms: float, open_s: float) -> Dict[str, Any]:
+    from modules.orders.workflow_engine import process_order_flow
+    guard = ProviderGuard(rate=0, min_calls=10, window=20, open_s=open_s, probes=3, slow_call_s=timeout_ms / 1000.0)
+    prev = base.GUARD, base.GUARD_ENABLED
+    base.GUARD, base.GUARD_ENABLED = guard, guarded
+    cat = catalog.products(1000)
+    orders = catalog.orders(cat)
+    seq = itertools.count()
+    phases: List[Dict[str, Any]] = []
+    try:
+        with fake_backend(latency_ms=latency_ms) as backend:
+            for phase, error_rate in PHASES:
+                backend.error_rate = error_rate
+                backend.latency_ms = timeout_ms if error_rate else latency_ms
+                backend.reset()
+                latencies: List[float] = []
+                lock = threading.Lock()
+                deadline = time.perf_counter() + phase_s
+
+                def worker():
+                    while time.perf_counter() < deadline:
+                        i = next(seq)
+                        # fresh order ids: repeats would be served from the idempotency cache
+                        order = {**orders[i % len(orders)], 'order_id': f'CHAOS-{i}'}
+                        t0 = time.perf_counter()
+                        process_order_flow(order)
+                        with lock:
+                            latencies.append(time.perf_counter() - t0)
+
+                pool = [threading.Thread(target=worker) for _ in range(threads)]
+                for th in pool:
+                    th.start()
+                for th in pool:
+                    th.join()
+                latencies.sort()
+                st = guard.status()
+                phases.append({'phase': phase, 'orders': len(latencies),
+                               'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+                               'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+                               'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                               'provider_calls': backend.stats()['calls'],
+                               'breakers': {m: {k: b[k] for k in ('state', 'opened', 'probes', 'shed')} for m, b in st['breakers'].items()}})
+    finally:
+        base.GUARD, base.GUARD_ENABLED = prev
+    return {'guarded': guarded, 'phases': phases, 'shed': guard.status()['shed'] if guarded else {}}
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.chaos [--phase-s 5] [--threads 8] [--latency-ms 20] [--timeout-ms 500] [--open-s 1]
+    parser = argparse.ArgumentParser(description='Order flow latency through a model provider outage, with and without the circuit breaker')
+    parser.add_argument('--phase-s', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--timeout-ms', type=float, default=500)
+    parser.add_argument('--open-s', type=float, default=1)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    # breaker transitions and per-call fallbacks are logged at WARNING; keep the output to the report
+    logging.disable(logging.WARNING)
+    results = [run(g, args.phase_s, args.threads, args.latency_ms, args.timeout_ms, args.open_s) for g in (False, True)]
+    text = json.dumps({'phase_s': args.phase_s, 'threads': args.threads, 'latency_ms': args.latency_ms,
+                       'timeout_ms': args.timeout_ms, 'open_s': args.open_s, 'results': results}, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text, file=sys.stdout)
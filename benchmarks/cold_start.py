@@ -0,0 +1,86 @@
+from typing import Dict, Any, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fresh interpreter per run, import timed in-process
+_PROBE = ("import sys, time; t = time.perf_counter(); import {target}; print('IMPORT_MS', (time.perf_counter() - t) * 1000); "
+          "print('APP_MODULES', ' '.join(sorted(m for m in sys.modules if m.startswith('modules.'))))")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of `python -X importtime` output: {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue
+        raw = parts[2]
+        name = raw.strip()
+        depth = (len(raw) - len(raw.lstrip(' ')) - 1) // 2
+        rows.append({'module': name, 'self_us': self_us, 'cumulative_us': cumulative, 'depth': depth})
+    return rows
+
+
+def by_package(rows: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Self time (ms) summed per top-level package; `modules.*` is split per subsystem."""
+    out: Dict[str, float] = {}
+    for r in rows:
+        parts = r['module'].split('.')
+        key = '.'.join(parts[:2]) if parts[0] == 'modules' and len(parts) > 1 else parts[0]
+        out[key] = out.get(key, 0.0) + r['self_us'] / 1000.0
+    return dict(sorted(((k, round(v, 2)) for k, v in out.items()), key=lambda kv: -kv[1]))
+
+
+def profile(target: str = 'main', runs: int = 5, top: int = 15) -> Dict[str, Any]:
+    wall = []
+    # timed runs without -X importtime (it adds its own overhead), then one run for the breakdown
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-c', _PROBE.format(target=target)], capture_output=True, text=True, cwd=ROOT)
+        if proc.returncode != 0:
+            return {'target': target, 'ok': False, 'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}
+        wall.extend(float(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith('IMPORT_MS'))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROBE.format(target=target)], capture_output=True, text=True, cwd=ROOT)
+    rows = parse_importtime(proc.stderr)
+    # from sys.modules: the -X importtime listing misses some modules imported through importlib
+    app_modules = next((line.split()[1:] for line in proc.stdout.splitlines() if line.startswith('APP_MODULES')), [])
+    return {
+        'target': target,
+        'ok': True,
+        'runs': runs,
+        'import_ms_median': round(statistics.median(wall), 2),
+        'import_ms_min': round(min(wall), 2),
+        'modules_loaded': len(rows),
+        'app_modules_loaded': app_modules,
+        'self_ms_by_package': dict(list(by_package(rows).items())[:top]),
+        'slowest_cumulative': [{'module': r['module'], 'cumulative_ms': round(r['cumulative_us'] / 1000.0, 2)}
+                               for r in sorted(rows, key=lambda r: -r['cumulative_us'])[:top]],
+    }
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.cold_start [--targets main,api.main] [--runs 5] [--out cold_start.json]
+    parser = argparse.ArgumentParser(description='Cold-start import profile (python -X importtime summary)')
+    parser.add_argument('--targets', default='main,api.main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    report = [profile(t, runs=args.runs, top=args.top) for t in args.targets.split(',') if t]
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,90 @@
+from typing import Dict, Any
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from modules.orders.event_log import EventLog
+
+EVENT_TYPES = ('order.processed', 'shipment.status', 'order.delivered', 'review.requested', 'dispute.opened')
+
+
+def _event(i: int):
+    return EVENT_TYPES[i % len(EVENT_TYPES)], f'E{i // len(EVENT_TYPES)}', {'status': 'in_transit', 'carrier': 'InPost', 'seq': i}
+
+
+def appends(path: str, n: int, threads: int, durable: bool, fsync_ms: float, segment_bytes: int) -> Dict[str, Any]:
+    log = EventLog(path, segment_bytes=segment_bytes, fsync_interval_ms=fsync_ms, snapshot_every=0)
+    per = n // threads
+
+    def worker(t: int):
+        for i in range(t * per, (t + 1) * per):
+            kind, order_id, data = _event(i)
+            log.append(kind, order_id, data, durable=durable)
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    log.flush()
+    elapsed = time.perf_counter() - t0
+    st = log.status()
+    log.close()
+    return {'scenario': f"append_{'durable' if durable else 'buffered'}_{threads}t", 'events': per * threads,
+            'events_per_s': round(per * threads / elapsed), 'fsyncs': st['fsyncs'],
+            'events_per_fsync': round(per * threads / max(st['fsyncs'], 1), 1), 'segments': st['segments'], 'mb': round(st['bytes'] / 1e6, 1)}
+
+
+def reopen(path: str, snapshot: bool) -> Dict[str, Any]:
+    if snapshot:
+        log = EventLog(path, snapshot_every=0)
+        log.snapshot()
+        log.close()
+    t0 = time.perf_counter()
+    log = EventLog(path, snapshot_every=0)
+    elapsed = time.perf_counter() - t0
+    st = log.status()
+    t0 = time.perf_counter()
+    n = log.replay(lambda acc, e: acc + 1, 0)
+    replay_s = time.perf_counter() - t0
+    log.close()
+    return {'scenario': f"reopen_{'snapshot' if snapshot else 'full_replay'}", 'open_ms': round(elapsed * 1000, 1),
+            'replayed_on_open': st['replayed_on_open'], 'orders': st['orders'], 'replay_events_per_s': round(n / replay_s)}
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.event_log [--events 200000] [--threads 1,16,64] [--fsync-ms 5] [--dir /path/on/target/disk]
+    parser = argparse.ArgumentParser(description='Order event log append / replay throughput')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--threads', default='1,16,64')
+    parser.add_argument('--fsync-ms', type=float, default=5)
+    parser.add_argument('--segment-mb', type=int, default=16)
+    parser.add_argument('--dir', default=None)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='event-log-', dir=args.dir)
+    seg = args.segment_mb * 1024 * 1024
+    results = []
+    try:
+        main = os.path.join(root, 'buffered')
+        results.append(appends(main, args.events, 1, False, args.fsync_ms, seg))
+        for t in (int(x) for x in args.threads.split(',')):
+            # durable appends are bounded by fsync latency; fewer events keep the 1-thread run short
+            n = args.events // 10 if t == 1 else args.events
+            results.append(appends(os.path.join(root, f'durable-{t}'), n, t, True, args.fsync_ms, seg))
+        results.append(reopen(main, snapshot=False))
+        results.append(reopen(main, snapshot=True))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    text = json.dumps({'events': args.events, 'fsync_ms': args.fsync_ms, 'results': results}, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text, file=sys.stdout)
@@ -0,0 +1,89 @@
+from typing import Dict, Any, Optional
+from contextlib import contextmanager
+import json
+import random
+import threading
+import time
+
+from modules.ai.base import set_backend
+from modules.ai.prompt_builder import Prompt
+
+# Canned model answers per call site (Prompt.module), shaped like what each caller parses
+CANNED_RESPONSES: Dict[str, Dict[str, Any]] = {
+    'repricing': {'new_price': 99.99, 'reason': 'benchmark', 'actions': ['keep_price'], 'confidence': 0.9},
+    'negotiator': {'decision': 'COUNTER', 'message': 'Możemy zaproponować lepszą cenę.', 'proposed_price': 95.0},
+    'negotiator_message': {'message': 'Dziękujemy za ofertę, proponujemy kompromis.', 'confidence': 0.9},
+    'order_risk': {'risk': False, 'reasons': [], 'severity': 'low', 'action': 'auto', 'confidence': 0.95},
+    'packing_slip': {'packing_list': [], 'note': 'sorted by AI', 'confidence': 0.9},
+    'carrier': {'carrier': 'InPost', 'cost': 12.99, 'lead_time': 1, 'reason': 'benchmark', 'confidence': 0.9},
+    'inventory': {'days_to_depletion': 30, 'risk': 'low', 'predicted_depletion_date': '2030-01-01', 'rationale': 'benchmark'},
+    'discussion': {'priority': 'medium', 'suggested_reply': 'Dziękujemy, sprawdzamy.', 'human_required': False, 'confidence': 0.9},
+    'messaging_analyze': {'sentiment': 'positive', 'intent': 'confirmation', 'urgency': 1, 'entities': {}, 'confidence': 0.9},
+    'messaging_reply': {'reply_text': 'Dziękujemy za zamówienie!', 'action': None, 'human_required': False},
+    'delay_notice': {'notices': [], 'confidence': 0.9},
+    'review_request': {'message': 'Prosimy o opinię.', 'send': True, 'confidence': 0.9},
+    'dispute': {'reply_text': 'Zwracamy środki.', 'suggested_resolution': 'refund', 'human_required': False, 'confidence': 0.9},
+    'seo_optimize': {'title': 'Tytuł', 'html_description': '<p>Opis</p>', 'keywords': ['benchmark']},
+    'seo_clone': {'variations': []},
+}
+
+
+class FakeModelBackend:
+    """Deterministic stand-in for Gemini, installed with modules.ai.base.set_backend().
+
+    latency_ms (+ uniform jitter_ms) is slept per call; error_rate is the share of calls that raise.
+    Errors and jitter come from a seeded RNG, so two runs with the same settings see the same
+    sequence of failures (per thread scheduling, for concurrent callers).
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 42,
+                 responses: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.seed = seed
+        # pre-serialized once: the backend should cost nothing next to the code under test
+        self._texts = {site: json.dumps(body, ensure_ascii=False) for site, body in {**CANNED_RESPONSES, **(responses or {})}.items()}
+        self._default = json.dumps({'ok': True, 'confidence': 0.9})
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.errors = 0
+
+    def __call__(self, prompt: Any, model: str, response_mime_type: str) -> str:
+        call_site = prompt.module if isinstance(prompt, Prompt) else 'other'
+        with self._lock:
+            self.calls[call_site] = self.calls.get(call_site, 0) + 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise RuntimeError(f'fake backend error ({call_site})')
+        return self._texts.get(call_site, self._default)
+
+    def reset(self):
+        with self._lock:
+            self._rng = random.Random(self.seed)
+            self.calls = {}
+            self.errors = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'calls': sum(self.calls.values()), 'errors': self.errors, 'by_call_site': dict(self.calls)}
+
+    def config(self) -> Dict[str, Any]:
+        return {'latency_ms': self.latency_ms, 'jitter_ms': self.jitter_ms, 'error_rate': self.error_rate, 'seed': self.seed}
+
+
+@contextmanager
+def fake_backend(**kwargs):
+    """Install a FakeModelBackend for the duration of the block."""
+    backend = FakeModelBackend(**kwargs)
+    previous = set_backend(backend)
+    try:
+        yield backend
+    finally:
+        set_backend(previous)
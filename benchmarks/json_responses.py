@@ -0,0 +1,83 @@
+from typing import Dict, Any, Callable, List
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+
+from benchmarks import catalog
+from benchmarks.fake_backend import fake_backend
+from modules.api import responses
+
+
+def dashboard(n: int, sample: int = 1000) -> List[Dict[str, Any]]:
+    """n dashboard summaries shaped like the real ones: `sample` orders go through the workflow,
+    the rest are copies of those with their own order ids."""
+    from modules.orders.order_manager import _process_order
+    cat = catalog.products(max(sample, 10))
+    real = [_process_order(o) for o in catalog.orders(cat, min(n, sample))]
+    return [{**real[i % len(real)], 'order_id': f'B{i}'} for i in range(n)]
+
+
+def manifests(n: int) -> Dict[str, List[Dict[str, Any]]]:
+    from modules.logistics.print_station import group_print_batch
+    return group_print_batch(catalog.orders(catalog.products(1000), n))
+
+
+def _stdlib(payload: Any) -> bytes:
+    # FastAPI's default path: jsonable_encoder, then JSONResponse.render
+    from fastapi.encoders import jsonable_encoder
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def _time(fn: Callable[[], Any], repeat: int):
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return round(statistics.median(times) * 1000, 2), out
+
+
+def measure(name: str, payload: Any, fields: str, repeat: int = 3) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {'payload': name, 'serializer': 'orjson' if responses.orjson is not None else 'json'}
+    try:
+        rec['stdlib_ms'], body = _time(lambda: _stdlib(payload), repeat)
+        rec['stdlib_bytes'] = len(body)
+    except ImportError:
+        rec['stdlib_ms'] = None  # FastAPI not installed
+    rec['fast_ms'], body = _time(lambda: responses.dumps(payload), repeat)
+    rec['fast_bytes'] = len(body)
+    rec['projected_ms'], projected = _time(lambda: responses.dumps({'ok': True, 'records': responses.project_records(payload, fields)}), repeat)
+    rec['projected_fields'] = fields
+    rec['projected_bytes'] = len(projected)
+    rec['gzip_ms'], gz = _time(lambda: responses.compress(body, 'gzip'), repeat)
+    rec['gzip_bytes'] = len(gz)
+    if responses.brotli is not None:
+        rec['brotli_ms'], br = _time(lambda: responses.compress(body, 'br'), repeat)
+        rec['brotli_bytes'] = len(br)
+    if rec.get('stdlib_ms'):
+        rec['speedup'] = round(rec['stdlib_ms'] / rec['fast_ms'], 1)
+    return rec
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.json_responses [--orders 50000] [--repeat 3] [--out json_responses.json]
+    parser = argparse.ArgumentParser(description='Serialization time and response size for large payloads')
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    with fake_backend():
+        results = [
+            measure('orders_dashboard', dashboard(args.orders), 'order_id,total_price,intelligence_status', args.repeat),
+            measure('print_batch_manifests', manifests(args.orders), 'label,packing_slip.order_id', args.repeat),
+        ]
+    text = json.dumps({'orders': args.orders, 'results': results}, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text, file=sys.stdout)
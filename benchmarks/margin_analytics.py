@@ -0,0 +1,79 @@
+from typing import Dict, Any, List
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks import catalog
+from modules.finance import margin_analytics
+from modules.finance.margin_analytics import MarginAnalytics
+
+
+def load(n: int, skus: int = 2000, days: int = 90, seed: int = 5) -> MarginAnalytics:
+    cat = catalog.products(skus)
+    rng = random.Random(seed)
+    now = time.time()
+    analytics = MarginAnalytics()
+    for o in catalog.orders(cat, n, seed=seed):
+        o['created_at'] = now - rng.uniform(0, days * 86400)
+        analytics.record(o, {'steps': {'logistics': {'result': {'carrier': {'carrier_name': o['preferred_carrier']}}}}})
+    return analytics
+
+
+def scan_by_sku(analytics: MarginAnalytics, days: int) -> Dict[int, float]:
+    # what answering "margin by SKU, last N days" costs without rollups: one pass over every line
+    f = analytics.facts
+    since = time.time() - days * 86400
+    profit: Dict[int, float] = {}
+    for i in range(len(f['ts'])):
+        if f['ts'][i] >= since:
+            p = f['revenue'][i] - f['product_cost'][i] - f['shipping'][i] - f['fees'][i] - f['ads'][i] - f['packaging'][i]
+            profit[f['sku'][i]] = profit.get(f['sku'][i], 0.0) + p
+    return profit
+
+
+def _ms(fn, repeat: int = 5) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3)
+
+
+def run(n: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    analytics = load(n)
+    ingest_s = time.perf_counter() - t0
+    out: Dict[str, Any] = {'orders': n, 'ingest_orders_per_s': round(n / ingest_s), **analytics.status()}
+    queries: List[Dict[str, Any]] = []
+    for by, days in (('sku', 30), ('carrier', 7), ('day', 30), ('hour', 1), ('sku', None)):
+        queries.append({'by': by, 'days': days, 'ms': _ms(lambda: analytics.query(by, days=days))})
+    queries.append({'by': 'sku', 'days': 30, 'ms': _ms(lambda: scan_by_sku(analytics, 30), repeat=1), 'note': 'full scan, no rollups'})
+    out['queries'] = queries
+    change = {'sku_costs': {f'SKU-{i:06d}': 1.0 for i in range(0, 2000, 7)}, 'fee_pct': 0.12, 'carrier_shipping': {'DHL': 18.0}}
+    out['recompute'] = [analytics.recompute(**change)]
+    if margin_analytics._load_numpy() is not None:
+        margin_analytics._NP = False
+        try:
+            out['recompute'].append(analytics.recompute(**change))
+        finally:
+            margin_analytics._NP = None
+    return out
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.margin_analytics [--orders 10000,100000] [--out margin_analytics.json]
+    parser = argparse.ArgumentParser(description='Margin rollup ingest, query and recompute cost')
+    parser.add_argument('--orders', default='10000,100000')
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    results = [run(int(n)) for n in args.orders.split(',')]
+    text = json.dumps({'results': results}, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text, file=sys.stdout)
@@ -0,0 +1,95 @@
+from typing import Dict, Any, Callable, List
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import catalog
+from benchmarks.fake_backend import fake_backend
+from modules.orders.order_store import OrderStore, ColdStore
+
+
+def sample_summaries(n: int) -> List[bytes]:
+    """JSON of `n` real order summaries (workflow run against the fake backend)."""
+    from modules.orders.order_manager import _process_order
+    cat = catalog.products(max(n, 10))
+    return [json.dumps(_process_order(o), default=str).encode('utf-8') for o in catalog.orders(cat, n)]
+
+
+def _summaries(blobs: List[bytes], n: int):
+    # decoded separately so no two orders share nested objects, as in a live worker
+    for i in range(n):
+        s = json.loads(blobs[i % len(blobs)])
+        s['order_id'] = f'M{i}'
+        yield s
+
+
+def _legacy(blobs: List[bytes], n: int):
+    store: Dict[str, Dict[str, Any]] = {}
+    for s in _summaries(blobs, n):
+        store[s['order_id']] = s
+    return store
+
+
+def _compact(cold: ColdStore) -> Callable[[List[bytes], int], OrderStore]:
+    def build(blobs: List[bytes], n: int) -> OrderStore:
+        store = OrderStore(cold)
+        for s in _summaries(blobs, n):
+            store.put(s)
+        return store
+    return build
+
+
+def measure(name: str, build: Callable[[List[bytes], int], Any], blobs: List[bytes], n: int) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    store = build(blobs, n)
+    build_s = time.perf_counter() - t0
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    rec = {'store': name, 'orders': n, 'retained_mb': round(retained / 1e6, 2), 'bytes_per_order': round(retained / n),
+           'puts_per_s': round(n / build_s)}
+    t0 = time.perf_counter()
+    rows = store.rows() if isinstance(store, OrderStore) else list(store.values())
+    rec['dashboard_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+    if isinstance(store, OrderStore):
+        t0 = time.perf_counter()
+        for i in range(0, n, max(1, n // 1000)):
+            store.detail(f'M{i}')
+        rec['detail_us'] = round((time.perf_counter() - t0) * 1e6 / len(range(0, n, max(1, n // 1000))), 1)
+        rec['cold_mb'] = round(store.cold.stats()['bytes'] / 1e6, 2)
+    del rows, store
+    return rec
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.order_memory [--orders 100000] [--sample 500] [--out order_memory.json]
+    parser = argparse.ArgumentParser(description='Resident memory of the processed-order store')
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--sample', type=int, default=500)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    with fake_backend():
+        blobs = sample_summaries(args.sample)
+    results = [measure('legacy_dict', _legacy, blobs, args.orders),
+               measure('compact_memory_cold', _compact(ColdStore(path=None)), blobs, args.orders)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = ColdStore(path=os.path.join(tmp, 'orders.cold'))
+        results.append(measure('compact_file_cold', _compact(cold), blobs, args.orders))
+        cold.close()
+    text = json.dumps({'orders': args.orders, 'avg_summary_json_bytes': round(sum(map(len, blobs)) / len(blobs)), 'results': results}, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text, file=sys.stdout)
@@ -0,0 +1,306 @@
+from typing import Dict, Any, List, Callable, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import catalog
+from benchmarks.fake_backend import fake_backend
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DEFAULT_SIZES = (1000, 10000, 100000)
+BATCH_SIZE = 100
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# --- scenarios -------------------------------------------------------------------
+# Each scenario builds its inputs for a catalogue (`tag` keeps ids unique between the timing and
+# the memory pass, so per-id caches do not turn the second pass into cache hits) and returns
+# (call, inputs, items per call).
+
+def _reprice(cat, tag):
+    from modules.repricing.repricer import compute_new_price
+    rng = random.Random(5)
+    inputs = [(p, catalog.competitors(p, rng)) for p in cat]
+    return (lambda x: compute_new_price(x[0], x[1])), inputs, 1
+
+
+def _negotiate(cat, tag):
+    from modules.negotiator.negotiator import negotiate
+    inputs = catalog.offers(cat)
+    return (lambda o: negotiate(f"{o['offer_id']}-{tag}", o['client_offer'], o['product'], o['customer_history'], o['inventory_count'])), inputs, 1
+
+
+def _order_flow(cat, tag):
+    from modules.orders.workflow_engine import process_order_flow
+    return process_order_flow, catalog.orders(cat), 1
+
+
+def _print_batch(cat, tag):
+    from modules.logistics.print_station import group_print_batch
+    return group_print_batch, _chunks(catalog.orders(cat), BATCH_SIZE), BATCH_SIZE
+
+
+def _restock(cat, tag):
+    from modules.inventory.guard import generate_restock_list
+    return generate_restock_list, _chunks(cat, BATCH_SIZE), BATCH_SIZE
+
+
+def _prioritize(cat, tag):
+    from modules.allegro.quality_monitor import prioritize_discussions
+    return prioritize_discussions, _chunks(catalog.discussions(len(cat)), BATCH_SIZE), BATCH_SIZE
+
+
+_CLIENT: Dict[str, Any] = {}
+
+
+def _api_client():
+    """TestClient for main.app with a valid bearer token; raises when FastAPI/the app cannot load."""
+    if 'client' not in _CLIENT:
+        from fastapi.testclient import TestClient
+        import jwt
+        import main
+        from modules.security.auth import JWT_SECRET, JWT_ALGO
+        token = jwt.encode({'sub': 'benchmark', 'exp': int(time.time()) + 86400}, JWT_SECRET, algorithm=JWT_ALGO)
+        client = TestClient(main.app)
+        client.headers.update({'Authorization': f'Bearer {token}'})
+        _CLIENT['client'] = client
+    return _CLIENT['client']
+
+
+def _post(path: str):
+    client = _api_client()
+
+    def call(body):
+        r = client.post(path, json=body)
+        if r.status_code >= 400:
+            raise RuntimeError(f'{path} -> {r.status_code}')
+        return r
+    return call
+
+
+def _api_reprice(cat, tag):
+    call = _post('/api/reprice')
+    rng = random.Random(5)
+    fields = ('id', 'sku', 'price', 'cost', 'our_lead_time_days', 'our_rating')
+    inputs = [{'product': {k: p[k] for k in fields}, 'competitors': catalog.competitors(p, rng)} for p in cat]
+    return call, inputs, 1
+
+
+def _api_negotiate(cat, tag):
+    call = _post('/api/negotiate')
+    inputs = [{'offer_id': f"{o['offer_id']}-{tag}", 'client_offer': o['client_offer'],
+               'product': {k: o['product'][k] for k in ('id', 'sku', 'price', 'cost', 'min_price')},
+               'customer_history': o['customer_history'], 'inventory_count': o['inventory_count']} for o in catalog.offers(cat)]
+    return call, inputs, 1
+
+
+def _api_orders_process(cat, tag):
+    call = _post('/api/orders/process')
+    # order ids are idempotency keys: a second pass with the same ids would only replay summaries
+    inputs = [{'order': {**o, 'order_id': f"{o['order_id']}-{tag}"}} for o in catalog.orders(cat)]
+    return call, inputs, 1
+
+
+def _api_print_batch(cat, tag):
+    call = _post('/api/logistics/print_batch')
+    return call, [{'orders': c} for c in _chunks(catalog.orders(cat), BATCH_SIZE)], BATCH_SIZE
+
+
+def _api_triage(cat, tag):
+    call = _post('/api/allegro/triage')
+    return call, [{'discussions': c} for c in _chunks(catalog.discussions(len(cat)), BATCH_SIZE)], BATCH_SIZE
+
+
+SCENARIOS: Dict[str, Callable[[List[Dict[str, Any]], str], Tuple[Callable[[Any], Any], List[Any], int]]] = {
+    'compute_new_price': _reprice,
+    'negotiate': _negotiate,
+    'process_order_flow': _order_flow,
+    'group_print_batch': _print_batch,
+    'generate_restock_list': _restock,
+    'prioritize_discussions': _prioritize,
+    'api_reprice': _api_reprice,
+    'api_negotiate': _api_negotiate,
+    'api_orders_process': _api_orders_process,
+    'api_print_batch': _api_print_batch,
+    'api_triage': _api_triage,
+}
+
+
+def _timed_pass(call: Callable[[Any], Any], inputs: List[Any]) -> Tuple[List[float], int, float]:
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for x in inputs:
+        t0 = time.perf_counter()
+        try:
+            call(x)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+    return latencies, errors, time.perf_counter() - start
+
+
+def _memory_pass(call: Callable[[Any], Any], inputs: List[Any]) -> int:
+    """Peak bytes allocated while the scenario runs (inputs are built before tracing starts).
+
+    A separate pass: tracemalloc slows allocation-heavy code several times over.
+    """
+    tracemalloc.start()
+    try:
+        for x in inputs:
+            try:
+                call(x)
+            except Exception:
+                pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_scenario(name: str, cat: List[Dict[str, Any]], backend, memory: bool = True) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {'scenario': name, 'size': len(cat)}
+    try:
+        call, inputs, per_call = SCENARIOS[name](cat, 't')
+    except Exception as e:
+        # e.g. FastAPI (or an app dependency) is not installed for the api_* scenarios
+        rec.update(skipped=True, reason=f'{type(e).__name__}: {e}')
+        return rec
+
+    backend.reset()
+    latencies, errors, elapsed = _timed_pass(call, inputs)
+    latencies.sort()
+    # every scenario processes one catalogue's worth of products/offers/orders/discussions
+    items = len(cat)
+    rec.update({
+        'items': items,
+        'calls': len(inputs),
+        'unit': 'item' if per_call == 1 else f'batch of {per_call}',
+        'seconds': round(elapsed, 4),
+        'throughput_per_s': round(items / elapsed, 2) if elapsed else None,
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 4),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        'errors': errors,
+        'model': backend.stats(),
+    })
+    if memory:
+        _, inputs, _ = SCENARIOS[name](cat, 'm')
+        rec['peak_mem_kb'] = round(_memory_pass(call, inputs) / 1024, 1)
+    return rec
+
+
+def run(sizes=DEFAULT_SIZES, scenarios: List[str] = None, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+        error_rate: float = 0.0, seed: int = 42, memory: bool = True) -> Dict[str, Any]:
+    scenarios = scenarios or list(SCENARIOS)
+    results = []
+    with fake_backend(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, seed=seed) as backend:
+        for size in sizes:
+            cat = catalog.products(size)
+            for name in scenarios:
+                rec = run_scenario(name, cat, backend, memory=memory)
+                results.append(rec)
+                if rec.get('skipped'):
+                    print(f"{name:<24} {size:>7}  skipped ({rec['reason']})", file=sys.stderr)
+                else:
+                    print(f"{name:<24} {size:>7}  {rec['throughput_per_s']:>10.1f}/s  p50 {rec['p50_ms']:.3f}ms  "
+                          f"p99 {rec['p99_ms']:.3f}ms  peak {rec.get('peak_mem_kb', '-')}kB  errors {rec['errors']}", file=sys.stderr)
+        backend_config = backend.config()
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'git_rev': _git_rev(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': backend_config,
+            'sizes': list(sizes),
+            'batch_size': BATCH_SIZE,
+        },
+        'results': results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """Per scenario/size deltas; a row regresses when throughput drops or p99/peak memory grow by more than `threshold`."""
+    before = {(r['scenario'], r['size']): r for r in old.get('results', []) if not r.get('skipped')}
+    rows = []
+    for r in new.get('results', []):
+        b = before.get((r['scenario'], r['size']))
+        if r.get('skipped') or b is None:
+            continue
+        row = {'scenario': r['scenario'], 'size': r['size'], 'regressions': []}
+        for key, higher_is_better in (('throughput_per_s', True), ('p99_ms', False), ('peak_mem_kb', False)):
+            if not b.get(key) or r.get(key) is None:
+                continue
+            change = (r[key] - b[key]) / b[key]
+            row[key] = {'before': b[key], 'after': r[key], 'change_pct': round(change * 100, 1)}
+            if (-change if higher_is_better else change) > threshold:
+                row['regressions'].append(key)
+        rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':
+    # usage: python -m benchmarks.run [--sizes 1000,10000] [--scenarios negotiate,api_reprice]
+    #                                 [--latency-ms 50 --jitter-ms 20 --error-rate 0.05] [--no-memory] [--out results.json]
+    #        python -m benchmarks.run --compare old.json new.json [--threshold 0.1]
+    parser = argparse.ArgumentParser(description='Decision engine benchmarks against a fake model backend')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument('--scenarios', default=None, help='comma-separated subset of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--out', default=None)
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding='utf-8') as f:
+            new = json.load(f)
+        rows = compare(old, new, args.threshold)
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        sys.exit(1 if any(r['regressions'] for r in rows) else 0)
+
+    # failing fake calls make every caller log its fallback; keep the output readable
+    logging.disable(logging.CRITICAL)
+    report = run(sizes=[int(s) for s in args.sizes.split(',') if s],
+                 scenarios=[s for s in args.scenarios.split(',') if s] if args.scenarios else None,
+                 latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed,
+                 memory=not args.no_memory)
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(out)
@@ -1,9 +1,16 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _num(v: Any, default: float) -> float:
+    try:
+        return float(v) if v is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
 def check_and_flag_ads(sku: str, margin: float, threshold: float = 0.05) -> Dict[str, Any]:
     """Check margin and return PAUSE_ADS flag if below threshold."""
     try:
@@ -25,3 +32,30 @@ def evaluate_product_for_ads(product: Dict[str, Any], margin: float, config: Dic
     cfg = config or {}
     threshold = float(cfg.get('min_margin_pct_for_ads', 0.05))
     return check_and_flag_ads(product.get('sku') or product.get('id'), margin, threshold=threshold)
+
+
+def evaluate_products_for_ads(products: List[Dict[str, Any]], margin: float, config: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """Bulk evaluate_product_for_ads: one threshold pass over all products, flagged ones returned.
+
+    Each product is judged on its own `margin` when it carries a usable one, else on the order-level
+    `margin` (the only input evaluate_product_for_ads looked at).
+    """
+    from modules.ads.portfolio import classify, ACTIONS
+    cfg = config or {}
+    threshold = float(cfg.get('min_margin_pct_for_ads', 0.05))
+    try:
+        m = float(margin)
+    except Exception:
+        logger.exception('Invalid margin for ads evaluation')
+        return []
+    margins = [_num(p.get('margin'), m) for p in products]
+    # lower band of 0 collapses the rules to the single pause threshold used by check_and_flag_ads
+    codes = classify(margins, [0.0] * len(products), {'pause_margin_pct': threshold, 'lower_cpc_band_pct': 0, 'boost_margin_pct': float('inf')})
+    out = []
+    for p, pm, code in zip(products, margins, codes):
+        if ACTIONS[code] == 'PAUSE_ADS':
+            sku = p.get('sku') or p.get('id')
+            reason = f'margin_below_threshold ({pm} < {threshold})'
+            logger.info('Flagging PAUSE_ADS for %s: %s', sku, reason)
+            out.append({'ok': True, 'flag': 'PAUSE_ADS', 'sku': sku, 'reason': reason})
+    return out
@@ -0,0 +1,111 @@
+from typing import Dict, Any, List, Optional
+import math
+import time
+
+from modules.finance.calculator import calculate_margin
+from modules.ads.portfolio import classify, ACTIONS
+
+# rule-based spend multipliers used as the baseline the allocation is compared to
+RULE_SPEND_MULTIPLIER = {'PAUSE_ADS': 0.0, 'LOWER_CPC': 0.8, 'BOOST_ADS': 1.2, None: 1.0}
+DEFAULT_MAX_CLICKS = 200.0
+
+
+class SkuCurve:
+    """Expected daily clicks for a spend: clicks(b) = C * (1 - exp(-b / (C * cpc))).
+
+    Slope at zero spend is 1/cpc (the current CPC buys one click); C caps the clicks the
+    listing can get, so each extra złoty buys fewer clicks (rising effective CPC).
+    """
+    __slots__ = ('sku', 'unit_profit', 'conversion_rate', 'cpc', 'max_clicks', 'spend', 'margin')
+
+    def __init__(self, row: Dict[str, Any]):
+        self.sku = str(row.get('sku') or row.get('id'))
+        price = float(row.get('price') or 0)
+        if row.get('margin') is not None:
+            self.margin = float(row['margin'])
+        else:
+            costs = {'cost': float(row.get('cost', 0)), 'packaging': float(row.get('packaging_cost', 0)), 'shipping': float(row.get('shipping_cost', 0))}
+            self.margin = calculate_margin(price, costs, {'fee_pct': float(row.get('marketplace_fee_pct', 0.15))})
+        # profit per sale before ad spend
+        self.unit_profit = self.margin * price
+        self.conversion_rate = float(row.get('conversion_rate') or 0)
+        self.cpc = max(0.01, float(row.get('cpc') or 1.0))
+        self.max_clicks = float(row.get('max_clicks') or DEFAULT_MAX_CLICKS)
+        self.spend = float(row.get('spend') or 0)
+
+    def clicks(self, budget: float) -> float:
+        return self.max_clicks * (1.0 - math.exp(-budget / (self.max_clicks * self.cpc)))
+
+    def profit(self, budget: float) -> float:
+        """Expected daily profit attributable to ads at this spend (ad spend deducted)."""
+        return self.clicks(budget) * self.conversion_rate * self.unit_profit - budget
+
+
+def allocate_budget(rows: List[Dict[str, Any]], daily_budget: float, step: float = None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Split `daily_budget` across SKUs so every funded SKU earns the same marginal profit.
+
+    For a curve, the marginal profit of spend b is r * exp(-b / k) - 1 with r = conv * unit_profit / cpc
+    and k = max_clicks * cpc, so at a common marginal profit mu - 1 a SKU spends k * ln(r / mu)
+    (nothing when r <= mu). Water-filling: SKUs are sorted by r and mu is solved in closed form for
+    each prefix until the prefix spending the whole budget is found, O(n log n) for any budget.
+    The curves are concave, so this is the optimal split. mu never drops below 1: spending stops
+    when no SKU's next złoty adds profit. `step` rounds each SKU's spend down (default 0.01).
+    Returns: { allocation: {sku: spend}, spent, expected_profit, rule_based: {...}, profit_delta, elapsed_ms }
+    """
+    start = time.perf_counter()
+    curves = [SkuCurve(r) for r in rows]
+    budget = max(0.0, float(daily_budget))
+    step = float(step) if step else 0.01
+
+    # (r, k, index) for SKUs whose first złoty pays for itself, best first
+    cands = []
+    for i, c in enumerate(curves):
+        r = c.conversion_rate * c.unit_profit / c.cpc
+        if r > 1.0:
+            cands.append((r, c.max_clicks * c.cpc, i))
+    cands.sort(reverse=True)
+
+    mu = 1.0 if budget > 0 else math.inf
+    if budget > 0:
+        k_sum = log_sum = 0.0
+        for j, (r, k, _) in enumerate(cands):
+            k_sum += k
+            log_sum += k * math.log(r)
+            m = math.exp((log_sum - budget) / k_sum)   # spends the budget exactly with the top j+1 SKUs funded
+            nxt = cands[j + 1][0] if j + 1 < len(cands) else 1.0
+            if m >= nxt:
+                mu = m
+                break
+
+    spend = [0.0] * len(curves)
+    for r, k, i in cands:
+        if r > mu:
+            # the epsilon keeps exact multiples (e.g. an even split) from rounding down a whole step
+            spend[i] = math.floor(k * math.log(r / mu) / step + 1e-6) * step
+    spent = sum(spend)
+
+    allocation = {c.sku: round(s, 2) for c, s in zip(curves, spend) if s > 0}
+    expected = sum(c.profit(s) for c, s in zip(curves, spend))
+
+    # baseline: the threshold rules applied to today's spend
+    codes = classify([c.margin for c in curves], [c.conversion_rate for c in curves], config)
+    rule_spend = [c.spend * RULE_SPEND_MULTIPLIER[ACTIONS[code]] for c, code in zip(curves, codes)]
+    rule_total = sum(rule_spend)
+    scaled = rule_total > budget
+    if scaled:
+        # the rules must live within the same fixed budget to be comparable
+        rule_spend = [s * budget / rule_total for s in rule_spend]
+    rule_profit = sum(c.profit(s) for c, s in zip(curves, rule_spend))
+
+    return {
+        'skus': len(curves),
+        'allocation': allocation,
+        'budget': budget,
+        'spent': round(spent, 2),
+        'step': step,
+        'marginal_profit': round(mu - 1.0, 4) if spent > 0 else None,
+        'expected_profit': round(expected, 2),
+        'rule_based': {'spent': round(sum(rule_spend), 2), 'scaled_to_budget': scaled, 'expected_profit': round(rule_profit, 2)},
+        'profit_delta': round(expected - rule_profit, 2),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
@@ -0,0 +1,142 @@
+from typing import Dict, Any, List, Optional, Sequence
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except Exception:  # optional: pure-python path below
+    np = None
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = os.environ.get('ADS_PORTFOLIO_STATE_PATH')
+
+# same thresholds as adjust_ads_based_on_margin, applied to whole columns
+ACTIONS = (None, 'PAUSE_ADS', 'LOWER_CPC', 'BOOST_ADS')
+_NONE, _PAUSE, _LOWER, _BOOST = range(4)
+
+
+def _thresholds(config: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    cfg = config or {}
+    pause = float(cfg.get('pause_margin_pct', 0.07))
+    return {
+        'pause': pause,
+        'lower': pause + float(cfg.get('lower_cpc_band_pct', 0.05)),
+        'boost': float(cfg.get('boost_margin_pct', 0.20)),
+        'boost_conv': float(cfg.get('boost_min_conversion', 0.02)),
+    }
+
+
+def to_columns(rows: Sequence[Dict[str, Any]]) -> Dict[str, list]:
+    """[{sku, margin, conversion_rate, spend}] -> column lists (missing numbers become 0)."""
+    return {
+        'sku': [str(r.get('sku') or r.get('id')) for r in rows],
+        'margin': [float(r.get('margin') or 0) for r in rows],
+        'conversion_rate': [float(r.get('conversion_rate') or 0) for r in rows],
+        'spend': [float(r.get('spend') or 0) for r in rows],
+    }
+
+
+def classify(margin: Sequence[float], conversion_rate: Sequence[float], config: Optional[Dict[str, Any]] = None) -> List[int]:
+    """Action codes (index into ACTIONS) for whole margin/conversion columns."""
+    t = _thresholds(config)
+    if np is not None:
+        m = np.asarray(margin, dtype=np.float64)
+        c = np.asarray(conversion_rate, dtype=np.float64)
+        codes = np.select(
+            [m < t['pause'], m < t['lower'], (m >= t['boost']) & (c >= t['boost_conv'])],
+            [_PAUSE, _LOWER, _BOOST],
+            default=_NONE,
+        )
+        return codes.tolist()
+    pause, lower, boost, boost_conv = t['pause'], t['lower'], t['boost'], t['boost_conv']
+    return [_PAUSE if m < pause else _LOWER if m < lower else _BOOST if (m >= boost and c >= boost_conv) else _NONE
+            for m, c in zip(margin, conversion_rate)]
+
+
+class AdsPortfolio:
+    """Portfolio-wide ad decisions that report only what changed since the previous run.
+
+    The last action per SKU is kept in memory and, with ADS_PORTFOLIO_STATE_PATH, persisted as
+    JSON so a nightly pass diffs against the previous night. SKUs missing from a run keep their
+    previous action.
+    """
+
+    def __init__(self, path: Optional[str] = STATE_PATH):
+        self.path = path
+        self._last: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._last = json.load(f)
+            except Exception:
+                logger.exception('Failed to load ads portfolio state')
+
+    def run(self, skus: Any, config: Optional[Dict[str, Any]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """skus: [{sku, margin, conversion_rate, spend}] or the same as column lists.
+
+        Returns: { evaluated, changes: [{sku, action, previous, margin, conversion_rate, spend}], counts, spend_by_action, elapsed_ms }
+        """
+        start = time.perf_counter()
+        cols = skus if isinstance(skus, dict) else to_columns(skus)
+        ids, margin, conv = cols['sku'], cols['margin'], cols['conversion_rate']
+        spend = cols.get('spend') or [0.0] * len(ids)
+        codes = classify(margin, conv, config)
+
+        counts = [0, 0, 0, 0]
+        spend_by = [0.0, 0.0, 0.0, 0.0]
+        changes = []
+        with self._lock:
+            last = self._last
+            for i, code in enumerate(codes):
+                counts[code] += 1
+                spend_by[code] += spend[i]
+                sku = ids[i]
+                action = ACTIONS[code]
+                previous = last.get(sku)
+                if action != previous:
+                    changes.append({'sku': sku, 'action': action, 'previous': previous, 'margin': margin[i],
+                                    'conversion_rate': conv[i], 'spend': spend[i]})
+            if not dry_run:
+                for ch in changes:
+                    if ch['action'] is None:
+                        last.pop(ch['sku'], None)
+                    else:
+                        last[ch['sku']] = ch['action']
+                self._persist()
+
+        out = {
+            'evaluated': len(codes),
+            'changes': changes,
+            'counts': {str(ACTIONS[i]): counts[i] for i in range(4)},
+            'spend_by_action': {str(ACTIONS[i]): round(spend_by[i], 2) for i in range(4)},
+            'vectorized': np is not None,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+        if not dry_run:
+            self.last_run = {k: v for k, v in out.items() if k != 'changes'}
+        return out
+
+    def current(self) -> Dict[str, Optional[str]]:
+        """SKU -> active action (SKUs without an action are omitted)."""
+        with self._lock:
+            return dict(self._last)
+
+    def _persist(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._last, f)
+            os.replace(tmp, self.path)
+        except Exception:
+            logger.exception('Failed to persist ads portfolio state')
+
+
+PORTFOLIO = AdsPortfolio()
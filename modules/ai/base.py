@@ -1,25 +1,223 @@
 import os
 import json
+import bisect
 import logging
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Union, Optional, Callable
 import socket
 
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+from modules.ai.prompt_builder import Prompt, as_prompt_text, cached_prefix_content, drop_prefix_content, mark_prefix_cached, estimate_tokens
+from modules.ai.guard import GUARD, GUARD_ENABLED
+from modules.observability.tracing import span
+
+_GENAI: Any = None  # google.generativeai, imported on the first real model call (False = not installed)
+
+
+def _load_genai() -> Any:
+    global _GENAI
+    if _GENAI is None:
+        try:
+            import google.generativeai as genai
+        except Exception:
+            genai = False
+        _GENAI = genai
+    return _GENAI or None
 
 logger = logging.getLogger(__name__)
 
+# Per-call-site instrumentation; AI_METRICS=0 skips all timing and bookkeeping in generate().
+METRICS_ENABLED = os.environ.get('AI_METRICS', '1') == '1'
+LATENCY_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _SiteStats:
+    __slots__ = ('buckets', 'count', 'latency_sum', 'errors', 'fallbacks', 'cache_hits', 'prompt_chars', 'response_chars',
+                 'prompt_tokens', 'response_tokens', 'cached_tokens')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        self.count = self.errors = self.fallbacks = self.cache_hits = 0
+        self.prompt_chars = self.response_chars = self.prompt_tokens = self.response_tokens = self.cached_tokens = 0
+        self.latency_sum = 0.0
+
+
+class CallMetrics:
+    """Latency histogram, sizes, token usage, errors/fallbacks and prefix-cache hits per call site.
+
+    The call site is the prompt module (Prompt.module: repricing, negotiator, seo_optimize, ...);
+    raw str/dict prompts are reported as 'other'.
+    """
+
+    def __init__(self):
+        self._sites: Dict[str, _SiteStats] = {}
+        self._lock = threading.Lock()
+
+    def _site(self, call_site: str) -> _SiteStats:
+        st = self._sites.get(call_site)
+        if st is None:
+            st = self._sites.setdefault(call_site, _SiteStats())
+        return st
+
+    def observe(self, call_site: str, elapsed: float, ok: bool, info: Dict[str, Any]):
+        with self._lock:
+            st = self._site(call_site)
+            st.buckets[bisect.bisect_left(LATENCY_BUCKETS_S, elapsed)] += 1
+            st.count += 1
+            st.latency_sum += elapsed
+            st.errors += not ok
+            st.cache_hits += bool(info.get('cache_hit'))
+            st.prompt_chars += info.get('prompt_chars', 0)
+            st.response_chars += info.get('response_chars', 0)
+            st.prompt_tokens += info.get('prompt_tokens', 0)
+            st.response_tokens += info.get('response_tokens', 0)
+            st.cached_tokens += info.get('cached_tokens', 0)
+
+    def record_fallback(self, call_site: str):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._site(call_site).fallbacks += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for site, st in self._sites.items():
+                out[site] = {
+                    'calls': st.count,
+                    'errors': st.errors,
+                    'fallbacks': st.fallbacks,
+                    'error_rate': st.errors / st.count if st.count else 0.0,
+                    'cache_hits': st.cache_hits,
+                    'latency_avg_s': st.latency_sum / st.count if st.count else 0.0,
+                    'prompt_chars': st.prompt_chars,
+                    'response_chars': st.response_chars,
+                    'prompt_tokens': st.prompt_tokens,
+                    'response_tokens': st.response_tokens,
+                    'cached_tokens': st.cached_tokens,
+                }
+            return out
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        counters = (
+            ('ai_call_errors_total', 'errors', 'Model calls that returned ok=false.'),
+            ('ai_call_fallbacks_total', 'fallbacks', 'Callers that fell back to a non-model answer.'),
+            ('ai_prefix_cache_hits_total', 'cache_hits', 'Calls served with a provider-cached prompt prefix.'),
+            ('ai_prompt_chars_total', 'prompt_chars', 'Prompt size in characters.'),
+            ('ai_response_chars_total', 'response_chars', 'Response size in characters.'),
+            ('ai_prompt_tokens_total', 'prompt_tokens', 'Prompt tokens (provider usage, else estimated).'),
+            ('ai_response_tokens_total', 'response_tokens', 'Response tokens (provider usage, else estimated).'),
+            ('ai_cached_tokens_total', 'cached_tokens', 'Prompt tokens served from the provider cache.'),
+        )
+        lines = ['# HELP ai_call_latency_seconds Model call latency by call site.', '# TYPE ai_call_latency_seconds histogram']
+        with self._lock:
+            sites = sorted(self._sites.items())
+            for site, st in sites:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS_S + (float('inf'),), st.buckets):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'ai_call_latency_seconds_bucket{{call_site="{site}",le="{le}"}} {cumulative}')
+                lines.append(f'ai_call_latency_seconds_sum{{call_site="{site}"}} {st.latency_sum}')
+                lines.append(f'ai_call_latency_seconds_count{{call_site="{site}"}} {st.count}')
+            for name, attr, help_text in counters:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for site, st in sites:
+                    lines.append(f'{name}{{call_site="{site}"}} {getattr(st, attr)}')
+        return '\n'.join(lines) + '\n'
+
+
+AI_METRICS = CallMetrics()
+
+
+def record_fallback(call_site: str):
+    """Callers report when they answered with a template/heuristic instead of the model."""
+    AI_METRICS.record_fallback(call_site)
+
+
+# Pluggable model backend: callable(prompt, model, response_mime_type) -> response text, raising on
+# failure. None means google.generativeai; benchmarks install a fake one (benchmarks/fake_backend.py).
+_BACKEND: Optional[Callable[[Any, str, str], str]] = None
+
+
+def set_backend(backend: Optional[Callable[[Any, str, str], str]]) -> Optional[Callable[[Any, str, str], str]]:
+    """Route every BaseAIHandler call through `backend` (None restores Gemini). Returns the previous one."""
+    global _BACKEND
+    previous, _BACKEND = _BACKEND, backend
+    return previous
+
+
+def _parse_text(text: Optional[str], response_mime_type: str) -> Any:
+    if response_mime_type == 'application/json' and text:
+        try:
+            return json.loads(text)
+        except Exception:
+            return {'raw': text}
+    return {'raw': text}
+
+
+def _is_not_found(exc: Exception) -> bool:
+    """Provider 404 (google.api_core NotFound or an equivalent message)."""
+    return getattr(exc, 'code', None) == 404 or type(exc).__name__ == 'NotFound' or 'not found' in str(exc).lower()
+
+
+def _usage(response: Any) -> Optional[Dict[str, int]]:
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {
+        'prompt_tokens': int(getattr(usage, 'prompt_token_count', 0) or 0),
+        'response_tokens': int(getattr(usage, 'candidates_token_count', 0) or 0),
+        'cached_tokens': int(getattr(usage, 'cached_content_token_count', 0) or 0),
+    }
+
 
 class BaseAIHandler:
     def __init__(self, model: str = 'models/gemini-3-pro-preview', response_mime_type: str = 'application/json'):
         self.model = model
         self.response_mime_type = response_mime_type
 
-    def generate(self, prompt: str, model: str = None, response_mime_type: str = None) -> Dict[str, Any]:
+    def generate(self, prompt: Union[str, Dict[str, Any], Prompt], model: str = None, response_mime_type: str = None) -> Dict[str, Any]:
+        """Call the model. `prompt` may be text, a dict (sent as canonical JSON) or a compiled Prompt,
+        whose static prefix is served from the provider's context cache when available."""
         model = model or self.model
         response_mime_type = response_mime_type or self.response_mime_type
+        call_site = prompt.module if isinstance(prompt, Prompt) else 'other'
+        with span('ai.generate', call_site=call_site, model=model) as sp:
+            ticket = None
+            if GUARD_ENABLED:
+                # breaker open / over the rate limit: fail fast so the caller takes its fallback
+                ticket, shed = GUARD.admit(model, call_site)
+                if shed:
+                    sp.set(ok=False, shed=shed)
+                    return {'ok': False, 'error': shed, 'shed': True}
+            start = time.perf_counter()
+            if not METRICS_ENABLED:
+                result = self._generate(prompt, model, response_mime_type, None)
+            else:
+                result = self._observed_generate(prompt, model, response_mime_type, call_site)
+            if GUARD_ENABLED:
+                GUARD.record(model, ticket, bool(result.get('ok')), time.perf_counter() - start)
+            sp.set(ok=bool(result.get('ok')))
+            return result
+
+    def _observed_generate(self, prompt: Union[str, Dict[str, Any], Prompt], model: str, response_mime_type: str, call_site: str) -> Dict[str, Any]:
+        info: Dict[str, Any] = {}
+        start = time.perf_counter()
+        result = self._generate(prompt, model, response_mime_type, info)
+        elapsed = time.perf_counter() - start
+        text = as_prompt_text(prompt)
+        info['prompt_chars'] = len(text)
+        if 'prompt_tokens' not in info:
+            info['prompt_tokens'] = estimate_tokens(text)
+            info['response_tokens'] = estimate_tokens(info.get('response_text') or '')
+        info['response_chars'] = len(info.get('response_text') or '')
+        AI_METRICS.observe(call_site, elapsed, bool(result.get('ok')), info)
+        return result
+
+    def _generate(self, prompt: Union[str, Dict[str, Any], Prompt], model: str, response_mime_type: str, info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
 
         # Heartbeat / host check: prevent running AI on unauthorized hosts
         allowed_host = os.environ.get('ALLOWED_HOST')
@@ -33,6 +231,18 @@ class BaseAIHandler:
             except Exception:
                 logger.exception('Host check failed')
 
+        backend = _BACKEND
+        if backend is not None:
+            try:
+                text = backend(prompt, model, response_mime_type)
+            except Exception as e:
+                logger.warning('Model backend failed: %s', e)
+                return {'ok': False, 'error': str(e)}
+            if info is not None:
+                info['response_text'] = text
+            return {'ok': True, 'response': _parse_text(text, response_mime_type)}
+
+        genai = _load_genai()
         if genai is None:
             msg = 'google.generativeai not installed'
             logger.error(msg)
@@ -46,13 +256,33 @@ class BaseAIHandler:
 
         try:
             genai.configure(api_key=api_key)
-            response = genai.generate(model=model, prompt=prompt, response_mime_type=response_mime_type)
+            cached = cached_prefix_content(genai, model, prompt) if isinstance(prompt, Prompt) else None
+            if cached is not None:
+                try:
+                    cached_model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+                    response = cached_model.generate_content(prompt.body, generation_config={'response_mime_type': response_mime_type})
+                    mark_prefix_cached(prompt.module)
+                except Exception as e:
+                    if not _is_not_found(e):
+                        raise
+                    # the provider dropped the cached prefix: forget it and send the full prompt
+                    logger.info('Cached prefix for %s is gone, recreating on next call', prompt.module)
+                    drop_prefix_content(model, prompt)
+                    cached = None
+            if cached is None:
+                response = genai.generate(model=model, prompt=as_prompt_text(prompt), response_mime_type=response_mime_type)
 
             text = None
             if hasattr(response, 'text'):
                 text = response.text
             else:
                 text = getattr(response, 'content', None) or str(response)
+            if info is not None:
+                info['cache_hit'] = cached is not None
+                info['response_text'] = text
+                usage = _usage(response)
+                if usage:
+                    info.update(usage)
 
             parsed = None
             if response_mime_type == 'application/json' and text:
@@ -71,7 +301,7 @@ class BaseAIHandler:
 
             try:
                 if hasattr(response, 'metadata'):
-                    logger.info('Model metadata: %s', getattr(response, 'metadata'))
+                    logger.debug('Model metadata: %s', getattr(response, 'metadata'))
             except Exception:
                 pass
 
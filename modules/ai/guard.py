@@ -0,0 +1,211 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import deque
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Shared admission control in front of the model provider. A shed call returns ok=false at once,
+# so callers take their deterministic fallback instead of waiting for a provider timeout.
+GUARD_ENABLED = os.environ.get('AI_GUARD', '1') == '1'
+RATE_LIMIT_RPS = float(os.environ.get('AI_RATE_LIMIT_RPS', 0))             # 0 = no rate limit
+RATE_LIMIT_BURST = float(os.environ.get('AI_RATE_LIMIT_BURST', 0))         # 0 = one second worth of calls
+RATE_LIMIT_MAX_WAIT_S = float(os.environ.get('AI_RATE_LIMIT_MAX_WAIT_S', 0.25))
+BREAKER_WINDOW = int(os.environ.get('AI_BREAKER_WINDOW', 20))
+BREAKER_MIN_CALLS = int(os.environ.get('AI_BREAKER_MIN_CALLS', 10))
+BREAKER_FAILURE_RATE = float(os.environ.get('AI_BREAKER_FAILURE_RATE', 0.5))
+BREAKER_SLOW_CALL_S = float(os.environ.get('AI_BREAKER_SLOW_CALL_S', 30))  # slower successes count as failures
+BREAKER_OPEN_S = float(os.environ.get('AI_BREAKER_OPEN_S', 30))
+BREAKER_PROBES = int(os.environ.get('AI_BREAKER_PROBES', 3))              # successful probes needed to close
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` per second up to `burst`.
+
+    acquire() reserves the next free token: if it is available within `max_wait` the caller sleeps
+    until then, otherwise nothing is reserved and the call is refused.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float = 0.0) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._ts) * self.rate)
+            self._ts = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return False
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            tokens = min(self.burst, self._tokens + (time.monotonic() - self._ts) * self.rate)
+        return {'rate': self.rate, 'burst': self.burst, 'tokens': round(tokens, 2)}
+
+
+class CircuitBreaker:
+    """Closed -> open when at least `failure_rate` of the last `window` calls (and `min_calls`) failed
+    or took longer than `slow_call_s`. Open sheds every call for `open_s`, then goes half-open:
+    one probe call at a time is let through; `probes` successes close it, any failure reopens it.
+    """
+
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, slow_call_s: float = BREAKER_SLOW_CALL_S,
+                 open_s: float = BREAKER_OPEN_S, probes: int = BREAKER_PROBES):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.open_s = open_s
+        self.probes = probes
+        self.state = CLOSED
+        self._outcomes: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'failures': 0, 'shed': 0, 'opened': 0, 'probes': 0}
+
+    def allow(self) -> Optional[str]:
+        """Admission ticket (the state the call was admitted in), or None when the call is shed."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_s:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return CLOSED
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.stats['probes'] += 1
+                return HALF_OPEN
+            self.stats['shed'] += 1
+            return None
+
+    def cancel(self, ticket: Optional[str]):
+        """Give back an admission that never reached the provider (e.g. refused by the rate limiter)."""
+        if ticket == HALF_OPEN:
+            with self._lock:
+                self._probe_in_flight = False
+
+    def record(self, ticket: Optional[str], ok: bool, elapsed: float):
+        failed = not ok or elapsed >= self.slow_call_s
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['failures'] += failed
+            if ticket == HALF_OPEN:
+                self._probe_in_flight = False
+                if self.state != HALF_OPEN:
+                    return
+                if failed:
+                    self._transition(OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        self._transition(CLOSED)
+                return
+            if self.state != CLOSED:
+                # admitted before the breaker opened; the outcome is stale
+                return
+            self._outcomes.append(failed)
+            n = len(self._outcomes)
+            if n >= self.min_calls and sum(self._outcomes) >= self.failure_rate * n:
+                self._transition(OPEN)
+
+    def _transition(self, state: str):
+        logger.warning('AI circuit %s: %s -> %s', self.name, self.state, state)
+        self.state = state
+        self._probe_successes = 0
+        self._probe_in_flight = False
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats['opened'] += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._outcomes)
+            out = {**self.stats, 'state': self.state, 'window_failure_rate': round(sum(self._outcomes) / n, 3) if n else 0.0}
+            if self.state == OPEN:
+                out['retry_in_s'] = round(max(0.0, self.open_s - (time.monotonic() - self._opened_at)), 2)
+            return out
+
+
+class ProviderGuard:
+    """One shared rate limiter plus a circuit breaker per model, with shed counts per call site."""
+
+    def __init__(self, rate: float = RATE_LIMIT_RPS, burst: float = RATE_LIMIT_BURST, max_wait_s: float = RATE_LIMIT_MAX_WAIT_S,
+                 **breaker_kwargs):
+        self.limiter = TokenBucket(rate, burst) if rate > 0 else None
+        self.max_wait_s = max_wait_s
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._shed: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        br = self._breakers.get(model)
+        if br is None:
+            with self._lock:
+                br = self._breakers.setdefault(model, CircuitBreaker(model, **self.breaker_kwargs))
+        return br
+
+    def admit(self, model: str, call_site: str) -> Tuple[Optional[str], Optional[str]]:
+        """(ticket, None) when the call may go ahead, else (None, reason)."""
+        br = self.breaker(model)
+        ticket = br.allow()
+        reason = None
+        if ticket is None:
+            reason = 'circuit_open'
+        elif self.limiter is not None and not self.limiter.acquire(self.max_wait_s):
+            br.cancel(ticket)
+            ticket, reason = None, 'rate_limited'
+        if reason:
+            with self._lock:
+                self._shed[(call_site, reason)] = self._shed.get((call_site, reason), 0) + 1
+        return ticket, reason
+
+    def record(self, model: str, ticket: Optional[str], ok: bool, elapsed: float):
+        self.breaker(model).record(ticket, ok, elapsed)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            shed: Dict[str, Dict[str, int]] = {}
+            for (site, reason), n in self._shed.items():
+                shed.setdefault(site, {})[reason] = n
+            breakers = list(self._breakers.items())
+        return {'rate_limiter': self.limiter.status() if self.limiter else None,
+                'breakers': {model: br.status() for model, br in breakers}, 'shed': shed}
+
+    def prometheus(self) -> str:
+        lines = ['# HELP ai_breaker_open Circuit breaker state per model (0 closed, 0.5 half-open, 1 open).',
+                 '# TYPE ai_breaker_open gauge']
+        with self._lock:
+            breakers = sorted(self._breakers.items())
+            shed = sorted(self._shed.items())
+        for model, br in breakers:
+            lines.append(f'ai_breaker_open{{model="{model}"}} {({CLOSED: 0, HALF_OPEN: 0.5, OPEN: 1})[br.state]}')
+        lines += ['# HELP ai_calls_shed_total Model calls refused without reaching the provider.', '# TYPE ai_calls_shed_total counter']
+        for (site, reason), n in shed:
+            lines.append(f'ai_calls_shed_total{{call_site="{site}",reason="{reason}"}} {n}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+            self._shed.clear()
+
+
+GUARD = ProviderGuard()
@@ -0,0 +1,200 @@
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+
+from prompts import AGENT_PERSONA, REPRICING_PROMPT_TEMPLATE, MODULE_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+# Provider-side prefix caching (Gemini cached content); disable with AI_PREFIX_CACHE=0
+PREFIX_CACHE_ENABLED = os.environ.get('AI_PREFIX_CACHE', '1') == '1'
+PREFIX_CACHE_TTL_S = int(os.environ.get('AI_PREFIX_CACHE_TTL_S', 3600))
+# handles are recreated this long before the provider deletes them
+PREFIX_CACHE_REFRESH_S = min(300.0, PREFIX_CACHE_TTL_S / 10)
+
+# module -> (template, uses persona)
+_PREFIX_SOURCES = {
+    'repricing': (REPRICING_PROMPT_TEMPLATE, True),
+    'negotiator': (MODULE_PROMPTS['negocjator'], True),
+    'negotiator_message': (MODULE_PROMPTS['negocjator_wiadomosc'], True),
+    'seo_optimize': (MODULE_PROMPTS['seo_autopilot'], True),
+    'seo_clone': (MODULE_PROMPTS['seo_cloner'], True),
+    'dispute': (MODULE_PROMPTS['dispute'], False),
+    'discussion': (MODULE_PROMPTS['discussion'], False),
+    'messaging_analyze': (MODULE_PROMPTS['message_analysis'], False),
+    'messaging_reply': (MODULE_PROMPTS['smart_reply'], False),
+    'order_risk': (MODULE_PROMPTS['order_risk'], False),
+    'packing_slip': (MODULE_PROMPTS['packing_slip'], False),
+    'carrier': (MODULE_PROMPTS['carrier'], False),
+    'inventory': (MODULE_PROMPTS['inventory'], False),
+    'review_request': (MODULE_PROMPTS['review_request'], False),
+    'delay_notice': (MODULE_PROMPTS['delay_notice'], False),
+}
+
+
+def canonical_json(payload: Any) -> str:
+    """Compact, key-sorted JSON so identical payloads always render to identical bytes."""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token) used for reporting only."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+@lru_cache(maxsize=None)
+def static_prefix(module: str) -> str:
+    """Render the static persona/instruction prefix of a module once per process.
+
+    Templates are rendered with a plain replace: some of them contain literal JSON braces.
+    """
+    template, uses_persona = _PREFIX_SOURCES[module]
+    return template.replace('{persona}', AGENT_PERSONA.strip() if uses_persona else '').strip()
+
+
+class Prompt:
+    """Compiled prompt: cached static prefix plus a canonical JSON body."""
+    __slots__ = ('module', 'prefix', 'body')
+
+    def __init__(self, module: str, prefix: str, body: str):
+        self.module = module
+        self.prefix = prefix
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        return self.prefix + '\n\nInput JSON:\n' + self.body if self.prefix else self.body
+
+    @property
+    def prefix_key(self) -> str:
+        return hashlib.sha1(self.prefix.encode('utf-8')).hexdigest()
+
+    def __str__(self) -> str:
+        return self.text
+
+
+_STATS_LOCK = threading.Lock()
+_TOKEN_STATS: Dict[str, Dict[str, int]] = {}
+
+
+def _record(module: str, legacy_tokens: int, prefix_tokens: int, body_tokens: int):
+    with _STATS_LOCK:
+        st = _TOKEN_STATS.setdefault(module, {'calls': 0, 'legacy_tokens': 0, 'prefix_tokens': 0, 'body_tokens': 0, 'cached_prefix_calls': 0})
+        st['calls'] += 1
+        st['legacy_tokens'] += legacy_tokens
+        st['prefix_tokens'] += prefix_tokens
+        st['body_tokens'] += body_tokens
+
+
+def build_prompt(module: str, payload: Any = None) -> Prompt:
+    """Compile a prompt for `module` from its static prefix and a dynamic payload."""
+    prefix = static_prefix(module)
+    body = canonical_json(payload if payload is not None else {})
+    # "before" is what the old concatenation produced: prefix + Python repr of the payload
+    _record(module, estimate_tokens(prefix) + estimate_tokens(str(payload)), estimate_tokens(prefix), estimate_tokens(body))
+    return Prompt(module, prefix, body)
+
+
+def as_prompt_text(prompt: Any) -> str:
+    """Normalize any prompt accepted by BaseAIHandler.generate to text (dicts become canonical JSON)."""
+    if isinstance(prompt, Prompt):
+        return prompt.text
+    if isinstance(prompt, (dict, list)):
+        return canonical_json(prompt)
+    return str(prompt)
+
+
+# --- provider prefix caching ---------------------------------------------------
+
+_CACHE_LOCK = threading.Lock()
+_CACHED_CONTENT: Dict[str, Any] = {}     # key -> (handle, monotonic time to recreate it)
+_KEY_LOCKS: Dict[str, threading.Lock] = {}
+_UNCACHEABLE = set()
+
+
+def _fresh(key: str) -> Optional[Any]:
+    entry = _CACHED_CONTENT.get(key)
+    if entry is not None and time.monotonic() < entry[1]:
+        return entry[0]
+    return None
+
+
+def cached_prefix_content(genai: Any, model: str, prompt: Prompt) -> Optional[Any]:
+    """Return a provider cached-content handle for the prompt prefix, creating it on first use.
+
+    Handles are recreated shortly before the provider's TTL deletes them. Creation (a network
+    round trip) holds only that prefix's lock, so other modules' calls are not held up.
+    Returns None when caching is disabled, unsupported by the installed SDK, or rejected by the
+    provider (e.g. prefix below the minimum cacheable size); such prefixes are not retried.
+    """
+    if not PREFIX_CACHE_ENABLED or not prompt.prefix or genai is None or not hasattr(genai, 'caching'):
+        return None
+    key = f"{model}:{prompt.prefix_key}"
+    with _CACHE_LOCK:
+        if key in _UNCACHEABLE:
+            return None
+        cached = _fresh(key)
+        if cached is not None:
+            return cached
+        key_lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+    with key_lock:
+        cached = _fresh(key)  # created by another thread while we waited
+        if cached is not None:
+            return cached
+        try:
+            import datetime
+            cached = genai.caching.CachedContent.create(
+                model=model,
+                display_name=f"prefix-{prompt.module}",
+                system_instruction=prompt.prefix,
+                ttl=datetime.timedelta(seconds=PREFIX_CACHE_TTL_S),
+            )
+        except Exception as e:
+            logger.info('Prefix caching unavailable for %s: %s', prompt.module, e)
+            with _CACHE_LOCK:
+                _UNCACHEABLE.add(key)
+                _CACHED_CONTENT.pop(key, None)
+            return None
+        with _CACHE_LOCK:
+            _CACHED_CONTENT[key] = (cached, time.monotonic() + PREFIX_CACHE_TTL_S - PREFIX_CACHE_REFRESH_S)
+        return cached
+
+
+def drop_prefix_content(model: str, prompt: Prompt):
+    """Forget a handle the provider no longer knows (deleted early); the next call recreates it."""
+    with _CACHE_LOCK:
+        _CACHED_CONTENT.pop(f"{model}:{prompt.prefix_key}", None)
+
+
+def mark_prefix_cached(module: str):
+    with _STATS_LOCK:
+        st = _TOKEN_STATS.get(module)
+        if st is not None:
+            st['cached_prefix_calls'] += 1
+
+
+def token_report() -> Dict[str, Dict[str, Any]]:
+    """Per-module estimated tokens before (legacy concatenation) and after compilation.
+
+    `after_billed_tokens` excludes the prefix for calls served from the provider prefix cache.
+    """
+    report = {}
+    with _STATS_LOCK:
+        for module, st in _TOKEN_STATS.items():
+            calls = st['calls'] or 1
+            after = st['prefix_tokens'] + st['body_tokens']
+            billed = after - (st['prefix_tokens'] // calls) * st['cached_prefix_calls']
+            report[module] = {
+                'calls': st['calls'],
+                'before_tokens': st['legacy_tokens'],
+                'after_tokens': after,
+                'after_billed_tokens': billed,
+                'cached_prefix_calls': st['cached_prefix_calls'],
+                'static_prefix_tokens': estimate_tokens(static_prefix(module)),
+            }
+    return report
@@ -0,0 +1,135 @@
+from typing import Dict, Any, Callable, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from modules.ai.base import record_fallback
+from modules.ai.prompt_builder import as_prompt_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Latency/cost tiers: 'local' = deterministic in-process classifier, 'fast' = flash model, 'pro' = default model
+TIER_MODELS = {
+    'fast': os.environ.get('LM_FAST_MODEL', 'models/gemini-2.5-flash'),
+    'pro': os.environ.get('LM_MODEL', 'models/gemini-3-pro-preview'),
+}
+
+# Estimated USD per 1M tokens (input, output) used for spend accounting
+TIER_PRICING = {
+    'local': (0.0, 0.0),
+    'fast': (0.30, 2.50),
+    'pro': (2.00, 12.00),
+}
+
+# Call site -> first tier to try. Anything not listed goes straight to 'pro'.
+CALL_SITE_TIERS = {
+    'messaging_analyze': 'local',
+    'discussion': 'fast',
+    'order_risk': 'fast',
+    'packing_slip': 'fast',
+    'carrier': 'fast',
+    'review_request': 'fast',
+    'delay_notice': 'fast',
+    'negotiator_message': 'fast',
+    'messaging_reply': 'pro',
+    'negotiator': 'pro',
+    'repricing': 'pro',
+    'dispute': 'pro',
+    'inventory': 'pro',
+    'seo_optimize': 'pro',
+    'seo_clone': 'pro',
+}
+
+MIN_CONFIDENCE = float(os.environ.get('AI_ROUTER_MIN_CONFIDENCE', 0.7))
+
+_ESCALATION = {'local': 'fast', 'fast': 'pro', 'pro': None}
+
+_LOCK = threading.Lock()
+_TIER_STATS: Dict[str, Dict[str, float]] = {}
+
+
+def _record(tier: str, call_site: str, elapsed: float, ok: bool, escalated: bool, prompt_tokens: int = 0, response_tokens: int = 0):
+    price_in, price_out = TIER_PRICING.get(tier, (0.0, 0.0))
+    spend = (prompt_tokens * price_in + response_tokens * price_out) / 1e6
+    with _LOCK:
+        for key in (tier, f"{tier}:{call_site}"):
+            st = _TIER_STATS.setdefault(key, {'calls': 0, 'errors': 0, 'escalations': 0, 'latency_total_s': 0.0, 'latency_max_s': 0.0, 'spend_usd': 0.0})
+            st['calls'] += 1
+            st['errors'] += 0 if ok else 1
+            st['escalations'] += 1 if escalated else 0
+            st['latency_total_s'] += elapsed
+            st['latency_max_s'] = max(st['latency_max_s'], elapsed)
+            st['spend_usd'] += spend
+
+
+def _confidence(response: Any) -> float:
+    """Models are asked for an optional `confidence` (0-1); a missing value counts as confident."""
+    if isinstance(response, dict) and response.get('confidence') is not None:
+        try:
+            return float(response['confidence'])
+        except Exception:
+            return 0.0
+    return 1.0
+
+
+def route_generate(handler: Any, call_site: str, prompt: Any, local: Optional[Callable[[], Tuple[Dict[str, Any], float]]] = None, min_confidence: float = None) -> Dict[str, Any]:
+    """Run `prompt` on the cheapest tier configured for `call_site`, escalating on low confidence.
+
+    local: optional callable returning (result, confidence) for the 'local' tier.
+    Returns the handler.generate() dict extended with 'tier' (and 'confidence' when known). When
+    every model tier fails, a local result (if any) is returned as the fallback.
+    """
+    min_confidence = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    tier = CALL_SITE_TIERS.get(call_site, 'pro')
+    local_result = None
+    last = None
+    best = None
+
+    while tier:
+        start = time.perf_counter()
+        if tier == 'local':
+            if local is None:
+                tier = _ESCALATION[tier]
+                continue
+            try:
+                local_result, conf = local()
+            except Exception:
+                logger.exception('Local classifier failed for %s', call_site)
+                local_result, conf = None, 0.0
+            confident = local_result is not None and conf >= min_confidence
+            _record('local', call_site, time.perf_counter() - start, local_result is not None, not confident)
+            if confident:
+                return {'ok': True, 'response': local_result, 'tier': 'local', 'confidence': conf}
+        else:
+            resp = handler.generate(prompt, model=TIER_MODELS[tier])
+            ok = bool(resp.get('ok'))
+            conf = _confidence(resp.get('response')) if ok else 0.0
+            confident = ok and conf >= min_confidence
+            escalate = not confident and _ESCALATION[tier] is not None
+            # failed calls are not billed
+            tokens = (estimate_tokens(as_prompt_text(prompt)), estimate_tokens(str(resp.get('response') or ''))) if ok else (0, 0)
+            _record(tier, call_site, time.perf_counter() - start, ok, escalate, *tokens)
+            last = {**resp, 'tier': tier, 'confidence': conf} if ok else {**resp, 'tier': tier}
+            if confident:
+                return last
+            if ok:
+                best = last
+        tier = _ESCALATION[tier]
+
+    # nothing confident: prefer a low-confidence model answer, then the local guess
+    if best is not None:
+        return best
+    if local_result is not None:
+        record_fallback(call_site)
+        return {'ok': True, 'response': local_result, 'tier': 'local_fallback'}
+    return last or {'ok': False, 'error': 'no_tier_available', 'tier': None}
+
+
+def router_stats() -> Dict[str, Dict[str, float]]:
+    """Per-tier (and per tier:call_site) call counts, latency and estimated spend."""
+    with _LOCK:
+        out = {}
+        for key, st in _TIER_STATS.items():
+            out[key] = {**st, 'latency_avg_s': st['latency_total_s'] / st['calls'] if st['calls'] else 0.0}
+        return out
@@ -0,0 +1,224 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+from modules.allegro.quality_guard import handle_dispute
+from modules.allegro.quality_metrics import METRICS
+from modules.messaging.intent_classifier import fold
+from modules.orders.event_log import record_event
+
+logger = logging.getLogger(__name__)
+
+FAST_DEADLINE_S = float(os.environ.get('DISPUTE_FAST_DEADLINE_S', 0.3))
+MAX_DEADLINE_S = float(os.environ.get('DISPUTE_MAX_DEADLINE_S', FAST_DEADLINE_S * 10))   # cap on a caller's deadline_s
+LIBRARY_PATH = os.environ.get('DISPUTE_LIBRARY_PATH')
+DISPUTE_TTL_S = float(os.environ.get('DISPUTE_TTL_S', 7 * 86400))
+DISPUTE_MAX_ENTRIES = int(os.environ.get('DISPUTE_MAX_ENTRIES', 50000))
+
+# issue type -> folded stems; first match wins
+ISSUE_KEYWORDS = (
+    ('damaged', ('uszkodz', 'zepsut', 'rozbit', 'pekniet', 'porysowan', 'nie dziala', 'wadliw')),
+    ('not_delivered', ('nie dotarl', 'nie doszl', 'nie otrzymal', 'brak paczki', 'zaginel', 'gdzie jest paczk')),
+    ('missing_parts', ('brakuje', 'niekomplet', 'brak czesci')),
+    ('not_as_described', ('niezgodn', 'inny niz', 'nie ten', 'zamiast', 'inny kolor', 'inny rozmiar')),
+    ('return_request', ('zwrot', 'zwroc', 'odstap')),
+)
+
+ACK_TEMPLATES = {
+    'damaged': 'Bardzo przepraszamy za uszkodzony produkt. Zajmujemy się zgłoszeniem priorytetowo — prosimy o zdjęcie uszkodzenia, a zaproponujemy wymianę lub zwrot.',
+    'not_delivered': 'Przepraszamy za kłopot z doręczeniem. Już sprawdzamy status przesyłki u przewoźnika i wrócimy z informacją w ciągu godziny.',
+    'missing_parts': 'Przepraszamy za niekompletną przesyłkę. Prosimy o informację, czego brakuje — wyślemy brakujące elementy najszybciej, jak to możliwe.',
+    'not_as_described': 'Przykro nam, że produkt nie spełnia oczekiwań. Sprawdzamy zamówienie i zaproponujemy wymianę lub zwrot.',
+    'return_request': 'Dziękujemy za wiadomość. Przyjmujemy zgłoszenie zwrotu i w ciągu godziny prześlemy szczegóły.',
+    'other': 'Przykro nam z powodu problemu. Zajmujemy się sprawą i wrócimy z propozycją rozwiązania w ciągu godziny.',
+}
+
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('DISPUTE_WORKERS', 4)), thread_name_prefix='dispute')
+
+
+def classify_issue(dispute_text: str) -> str:
+    text = fold(dispute_text or '')
+    for issue, stems in ISSUE_KEYWORDS:
+        if any(s in text for s in stems):
+            return issue
+    return 'other'
+
+
+def _category(order_context: Dict[str, Any]) -> str:
+    items = order_context.get('items') or [{}]
+    return str(order_context.get('category') or items[0].get('category') or 'default')
+
+
+class ResolutionLibrary:
+    """Accepted resolutions indexed by (product category, issue type), optionally persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = LIBRARY_PATH):
+        self.path = path
+        self._index: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for row in json.load(f):
+                        self._index[(row['category'], row['issue_type'])] = row
+            except Exception:
+                logger.exception('Failed to load dispute resolution library')
+
+    def lookup(self, category: str, issue_type: str) -> Optional[Dict[str, Any]]:
+        return self._index.get((category, issue_type)) or self._index.get(('default', issue_type))
+
+    def record(self, category: str, issue_type: str, reply_text: str, resolution: Dict[str, Any]):
+        with self._lock:
+            row = self._index.get((category, issue_type))
+            uses = row['accepted_count'] + 1 if row else 1
+            self._index[(category, issue_type)] = {'category': category, 'issue_type': issue_type, 'reply_text': reply_text,
+                                                  'suggested_resolution': resolution, 'accepted_count': uses}
+            if self.path:
+                try:
+                    tmp = self.path + '.tmp'
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        json.dump(list(self._index.values()), f, ensure_ascii=False)
+                    os.replace(tmp, self.path)
+                except Exception:
+                    logger.exception('Failed to persist dispute resolution library')
+
+    def __len__(self):
+        return len(self._index)
+
+
+LIBRARY = ResolutionLibrary()
+# dispute_id -> record, oldest first; bounded like the order DedupeIndex (TTL + max entries)
+_DISPUTES: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+_BY_KEY: Dict[str, str] = {}   # "order_id:discussion_id" -> dispute_id, so a retried POST reuses the dispute
+_LOCK = threading.Lock()
+_ids = itertools.count(1)
+
+
+def _purge(now: float):
+    while _DISPUTES:
+        dispute_id, rec = next(iter(_DISPUTES.items()))
+        if rec['opened_ts'] + DISPUTE_TTL_S > now and len(_DISPUTES) < DISPUTE_MAX_ENTRIES:
+            break
+        _DISPUTES.popitem(last=False)
+        if rec.get('key') and _BY_KEY.get(rec['key']) == dispute_id:
+            del _BY_KEY[rec['key']]
+
+
+def _dispute_key(order_context: Dict[str, Any], discussion_id: Optional[str]) -> Optional[str]:
+    order_id = order_context.get('order_id')
+    if order_id is None and discussion_id is None:
+        return None
+    return f"{order_id}:{discussion_id}"
+
+
+def _finish(dispute_id: str, fut):
+    rec = _DISPUTES.get(dispute_id)
+    if rec is None:
+        return
+    try:
+        final = fut.result()
+    except Exception as e:
+        logger.exception('Dispute %s AI resolution failed', dispute_id)
+        final = {'source': 'fallback', 'note': f'ai_failed: {e}'}
+    if final.get('source') == 'fallback':
+        # model error or circuit open: keep the issue-specific acknowledgement and hand it to a person
+        final = {**rec['fast'], 'human_required': True, 'source': 'fallback', 'note': final.get('note') or 'fallback'}
+    # called by both the done-callback and open_dispute when the AI beats the deadline
+    with _LOCK:
+        if rec['status'] == 'final':
+            return
+        rec['final'] = final
+        rec['status'] = 'final'
+        rec['final_elapsed_s'] = time.time() - rec['opened_ts']
+    record_event('dispute.resolved', rec.get('order_id'), {'dispute_id': dispute_id, 'source': final.get('source', 'ai'),
+                                                            'human_required': final.get('human_required')})
+
+
+def open_dispute(dispute_text: str, order_context: Dict[str, Any], deadline_s: float = None, discussion_id: str = None) -> Dict[str, Any]:
+    """Answer a dispute within `deadline_s` and fill in the AI resolution asynchronously.
+
+    A library hit for (category, issue type) is returned as the final answer immediately. Otherwise
+    the AI resolution runs in the background; if it beats the deadline it is returned directly,
+    else the fast answer is a template acknowledgement and the final one can be fetched later with
+    get_dispute(). Blocks the calling thread for up to `deadline_s` (capped at MAX_DEADLINE_S).
+    When the model fails (or its circuit is open) the final answer is the acknowledgement with
+    source 'fallback' and human_required set; it is never stored in the library.
+    A dispute for an order + discussion (or dispute_id) that is already open is returned as is
+    (replayed: true) without opening a second one.
+    Returns: {dispute_id, status: 'final'|'pending', fast, final}
+    """
+    deadline_s = FAST_DEADLINE_S if deadline_s is None else min(max(0.0, float(deadline_s)), MAX_DEADLINE_S)
+    order_context = order_context or {}
+    issue_type = classify_issue(dispute_text)
+    category = _category(order_context)
+    key = _dispute_key(order_context, discussion_id)
+    ack = {'ok': True, 'reply_text': ACK_TEMPLATES[issue_type], 'suggested_resolution': None, 'human_required': False, 'source': 'template'}
+    now = time.time()
+    with _LOCK:
+        _purge(now)
+        existing_id = order_context.get('dispute_id') or _BY_KEY.get(key)
+        existing = _DISPUTES.get(str(existing_id)) if existing_id else None
+        if existing is not None:
+            return {**_view(existing), 'replayed': True}
+        dispute_id = str(order_context.get('dispute_id') or f"disp-{next(_ids)}")
+        rec = {'dispute_id': dispute_id, 'order_id': order_context.get('order_id'), 'key': key, 'issue_type': issue_type,
+               'category': category, 'opened_ts': now, 'status': 'pending', 'fast': ack, 'final': None}
+        _DISPUTES[dispute_id] = rec
+        if key:
+            _BY_KEY[key] = dispute_id
+    METRICS.record_event({'type': 'dispute_opened', 'ts': order_context.get('dispute_ts')})
+    record_event('dispute.opened', rec['order_id'], {'dispute_id': dispute_id, 'issue_type': issue_type, 'category': category})
+
+    known = LIBRARY.lookup(category, issue_type)
+    if known:
+        answer = {'ok': True, 'reply_text': known['reply_text'], 'suggested_resolution': known['suggested_resolution'],
+                  'human_required': False, 'source': 'library'}
+        rec.update(fast=answer, final=answer, status='final', final_elapsed_s=time.time() - rec['opened_ts'])
+        record_event('dispute.resolved', rec['order_id'], {'dispute_id': dispute_id, 'source': 'library', 'human_required': False})
+        return _view(rec)
+
+    fut = _executor.submit(handle_dispute, dispute_text, order_context)
+    fut.add_done_callback(lambda f: _finish(dispute_id, f))
+    try:
+        fut.result(timeout=deadline_s)
+        # done within the deadline: the callback may still be running, so read the result directly
+        _finish(dispute_id, fut)
+        if rec['final'].get('source') == 'ai':
+            rec['fast'] = rec['final']
+    except FutureTimeout:
+        pass
+    except Exception:
+        logger.exception('Dispute %s AI resolution failed', dispute_id)
+    return _view(rec)
+
+
+def _view(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: rec.get(k) for k in ('dispute_id', 'status', 'issue_type', 'category', 'fast', 'final', 'final_elapsed_s')}
+
+
+def get_dispute(dispute_id: str) -> Optional[Dict[str, Any]]:
+    rec = _DISPUTES.get(dispute_id)
+    return _view(rec) if rec else None
+
+
+def accept_resolution(dispute_id: str, reply_text: str = None, resolution: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Record the resolution the buyer accepted so the next (category, issue) dispute reuses it.
+
+    Only AI or library answers, or an explicitly passed reply and resolution, go into the library;
+    an acknowledgement or fallback answer does not.
+    """
+    rec = _DISPUTES.get(dispute_id)
+    if rec is None:
+        return {'ok': False, 'error': 'unknown_dispute'}
+    final = rec.get('final') or rec['fast']
+    stored = bool(reply_text and resolution) or final.get('source') in ('ai', 'library')
+    if stored:
+        LIBRARY.record(rec['category'], rec['issue_type'], reply_text or final.get('reply_text'), resolution or final.get('suggested_resolution'))
+    record_event('dispute.accepted', rec.get('order_id'), {'dispute_id': dispute_id})
+    return {'ok': True, 'category': rec['category'], 'issue_type': rec['issue_type'], 'library_size': len(LIBRARY), 'stored': stored}
@@ -2,7 +2,9 @@ from typing import Dict, Any
 import logging
 import time
 
-from modules.ai.base import BaseAIHandler
+from modules.ai.base import BaseAIHandler, record_fallback
+from modules.ai.prompt_builder import build_prompt
+from modules.allegro.quality_metrics import METRICS
 
 logger = logging.getLogger(__name__)
 
@@ -10,35 +12,39 @@ logger = logging.getLogger(__name__)
 def handle_dispute(dispute_text: str, order_context: Dict[str, Any]) -> Dict[str, Any]:
     """Analyze dispute and return immediate de-escalation reply and suggested resolution.
 
-    Returns: {ok, reply_text, suggested_resolution, human_required}
+    Returns: {ok, reply_text, suggested_resolution, human_required, source: 'ai'|'fallback'}
     """
     handler = BaseAIHandler(response_mime_type='application/json')
-    prompt = (
-        "You are an expert Allegro seller assistant. Analyze the dispute and propose a calm, conciliatory reply. "
-        "Return JSON: { reply_text: string, suggested_resolution: {type: 'refund_partial'|'replace'|'full_refund'|'other', amount: number|null, note: string}, human_required: bool }"
-        f"\n\nOrder context: {order_context}\n\nDispute text: {dispute_text}"
-    )
+    prompt = build_prompt('dispute', {'order_context': order_context, 'dispute_text': dispute_text})
 
     start = time.time()
     resp = handler.generate(prompt)
     elapsed = time.time() - start
     if not resp.get('ok'):
         logger.warning('AI dispute analysis failed: %s', resp.get('error'))
+        record_fallback('dispute')
         # fallback simple reply
         reply = 'Przykro nam z powodu problemu. Proponujemy częściowy zwrot lub wymianę — prosimy o potwierdzenie preferencji.'
-        return {'ok': True, 'reply_text': reply, 'suggested_resolution': {'type': 'refund_partial', 'amount': None, 'note': 'fallback'}, 'human_required': True, 'elapsed_s': elapsed}
+        return {'ok': True, 'reply_text': reply, 'suggested_resolution': {'type': 'refund_partial', 'amount': None, 'note': 'fallback'}, 'human_required': True, 'elapsed_s': elapsed, 'source': 'fallback'}
 
     parsed = resp.get('response') or {}
-    return {'ok': True, 'reply_text': parsed.get('reply_text'), 'suggested_resolution': parsed.get('suggested_resolution'), 'human_required': bool(parsed.get('human_required', False)), 'elapsed_s': elapsed}
+    return {'ok': True, 'reply_text': parsed.get('reply_text'), 'suggested_resolution': parsed.get('suggested_resolution'), 'human_required': bool(parsed.get('human_required', False)), 'elapsed_s': elapsed, 'source': 'ai'}
 
 
 def monitor_quality_metrics() -> Dict[str, Any]:
-    """Monitor shipping times and tracking numbers; proactively prepare messages for delayed shipments.
+    """Monitor response SLA, seller-rating metrics and late/stalled shipments.
 
-    Returns a summary of issues detected and actions taken (best-effort).
+    Read-only: the late/stalled scan and its delay notices (model calls) run after tracking ingest
+    and on POST /api/logistics/delays/scan, so dashboard polls never wait on the model.
+    Returns: {ok, issues: [sla warnings + shipment issues], score, components, shipments}
     """
-    # This is a stubbed implementation: in real system we'd query shipments DB / courier APIs
-    issues = []
-    # Example heuristic: none available -> return ok
-    # Provide structure for UI
-    return {'ok': True, 'issues': issues, 'note': 'monitoring stub — integrate with shipments DB to activate'}
+    issues = METRICS.sla_warnings()
+    shipments = None
+    try:
+        from modules.logistics.shipment_tracker import TRACKER
+        issues.extend(TRACKER.issues())
+        shipments = {'in_flight': len(TRACKER), 'late': len(TRACKER.late), 'stalled': len(TRACKER.stalled), 'rejected': TRACKER.rejected}
+    except Exception:
+        logger.exception('Reading shipment issues failed')
+    q = METRICS.score()
+    return {'ok': True, 'issues': issues, 'score': q['score'], 'components': q['components'], 'shipments': shipments}
@@ -0,0 +1,227 @@
+from typing import Dict, Any, List, Optional, Iterable
+from datetime import datetime
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_SLA_S = 3600
+SLA_WARN_BEFORE_S = 15 * 60
+BUCKET_S = 3600
+WINDOWS = {'24h': 24, '7d': 24 * 7, '30d': 24 * 30}
+# unanswered discussions are forgotten after the longest window, or oldest-first beyond the cap
+PENDING_MAX_AGE_S = max(WINDOWS.values()) * BUCKET_S
+PENDING_MAX = 100000
+
+# metric fields kept per hourly bucket
+FIELDS = ('replies', 'reply_seconds', 'replies_on_time', 'discussions', 'disputes', 'shipments', 'shipments_late')
+
+
+def _to_ts(value: Any) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+class RollingWindows:
+    """Hourly ring buckets (30 days) with running sums per window.
+
+    Memory is fixed at len(FIELDS) * 720 counters; each window total is updated when a bucket enters
+    or leaves it, so reading any window is O(1).
+    """
+
+    def __init__(self, bucket_s: int = BUCKET_S, windows: Dict[str, int] = None):
+        self.bucket_s = bucket_s
+        self.windows = windows or WINDOWS
+        self.size = max(self.windows.values())
+        self._ring = {f: [0.0] * self.size for f in FIELDS}
+        self._totals = {w: dict.fromkeys(FIELDS, 0.0) for w in self.windows}
+        self._head: Optional[int] = None  # newest bucket index
+
+    def _advance(self, bucket: int):
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+        if bucket - self._head > self.size:
+            # everything expired
+            for f in FIELDS:
+                self._ring[f] = [0.0] * self.size
+            for tot in self._totals.values():
+                for f in FIELDS:
+                    tot[f] = 0.0
+            self._head = bucket
+            return
+        for step in range(self._head + 1, bucket + 1):
+            for w, k in self.windows.items():
+                leaving = step - k
+                slot = leaving % self.size
+                tot = self._totals[w]
+                for f in FIELDS:
+                    tot[f] -= self._ring[f][slot]
+            slot = step % self.size
+            for f in FIELDS:
+                self._ring[f][slot] = 0.0
+        self._head = bucket
+
+    def add(self, ts: float, **values: float):
+        bucket = int(ts // self.bucket_s)
+        self._advance(bucket)
+        age = self._head - bucket
+        if age >= self.size:
+            return  # older than the largest window
+        slot = bucket % self.size
+        for f, v in values.items():
+            self._ring[f][slot] += v
+            for w, k in self.windows.items():
+                if age < k:
+                    self._totals[w][f] += v
+
+    def totals(self, window: str, now: float = None) -> Dict[str, float]:
+        if now is not None:
+            self._advance(int(now // self.bucket_s))
+        return dict(self._totals[window])
+
+
+class QualityMetrics:
+    """Incremental seller-quality metrics fed by discussion, dispute and shipment events."""
+
+    def __init__(self, sla_s: int = RESPONSE_SLA_S, warn_before_s: int = SLA_WARN_BEFORE_S,
+                 max_age_s: float = PENDING_MAX_AGE_S, max_pending: int = PENDING_MAX):
+        self.sla_s = sla_s
+        self.warn_before_s = warn_before_s
+        self.max_age_s = max_age_s
+        self.max_pending = max_pending
+        self.expired = 0
+        self.windows = RollingWindows()
+        self._pending: Dict[Any, float] = {}   # discussion_id -> first unanswered buyer message ts
+        self._deadlines: List[Any] = []        # heap of (deadline, opened_ts, discussion_id), lazily pruned
+        self._warned: Dict[Any, float] = {}    # discussion_id -> deadline, in deadline order, once inside the warning horizon
+        self._lock = threading.Lock()
+
+    def record_event(self, event: Dict[str, Any]):
+        """event: {type, ts, discussion_id?, late?}
+
+        types: buyer_message, seller_reply, dispute_opened, shipment_sent, shipment_late
+        """
+        etype = event.get('type')
+        ts = _to_ts(event.get('ts'))
+        did = event.get('discussion_id')
+        if did is None and etype in ('buyer_message', 'seller_reply'):
+            return
+        with self._lock:
+            if etype == 'buyer_message':
+                if did not in self._pending:
+                    self._pending[did] = ts
+                    heapq.heappush(self._deadlines, (ts + self.sla_s, ts, did))
+                    self.windows.add(ts, discussions=1)
+                    self._expire(ts)
+            elif etype == 'seller_reply':
+                opened = self._pending.pop(did, None)
+                self._warned.pop(did, None)
+                self._expire(ts)
+                if opened is not None:
+                    elapsed = max(0.0, ts - opened)
+                    self.windows.add(ts, replies=1, reply_seconds=elapsed, replies_on_time=1 if elapsed <= self.sla_s else 0)
+            elif etype == 'dispute_opened':
+                self.windows.add(ts, disputes=1)
+            elif etype == 'shipment_sent':
+                self.windows.add(ts, shipments=1, shipments_late=1 if event.get('late') else 0)
+            elif etype == 'shipment_late':
+                self.windows.add(ts, shipments_late=1)
+            else:
+                logger.warning('Unknown quality event type: %s', etype)
+
+    def _expire(self, now: float):
+        """Forget unanswered discussions older than max_age_s, then the oldest beyond max_pending.
+
+        Keeps _pending, _warned and the deadline heap bounded by max_pending (heap: 2x + 64).
+        """
+        cutoff = now - self.max_age_s
+        while self._deadlines and self._deadlines[0][1] <= cutoff:
+            _, opened, did = heapq.heappop(self._deadlines)
+            if self._pending.get(did) == opened:
+                del self._pending[did]
+                self.expired += 1
+        while self._warned:
+            did, deadline = next(iter(self._warned.items()))
+            if deadline - self.sla_s > cutoff:
+                break
+            del self._warned[did]
+            if self._pending.pop(did, None) is not None:
+                self.expired += 1
+        while len(self._pending) > self.max_pending:
+            did = next(iter(self._pending))
+            del self._pending[did]
+            self._warned.pop(did, None)
+            self.expired += 1
+        # answered and dropped entries stay on the heap until popped; rebuild once they dominate it
+        if len(self._deadlines) > 2 * len(self._pending) + 64:
+            self._deadlines = [(t + self.sla_s, t, d) for d, t in self._pending.items() if d not in self._warned]
+            heapq.heapify(self._deadlines)
+
+    def record_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        for e in events:
+            self.record_event(e)
+            n += 1
+        return n
+
+    def window_stats(self, window: str = '30d', now: float = None) -> Dict[str, Any]:
+        with self._lock:
+            t = self.windows.totals(window, now=now if now is not None else time.time())
+        replies, shipments = t['replies'], t['shipments']
+        return {
+            'window': window,
+            'replies': int(replies),
+            'avg_response_s': t['reply_seconds'] / replies if replies else None,
+            'on_time_rate': t['replies_on_time'] / replies if replies else 1.0,
+            'discussions': int(t['discussions']),
+            'disputes': int(t['disputes']),
+            'dispute_rate': t['disputes'] / shipments if shipments else 0.0,
+            'shipments': int(shipments),
+            'late_rate': t['shipments_late'] / shipments if shipments else 0.0,
+        }
+
+    def score(self, now: float = None) -> Dict[str, Any]:
+        """Quality score 0-100 from 30-day on-time responses, dispute rate and late shipments."""
+        s = self.window_stats('30d', now=now)
+        dispute_penalty = min(1.0, s['dispute_rate'] * 20)  # 5% disputes -> no credit
+        score = 100 * (0.4 * s['on_time_rate'] + 0.4 * (1 - dispute_penalty) + 0.2 * (1 - min(1.0, s['late_rate'])))
+        return {'score': round(score, 1), 'components': s}
+
+    def sla_warnings(self, now: float = None) -> List[Dict[str, Any]]:
+        """Unanswered discussions whose 1h response deadline is within warn_before_s (or passed).
+
+        Breaches are reported until answered or until they are older than max_age_s.
+        """
+        now = now if now is not None else time.time()
+        horizon = now + self.warn_before_s
+        out = []
+        with self._lock:
+            self._expire(now)
+            # move deadlines entering the horizon off the heap; answered discussions are dropped on the way
+            while self._deadlines and self._deadlines[0][0] <= horizon:
+                deadline, opened, did = heapq.heappop(self._deadlines)
+                if self._pending.get(did) == opened:
+                    self._warned[did] = deadline
+            for did, deadline in self._warned.items():
+                if deadline > horizon:
+                    break  # an earlier `now` than the previous call
+                out.append({
+                    'type': 'sla_breach' if deadline <= now else 'sla_at_risk',
+                    'discussion_id': did,
+                    'seconds_left': round(deadline - now),
+                    'deadline': datetime.fromtimestamp(deadline).isoformat(),
+                })
+        return out
+
+
+METRICS = QualityMetrics()
@@ -1,8 +1,17 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Iterator
 import logging
+from datetime import datetime
+
+from modules.allegro.triage import iter_triage, PriorityInbox
+from modules.allegro.quality_metrics import METRICS
+from modules.orders.event_log import record_event
 
 logger = logging.getLogger(__name__)
 
+# Live inbox view, re-triaged incrementally as new buyer messages arrive
+INBOX = PriorityInbox()
+_handler = None
+
 
 def _safe_import(name: str, attr: str = None):
     try:
@@ -19,6 +28,7 @@ def analyze_discussion(discussion: Dict[str, Any]) -> Dict[str, Any]:
     discussion: {id, order_id, messages: [{from, text, ts}], buyer_history: {...}}
     Returns: {ok, priority, suggested_reply, human_required}
     """
+    global _handler
     BaseAIHandler = _safe_import('modules.ai.base', 'BaseAIHandler')
     if BaseAIHandler is None:
         # fallback heuristics
@@ -27,30 +37,57 @@ def analyze_discussion(discussion: Dict[str, Any]) -> Dict[str, Any]:
         reply = 'Dziękujemy za zgłoszenie. Pracujemy nad sprawą i wrócimy w ciągu 1 godziny.'
         return {'ok': True, 'priority': urgency, 'suggested_reply': reply, 'human_required': False}
 
-    handler = BaseAIHandler(response_mime_type='application/json')
-    prompt = {
-        'task': 'Prioritize and draft a de-escalating reply for an Allegro discussion. Fast response <1h.',
-        'discussion': discussion,
-        'instructions': 'Return JSON: { priority: "high|medium|low", suggested_reply: string, human_required: bool }'
-    }
-    resp = handler.generate(prompt)
+    build_prompt = _safe_import('modules.ai.prompt_builder', 'build_prompt')
+    route_generate = _safe_import('modules.ai.router', 'route_generate')
+    # one shared (stateless) handler instead of a new one per discussion
+    if _handler is None:
+        _handler = BaseAIHandler(response_mime_type='application/json')
+    prompt = build_prompt('discussion', {'discussion': discussion})
+    resp = route_generate(_handler, 'discussion', prompt)
     if not resp.get('ok'):
         logger.warning('AI quality analysis failed: %s', resp.get('error'))
+        # triage falls back to medium priority + human review
+        record_fallback = _safe_import('modules.ai.base', 'record_fallback')
+        if record_fallback is not None:
+            record_fallback('discussion')
         return {'ok': False, 'error': resp.get('error')}
 
     parsed = resp.get('response') or {}
     return {'ok': True, 'priority': parsed.get('priority','medium'), 'suggested_reply': parsed.get('suggested_reply','Dziękujemy, sprawdzamy.'), 'human_required': bool(parsed.get('human_required', False))}
 
 
-def prioritize_discussions(discussions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    out = []
-    for d in discussions:
-        try:
-            r = analyze_discussion(d)
-            out.append({'discussion_id': d.get('id'), 'priority': r.get('priority'), 'human_required': r.get('human_required'), 'suggested_reply': r.get('suggested_reply')})
-        except Exception:
-            logger.exception('Failed to analyze discussion %s', d.get('id'))
-            out.append({'discussion_id': d.get('id'), 'priority': 'medium', 'human_required': True, 'suggested_reply': ''})
+def stream_prioritized_discussions(discussions: Iterable[Dict[str, Any]], workers: int = None) -> Iterator[Dict[str, Any]]:
+    """Triage discussions concurrently, yielding results as they complete and updating INBOX."""
+    discussions = list(discussions)
+    ts = {d.get('id'): _last_message_ts(d) for d in discussions}
+    for r in iter_triage(discussions, analyze_discussion, workers=workers):
+        INBOX.upsert(r, ts=ts.get(r.get('discussion_id')))
+        yield r
+
+
+def prioritize_discussions(discussions: List[Dict[str, Any]], workers: int = None) -> List[Dict[str, Any]]:
+    out = list(stream_prioritized_discussions(discussions, workers=workers))
     # sort high->low
     order = {'high': 0, 'medium': 1, 'low': 2}
     return sorted(out, key=lambda x: order.get(x.get('priority','medium'), 1))
+
+
+def update_discussion(discussion: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-triage a single discussion (new message arrived) and update its place in INBOX."""
+    msgs = discussion.get('messages') or []
+    if msgs:
+        # feed the response-time SLA clock
+        etype = 'seller_reply' if msgs[-1].get('from') == 'seller' else 'buyer_message'
+        METRICS.record_event({'type': etype, 'discussion_id': discussion.get('id'), 'ts': msgs[-1].get('ts')})
+        record_event(f'discussion.{etype}', discussion.get('order_id'), {'discussion_id': discussion.get('id'), 'message_ts': msgs[-1].get('ts')})
+    r = next(iter_triage([discussion], analyze_discussion, workers=1))
+    INBOX.upsert(r, ts=_last_message_ts(discussion))
+    return r
+
+
+def _last_message_ts(discussion: Dict[str, Any]):
+    msgs = discussion.get('messages') or []
+    try:
+        return datetime.fromisoformat(str(msgs[-1].get('ts'))).timestamp() if msgs else None
+    except Exception:
+        return None
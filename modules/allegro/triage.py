@@ -0,0 +1,86 @@
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRIAGE_WORKERS = int(os.environ.get('TRIAGE_WORKERS', 8))
+
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def _triage_one(analyze: Callable[[Dict[str, Any]], Dict[str, Any]], d: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        r = analyze(d)
+        if r.get('ok'):
+            return {'discussion_id': d.get('id'), 'priority': r.get('priority'), 'human_required': r.get('human_required'), 'suggested_reply': r.get('suggested_reply')}
+        logger.warning('Discussion %s not analyzed: %s', d.get('id'), r.get('error'))
+    except Exception:
+        logger.exception('Failed to analyze discussion %s', d.get('id'))
+    return {'discussion_id': d.get('id'), 'priority': 'medium', 'human_required': True, 'suggested_reply': ''}
+
+
+def iter_triage(discussions: Iterable[Dict[str, Any]], analyze: Callable[[Dict[str, Any]], Dict[str, Any]], workers: int = None) -> Iterator[Dict[str, Any]]:
+    """Analyze discussions on a bounded worker pool and yield each result as soon as it completes.
+
+    At most `workers` model calls are in flight; the caller sees the first results after one model
+    round-trip instead of after the whole batch. If the consumer stops early (e.g. a streaming
+    client disconnected), queued discussions are cancelled instead of analyzed.
+    """
+    workers = max(1, workers or TRIAGE_WORKERS)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='triage')
+    try:
+        futures = [pool.submit(_triage_one, analyze, d) for d in discussions]
+        for fut in as_completed(futures):
+            yield fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PriorityInbox:
+    """Heap-ordered view of triaged discussions, updated incrementally.
+
+    Re-triaging a discussion (e.g. a new buyer message arrived) pushes a fresh entry and marks the old
+    one stale; stale entries are skipped lazily, so updates are O(log n).
+    """
+
+    def __init__(self):
+        self._heap: List[Any] = []
+        self._latest: Dict[Any, Any] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def upsert(self, result: Dict[str, Any], ts: Optional[float] = None):
+        """Insert or replace a triage result. Within a priority, older discussions come first."""
+        key = result.get('discussion_id')
+        entry = (PRIORITY_RANK.get(result.get('priority') or 'medium', 1), ts if ts is not None else time.time(), next(self._seq), key, result)
+        with self._lock:
+            self._latest[key] = entry
+            heapq.heappush(self._heap, entry)
+            # compact once stale entries dominate the heap
+            if len(self._heap) > 2 * len(self._latest) + 64:
+                self._heap = list(self._latest.values())
+                heapq.heapify(self._heap)
+
+    def remove(self, discussion_id: Any):
+        with self._lock:
+            self._latest.pop(discussion_id, None)
+
+    def top(self, n: int = 20) -> List[Dict[str, Any]]:
+        """Return the n most urgent current results without consuming them."""
+        with self._lock:
+            out = []
+            for entry in heapq.nsmallest(n + len(self._heap) - len(self._latest), self._heap):
+                if self._latest.get(entry[3]) is entry:
+                    out.append(entry[4])
+                    if len(out) >= n:
+                        break
+            return out
+
+    def __len__(self):
+        return len(self._latest)
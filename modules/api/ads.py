@@ -0,0 +1,60 @@
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.container import provide
+
+router = APIRouter(tags=['ads'])
+
+adjust_ads_based_on_margin = lazy('modules.ads.ads_manager', 'adjust_ads_based_on_margin')
+allocate_budget = lazy('modules.ads.budget_allocator', 'allocate_budget')
+
+
+class AdsOptimizeIn(BaseModel):
+    product_id: str
+    current_margin: float
+    product_info: Optional[Dict[str, Any]] = None
+
+
+@router.post('/api/ads/optimize')
+async def api_ads_optimize(req: AdsOptimizeIn):
+    try:
+        out = adjust_ads_based_on_margin(req.product_id, req.current_margin, product_info=req.product_info)
+        return {'ok': True, 'result': out}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class AdsPortfolioIn(BaseModel):
+    skus: Optional[List[Dict[str, Any]]] = None
+    # columnar alternative for large portfolios: {sku: [...], margin: [...], conversion_rate: [...], spend: [...]}
+    columns: Optional[Dict[str, List[Any]]] = None
+    config: Optional[Dict[str, Any]] = None
+    dry_run: bool = False
+
+
+@router.post('/api/ads/portfolio')
+async def api_ads_portfolio(req: AdsPortfolioIn, portfolio=Depends(provide('ads_portfolio'))):
+    try:
+        out = portfolio.run(req.columns or req.skus or [], config=req.config, dry_run=req.dry_run)
+        return {'ok': True, 'result': out}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class AdsBudgetIn(BaseModel):
+    # [{sku, price, cost|margin, packaging_cost, shipping_cost, marketplace_fee_pct, conversion_rate, cpc, max_clicks, spend}]
+    skus: List[Dict[str, Any]]
+    daily_budget: float
+    step: Optional[float] = None
+    config: Optional[Dict[str, Any]] = None
+
+
+@router.post('/api/ads/budget')
+async def api_ads_budget(req: AdsBudgetIn):
+    try:
+        out = allocate_budget(req.skus, req.daily_budget, step=req.step, config=req.config)
+        return {'ok': True, 'result': out}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
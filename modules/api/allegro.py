@@ -0,0 +1,134 @@
+from typing import List, Dict, Any, Optional
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.container import provide
+from modules.api.responses import fast_json, project_records
+
+router = APIRouter(tags=['allegro'])
+
+analyze_discussion = lazy('modules.allegro.quality_monitor', 'analyze_discussion')
+prioritize_discussions = lazy('modules.allegro.quality_monitor', 'prioritize_discussions')
+stream_prioritized_discussions = lazy('modules.allegro.quality_monitor', 'stream_prioritized_discussions')
+update_discussion = lazy('modules.allegro.quality_monitor', 'update_discussion')
+monitor_quality_metrics = lazy('modules.allegro.quality_guard', 'monitor_quality_metrics')
+open_dispute = lazy('modules.allegro.dispute_engine', 'open_dispute')
+get_dispute = lazy('modules.allegro.dispute_engine', 'get_dispute')
+accept_resolution = lazy('modules.allegro.dispute_engine', 'accept_resolution')
+
+
+class DiscussionIn(BaseModel):
+    discussion: Dict[str, Any]
+
+
+# sync handlers below: analysis and triage block on model calls, so they run in the threadpool rather than on the event loop
+@router.post('/api/allegro/analyze_discussion')
+def api_analyze_discussion(req: DiscussionIn):
+    try:
+        out = analyze_discussion(req.discussion)
+        return {'ok': True, 'result': out}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class DiscussionsIn(BaseModel):
+    discussions: List[Dict[str, Any]]
+    workers: Optional[int] = None
+
+
+@router.post('/api/allegro/triage')
+def api_allegro_triage(req: DiscussionsIn, request: Request, fields: Optional[str] = None):
+    try:
+        out = prioritize_discussions(req.discussions, workers=req.workers)
+        return fast_json({'ok': True, 'result': project_records(out, fields)}, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/api/allegro/triage/stream')
+def api_allegro_triage_stream(req: DiscussionsIn):
+    # NDJSON: one line per discussion in completion order, so urgent items render immediately
+    lines = (json.dumps(r, ensure_ascii=False) + '\n' for r in stream_prioritized_discussions(req.discussions, workers=req.workers))
+    return StreamingResponse(lines, media_type='application/x-ndjson')
+
+
+@router.post('/api/allegro/discussion/update')
+def api_allegro_discussion_update(req: DiscussionIn):
+    try:
+        out = update_discussion(req.discussion)
+        return {'ok': True, 'result': out}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/allegro/inbox')
+async def api_allegro_inbox(limit: int = 50, inbox=Depends(provide('inbox'))):
+    return {'ok': True, 'size': len(inbox), 'top': inbox.top(limit)}
+
+
+@router.post('/api/allegro/dispute')
+def api_allegro_dispute(req: DiscussionIn):
+    # sync handler: open_dispute waits up to deadline_s for the AI answer, in the threadpool rather than on the event loop
+    try:
+        dispute_text = req.discussion.get('text') or '\n'.join(m.get('text','') for m in req.discussion.get('messages',[]))
+        order_ctx = req.discussion.get('order_context', {})
+        discussion_id = req.discussion.get('discussion_id') or req.discussion.get('id')
+        out = open_dispute(dispute_text, order_ctx, deadline_s=req.discussion.get('deadline_s'),
+                           discussion_id=str(discussion_id) if discussion_id is not None else None)
+        # top-level fields mirror the fast answer; `final` is filled in once the AI resolution lands
+        return {'ok': True, 'result': {**out['fast'], **out}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/allegro/dispute/{dispute_id}')
+async def api_allegro_dispute_status(dispute_id: str):
+    out = get_dispute(dispute_id)
+    if out is None:
+        raise HTTPException(status_code=404, detail='dispute not found')
+    return {'ok': True, 'result': out}
+
+
+class DisputeAcceptIn(BaseModel):
+    reply_text: Optional[str] = None
+    resolution: Optional[Dict[str, Any]] = None
+
+
+@router.post('/api/allegro/dispute/{dispute_id}/accept')
+async def api_allegro_dispute_accept(dispute_id: str, req: DisputeAcceptIn):
+    out = accept_resolution(dispute_id, reply_text=req.reply_text, resolution=req.resolution)
+    if not out.get('ok'):
+        raise HTTPException(status_code=404, detail=out.get('error'))
+    return out
+
+
+# Quality score for dashboard
+@router.get('/api/quality/score')
+async def api_quality_score():
+    try:
+        # O(1): rolling-window totals are maintained as events arrive
+        q = monitor_quality_metrics()
+        return {'ok': True, 'score': q['score'], 'warnings': q.get('issues', []), 'components': q.get('components')}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class QualityEventsIn(BaseModel):
+    events: List[Dict[str, Any]]
+
+
+@router.post('/api/quality/events')
+async def api_quality_events(req: QualityEventsIn, metrics=Depends(provide('quality_metrics'))):
+    try:
+        n = metrics.record_events(req.events)
+        return {'ok': True, 'recorded': n}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/quality/windows')
+async def api_quality_windows(metrics=Depends(provide('quality_metrics'))):
+    return {'ok': True, 'windows': {w: metrics.window_stats(w) for w in ('24h', '7d', '30d')}}
@@ -0,0 +1,38 @@
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from modules.api.container import provide
+
+router = APIRouter(tags=['analytics'])
+
+
+@router.get('/api/analytics/margin')
+async def api_analytics_margin(by: str = 'sku', days: Optional[int] = 30, since: Optional[str] = None, until: Optional[str] = None,
+                               top: Optional[int] = None, analytics=Depends(provide('margin_analytics'))):
+    # e.g. ?by=sku&days=30 (margin by SKU), ?by=carrier&days=7 (carrier cost share this week), ?by=hour&days=1
+    try:
+        return {'ok': True, **analytics.query(by, days=days, since=since, until=until, top=top)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class RecomputeRequest(BaseModel):
+    sku_costs: Optional[Dict[str, float]] = None
+    fee_pct: Optional[float] = None
+    carrier_shipping: Optional[Dict[str, float]] = None
+
+
+@router.post('/api/analytics/recompute')
+async def api_analytics_recompute(req: RecomputeRequest, analytics=Depends(provide('margin_analytics'))):
+    try:
+        return analytics.recompute(sku_costs=req.sku_costs, fee_pct=req.fee_pct, carrier_shipping=req.carrier_shipping)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/analytics/status')
+async def api_analytics_status(analytics=Depends(provide('margin_analytics'))):
+    return {'ok': True, 'status': analytics.status()}
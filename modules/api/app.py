@@ -0,0 +1,52 @@
+from typing import List, Optional
+import importlib
+import logging
+import os
+
+from fastapi import FastAPI
+
+from modules.api.middleware import AuthMiddleware, TracingMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Router name -> module defining `router`. Router modules only declare request models and lazy
+# handles to their subsystem, so mounting one costs little; the subsystem itself is imported on
+# the first request that reaches it.
+ROUTERS = {
+    'auth': 'modules.api.auth',
+    'repricing': 'modules.api.repricing',
+    'negotiator': 'modules.api.negotiator',
+    'orders': 'modules.api.orders',
+    'reviews': 'modules.api.reviews',
+    'logistics': 'modules.api.logistics',
+    'allegro': 'modules.api.allegro',
+    'ads': 'modules.api.ads',
+    'analytics': 'modules.api.analytics',
+    'seo': 'modules.api.seo',
+    'ops': 'modules.api.ops',
+}
+
+# API_ROUTERS=orders,logistics mounts only those (e.g. a dedicated serverless function); default all
+ENABLED_ROUTERS = [r.strip() for r in os.environ.get('API_ROUTERS', '').split(',') if r.strip()]
+
+
+def include_routers(app: FastAPI, names: Optional[List[str]] = None) -> List[str]:
+    names = names or ENABLED_ROUTERS or list(ROUTERS)
+    unknown = [n for n in names if n not in ROUTERS]
+    if unknown:
+        raise ValueError(f'unknown routers: {unknown} (known: {sorted(ROUTERS)})')
+    for name in names:
+        app.include_router(importlib.import_module(ROUTERS[name]).router)
+    return names
+
+
+def create_app(routers: Optional[List[str]] = None, auth: bool = True) -> FastAPI:
+    """The API as served by both main.py (long-running server) and api/main.py (Vercel)."""
+    app = FastAPI()
+    if auth:
+        app.add_middleware(AuthMiddleware)
+    # added last so it wraps auth too
+    app.add_middleware(TracingMiddleware)
+    app.state.routers = include_routers(app, routers)
+    logger.debug('Mounted routers: %s', app.state.routers)
+    return app
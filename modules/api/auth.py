@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from modules.security.auth import authenticate_issue_token
+
+router = APIRouter(tags=['auth'])
+
+
+class LoginIn(BaseModel):
+    email: str
+    password: str
+
+
+@router.post('/api/auth/login')
+async def api_auth_login(req: LoginIn):
+    try:
+        out = authenticate_issue_token(req.email, req.password)
+        if out.get('ok'):
+            return {'ok': True, 'token': out.get('token'), 'registered': out.get('registered', False)}
+        else:
+            return JSONResponse(status_code=401, content={'ok': False, 'error': out.get('error')})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
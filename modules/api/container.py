@@ -0,0 +1,94 @@
+from typing import Dict, Any, Callable, Optional
+import importlib
+import logging
+import threading
+
+from modules.observability.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Shared caches and clients used by the routers: name -> (module, attribute, call it?).
+# Nothing is imported until the first request that depends on the resource.
+DEFAULT_PROVIDERS: Dict[str, tuple] = {
+    'ai_handler': ('modules.ai.base', 'BaseAIHandler', True),
+    'ai_metrics': ('modules.ai.base', 'AI_METRICS', False),
+    'ai_guard': ('modules.ai.guard', 'GUARD', False),
+    'trace_collector': ('modules.observability.tracing', 'COLLECTOR', False),
+    'inbox': ('modules.allegro.quality_monitor', 'INBOX', False),
+    'quality_metrics': ('modules.allegro.quality_metrics', 'METRICS', False),
+    'dispute_library': ('modules.allegro.dispute_engine', 'LIBRARY', False),
+    'negotiation_sessions': ('modules.negotiator.sessions', 'SESSIONS', False),
+    'ads_portfolio': ('modules.ads.portfolio', 'PORTFOLIO', False),
+    'shipment_tracker': ('modules.logistics.shipment_tracker', 'TRACKER', False),
+    'event_log': ('modules.orders.event_log', 'get_log', True),
+    'margin_analytics': ('modules.finance.margin_analytics', 'ANALYTICS', False),
+    'dedup_index': ('modules.seo.dedup_index', 'get_index', True),
+    'keyword_index': ('modules.seo.keyword_index', 'get_index', True),
+}
+
+
+class Container:
+    """Process-wide registry of shared resources, created on first use.
+
+    Both apps (main.py and the serverless api/main.py) resolve the same instances through it, and
+    tests/benchmarks can swap one out with override() without patching modules.
+    """
+
+    def __init__(self, providers: Dict[str, tuple] = None):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        for name, spec in (providers or {}).items():
+            self.register(name, self._from_spec(*spec))
+
+    @staticmethod
+    def _from_spec(module: str, attr: str, call: bool) -> Callable[[], Any]:
+        def factory():
+            target = getattr(importlib.import_module(module), attr)
+            return target() if call else target
+        return factory
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f'no provider registered for {name!r}')
+                with span('container.init', resource=name):
+                    self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name: str, instance: Any):
+        with self._lock:
+            self._instances[name] = instance
+
+    def reset(self, name: Optional[str] = None):
+        """Drop cached instances (all, or one) so the next get() rebuilds them."""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def status(self) -> Dict[str, bool]:
+        with self._lock:
+            return {name: name in self._instances for name in sorted(self._factories)}
+
+
+CONTAINER = Container(DEFAULT_PROVIDERS)
+
+
+def provide(name: str) -> Callable[[], Any]:
+    """FastAPI dependency: `index = Depends(provide('keyword_index'))`."""
+    def dependency() -> Any:
+        return CONTAINER.get(name)
+    dependency.__name__ = f'provide_{name}'
+    return dependency
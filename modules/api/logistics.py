@@ -0,0 +1,83 @@
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.container import provide
+from modules.api.responses import fast_json, project_records
+
+router = APIRouter(tags=['logistics'])
+
+select_optimal_carrier = lazy('modules.logistics.carrier_manager', 'select_optimal_carrier')
+group_print_batch = lazy('modules.logistics.print_station', 'group_print_batch')
+read_events_file = lazy('modules.logistics.shipment_tracker', 'read_events_file')
+refresh_delay_notices = lazy('modules.logistics.shipment_tracker', 'refresh_delay_notices')
+resolve_import_path = lazy('modules.core.import_dir', 'resolve_import_path')
+
+
+class OptimizeRequest(BaseModel):
+    package_data: Dict[str, Any]
+    destination: Dict[str, Any]
+    carriers: Optional[List[Dict[str, Any]]] = None
+
+
+@router.post('/api/logistics/optimize')
+async def api_logistics_optimize(req: OptimizeRequest):
+    try:
+        out = select_optimal_carrier(req.package_data, req.destination, carriers=req.carriers)
+        return {'ok': True, 'result': out}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class PrintBatchRequest(BaseModel):
+    orders: List[Dict[str, Any]]
+    group_by: Optional[str] = 'carrier'
+
+
+@router.post('/api/logistics/print_batch')
+async def api_logistics_print_batch(req: PrintBatchRequest, request: Request, fields: Optional[str] = None):
+    # ?fields=label,packing_slip.packing_list is applied to every print job of every batch
+    try:
+        manifests = group_print_batch(req.orders, group_by=req.group_by or 'carrier')
+        return fast_json({'ok': True, 'manifests': project_records(manifests, fields)}, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class TrackingEventsIn(BaseModel):
+    events: Optional[List[Dict[str, Any]]] = None
+    # JSONL file name relative to IMPORT_DIR
+    path: Optional[str] = None
+
+
+@router.post('/api/logistics/tracking/events')
+async def api_logistics_tracking_events(req: TrackingEventsIn, background_tasks: BackgroundTasks, tracker=Depends(provide('shipment_tracker'))):
+    try:
+        path = resolve_import_path(req.path) if req.path else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        n = tracker.ingest_many(req.events or [])
+        if path:
+            n += tracker.ingest_many(read_events_file(path))
+        # late/stalled scan + delay notices (model calls) after the response, in the threadpool
+        background_tasks.add_task(refresh_delay_notices, tracker)
+        return {'ok': True, 'ingested': n, 'rejected_total': tracker.rejected, 'in_flight': len(tracker)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/logistics/delays')
+async def api_logistics_delays(tracker=Depends(provide('shipment_tracker'))):
+    return {'ok': True, 'in_flight': len(tracker), 'issues': tracker.issues()}
+
+
+@router.post('/api/logistics/delays/scan')
+def api_logistics_delays_scan(tracker=Depends(provide('shipment_tracker'))):
+    # for a scheduler: shipments also become late with no new tracking event. Sync handler, so the
+    # model calls for delay notices run in the threadpool rather than on the event loop.
+    try:
+        return {'ok': True, 'scan': refresh_delay_notices(tracker), 'issues': tracker.issues()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
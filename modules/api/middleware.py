@@ -0,0 +1,38 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from modules.security.auth import verify_token
+from modules.observability.tracing import trace_context, parse_traceparent, valid_trace_id
+
+# Only /api/ paths need a token (assets, login page and '/' are served without one).
+PUBLIC_API_PATHS = ('/api/auth/login', '/api/health')
+
+
+class AuthMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if path.startswith('/api/') and not path.startswith(PUBLIC_API_PATHS):
+            auth = request.headers.get('authorization') or request.headers.get('Authorization')
+            if not auth or not auth.lower().startswith('bearer '):
+                return JSONResponse(status_code=401, content={'ok': False, 'error': 'Missing token'})
+            token = auth.split(' ',1)[1]
+            v = verify_token(token)
+            if not v.get('ok'):
+                return JSONResponse(status_code=401, content={'ok': False, 'error': 'Invalid token'})
+        return await call_next(request)
+
+
+class TracingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        # continue an upstream W3C traceparent / X-Trace-Id, else start a new trace; a malformed id is
+        # ignored rather than used as a collector key and echoed back
+        trace_id, parent_id = parse_traceparent(request.headers.get('traceparent'))
+        trace_id = trace_id or valid_trace_id(request.headers.get('x-trace-id'))
+        with trace_context(trace_id, parent_id, name=f'{request.method} {request.url.path}', path=request.url.path) as sp:
+            response = await call_next(request)
+            sp.set(status_code=response.status_code)
+            trace = getattr(sp, 'trace_id', None)
+            if trace:
+                response.headers['X-Trace-Id'] = trace
+            return response
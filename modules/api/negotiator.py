@@ -0,0 +1,25 @@
+from typing import Dict, Any, Optional
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.repricing import ProductIn
+
+router = APIRouter(tags=['negotiator'])
+
+negotiate = lazy('modules.negotiator.negotiator', 'negotiate')
+
+
+class NegotiateRequest(BaseModel):
+    offer_id: str
+    client_offer: float
+    product: ProductIn
+    customer_history: Optional[Dict[str, Any]] = None
+    inventory_count: Optional[int] = 0
+    config: Optional[Dict[str, Any]] = None
+
+
+@router.post('/api/negotiate')
+async def api_negotiate(req: NegotiateRequest):
+    result = negotiate(req.offer_id, req.client_offer, req.product.dict(), req.customer_history or {}, req.inventory_count or 0, config=req.config)
+    return result
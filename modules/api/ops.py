@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from modules.core.lazy import lazy
+from modules.api.container import provide, CONTAINER
+
+router = APIRouter(tags=['ops'])
+
+token_report = lazy('modules.ai.prompt_builder', 'token_report')
+router_stats = lazy('modules.ai.router', 'router_stats')
+
+
+@router.get('/api/health')
+async def health():
+    return {'status': 'ok'}
+
+
+@router.get('/api/resources')
+async def api_resources():
+    # which shared caches/clients this process has initialised so far
+    return {'ok': True, 'resources': CONTAINER.status()}
+
+
+@router.get('/api/ai/prompt_stats')
+async def api_ai_prompt_stats():
+    return {'ok': True, 'modules': token_report()}
+
+
+@router.get('/api/ai/router_stats')
+async def api_ai_router_stats():
+    return {'ok': True, 'tiers': router_stats()}
+
+
+@router.get('/api/metrics')
+async def api_metrics(ai_metrics=Depends(provide('ai_metrics')), ai_guard=Depends(provide('ai_guard'))):
+    # Prometheus scrape target: per-call-site model latency histogram, sizes, tokens, errors/fallbacks, cache hits,
+    # breaker state per model and shed calls
+    return PlainTextResponse(ai_metrics.prometheus() + ai_guard.prometheus(), media_type='text/plain; version=0.0.4')
+
+
+@router.get('/api/ai/breakers')
+async def api_ai_breakers(ai_guard=Depends(provide('ai_guard'))):
+    return {'ok': True, **ai_guard.status()}
+
+
+@router.get('/api/ai/call_stats')
+async def api_ai_call_stats(ai_metrics=Depends(provide('ai_metrics'))):
+    return {'ok': True, 'call_sites': ai_metrics.snapshot()}
+
+
+@router.get('/api/traces/recent')
+async def api_traces_recent(limit: int = 20, collector=Depends(provide('trace_collector'))):
+    return {'ok': True, 'traces': collector.recent(limit)}
+
+
+@router.get('/api/traces/hot_paths')
+async def api_traces_hot_paths(limit: int = 20, collector=Depends(provide('trace_collector'))):
+    return {'ok': True, 'spans': collector.hot_paths(limit)}
+
+
+@router.get('/api/traces/{trace_id}')
+async def api_trace(trace_id: str, collector=Depends(provide('trace_collector'))):
+    rec = collector.get(trace_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail='trace not found')
+    return {'ok': True, 'trace': rec}
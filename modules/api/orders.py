@@ -0,0 +1,90 @@
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.container import provide
+from modules.api.responses import fast_json, project_records
+
+router = APIRouter(tags=['orders'])
+
+process_new_order = lazy('modules.orders.order_manager', 'process_new_order')
+get_dashboard_orders = lazy('modules.orders.order_manager', 'get_dashboard_orders')
+get_order = lazy('modules.orders.order_manager', 'get_order')
+get_store_stats = lazy('modules.orders.order_manager', 'get_store_stats')
+get_dedupe_stats = lazy('modules.orders.order_manager', 'get_dedupe_stats')
+replay_dashboard = lazy('modules.orders.order_manager', 'replay_dashboard')
+
+
+class OrderIn(BaseModel):
+    order: Dict[str, Any]
+
+
+@router.post('/api/orders/process')
+async def api_orders_process(req: OrderIn):
+    try:
+        summary = process_new_order(req.order)
+        return {'ok': True, 'summary': summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/orders/dashboard')
+async def api_orders_dashboard(request: Request, fields: Optional[str] = None):
+    # compact rows only; ?fields=order_id,intelligence_status.profit trims them further
+    try:
+        data = get_dashboard_orders()
+        return fast_json({'ok': True, 'orders': project_records(data, fields)}, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/orders/stats')
+async def api_orders_stats(log=Depends(provide('event_log'))):
+    return {'ok': True, 'store': get_store_stats(), 'dedupe': get_dedupe_stats(), 'events': log.status() if log else None}
+
+
+@router.get('/api/orders/events')
+async def api_orders_events(from_offset: int = 0, limit: int = 1000, types: Optional[str] = None, log=Depends(provide('event_log'))):
+    # page through the lifecycle event log; pass next_offset back as from_offset
+    if log is None:
+        raise HTTPException(status_code=503, detail='event log unavailable')
+    events = []
+    for offset, event in log.read(from_offset, types=types.split(',') if types else None):
+        events.append({'offset': offset, **event})
+        if len(events) >= limit:
+            break
+    next_offset = events[-1]['offset'] + 1 if events else max(from_offset, len(log))
+    return fast_json({'ok': True, 'events': events, 'next_offset': next_offset})
+
+
+@router.get('/api/orders/events/dashboard')
+async def api_orders_events_dashboard(request: Request, fields: Optional[str] = None, from_offset: int = 0):
+    # dashboard rows re-derived from the event log instead of the in-memory store
+    try:
+        rows = replay_dashboard(from_offset)
+        return fast_json({'ok': True, 'orders': project_records(rows, fields)}, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/orders/{order_id}')
+async def api_orders_detail(order_id: str, request: Request, fields: Optional[str] = None):
+    # full summary with raw_status, loaded from the cold store
+    try:
+        out = get_order(order_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if out is None:
+        raise HTTPException(status_code=404, detail='order not found')
+    return fast_json({'ok': True, 'order': project_records([out], fields)[0]}, request)
+
+
+@router.get('/api/orders/{order_id}/timeline')
+async def api_orders_timeline(order_id: str, log=Depends(provide('event_log'))):
+    if log is None:
+        raise HTTPException(status_code=503, detail='event log unavailable')
+    out = log.order_timeline(order_id)
+    if out is None:
+        raise HTTPException(status_code=404, detail='no events for order')
+    return fast_json({'ok': True, 'timeline': out})
@@ -0,0 +1,130 @@
+from typing import List, Dict, Any, Optional
+import os
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.container import provide
+
+router = APIRouter(tags=['repricing'])
+
+MODEL_NAME = os.environ.get('LM_MODEL', 'models/gemini-3-pro-preview')
+
+build_prompt = lazy('modules.ai.prompt_builder', 'build_prompt')
+compute_new_price = lazy('modules.repricing.repricer', 'compute_new_price')
+fetch_competitor_prices = lazy('modules.repricing.repricer', 'fetch_competitor_prices')
+enforce_margin_or_adjust = lazy('modules.repricing.repricer', 'enforce_margin_or_adjust')
+record_fallback = lazy('modules.ai.base', 'record_fallback')
+
+
+class ProductIn(BaseModel):
+    id: str
+    sku: Optional[str]
+    price: float
+    cost: float
+    our_lead_time_days: Optional[float] = 1
+    our_rating: Optional[float] = 5.0
+
+
+class CompetitorIn(BaseModel):
+    seller: str
+    price: float
+    lead_time_days: Optional[float] = 5
+    rating: Optional[float] = 4.5
+
+
+class RepriceRequest(BaseModel):
+    product: ProductIn
+    competitors: Optional[List[CompetitorIn]] = None
+    competitor_sources: Optional[List[Dict[str, Any]]] = None
+    config: Optional[Dict[str, Any]] = None
+
+
+def send_to_model(ai: Any, prompt: Any, model_name: str = MODEL_NAME) -> Dict[str, Any]:
+    """Call the configured LM (Gemini) through the shared handler; errors come back as ok=False."""
+    try:
+        return ai.generate(prompt, model=model_name, response_mime_type='application/json')
+    except Exception as e:
+        return {'ok': False, 'error': str(e), 'model': model_name}
+
+
+@router.post('/api/reprice')
+async def reprice(req: RepriceRequest):
+    # get competitor prices either from payload or by fetching sources
+    competitors = []
+    if req.competitors:
+        competitors = [c.dict() for c in req.competitors]
+    elif req.competitor_sources:
+        competitors = fetch_competitor_prices(req.competitor_sources)
+
+    product = req.product.dict()
+    result = compute_new_price(product, competitors, config=req.config)
+    return result
+
+
+@router.post('/api/reprice_with_model')
+async def reprice_with_model(req: RepriceRequest, ai=Depends(provide('ai_handler'))):
+    # build a prompt for the model
+    competitors = [c.dict() for c in req.competitors] if req.competitors else fetch_competitor_prices(req.competitor_sources or [])
+    prompt = build_prompt('repricing', {'product': req.product.dict(), 'competitors': competitors, 'config': req.config or {}})
+
+    # Call the LM (Gemini)
+    lm_resp = send_to_model(ai, prompt, MODEL_NAME)
+
+    # Also compute deterministic recommendation
+    deterministic = compute_new_price(req.product.dict(), competitors, config=req.config)
+
+    return {
+        'lm': lm_resp,
+        'deterministic': deterministic
+    }
+
+
+@router.post('/api/execute_repricing')
+async def execute_repricing(req: RepriceRequest, ai=Depends(provide('ai_handler'))):
+    # 1) gather competitors
+    competitors = [c.dict() for c in req.competitors] if req.competitors else fetch_competitor_prices(req.competitor_sources or [])
+
+    # 2) deterministic baseline
+    deterministic = compute_new_price(req.product.dict(), competitors, config=req.config)
+
+    # 3) prepare prompt for Gemini including competitor data (static prefix is compiled once)
+    prompt = build_prompt('repricing', {'product': req.product.dict(), 'competitors': competitors, 'config': req.config or {}})
+
+    # 4) ask model
+    lm_resp = send_to_model(ai, prompt, MODEL_NAME)
+
+    # 5) parse model suggestion
+    suggested_price = None
+    if lm_resp.get('ok') and isinstance(lm_resp.get('response'), dict):
+        suggested_price = lm_resp['response'].get('new_price')
+    if suggested_price is None:
+        # the deterministic price is the candidate
+        record_fallback('repricing')
+
+    # 6) enforce margin using calculator
+    final = {
+        'deterministic': deterministic,
+        'lm': lm_resp,
+        'final_price': None,
+        'final_reason': None,
+        'margin_ok': None
+    }
+
+    # prefer model suggestion if safe
+    candidate = deterministic['new_price']
+    if suggested_price is not None:
+        candidate = float(suggested_price)
+
+    enforcement = enforce_margin_or_adjust(candidate, req.product.dict(), config=req.config)
+    final['final_price'] = enforcement['safe_price']
+    final['margin_ok'] = enforcement['ok']
+    final['final_reason'] = f"chosen_candidate={candidate}; margin={enforcement['margin']}"
+
+    # if margin not ok and deterministic differs, fallback to deterministic safe price
+    if not enforcement['ok'] and deterministic.get('new_price') is not None:
+        fallback_enf = enforce_margin_or_adjust(deterministic['new_price'], req.product.dict(), config=req.config)
+        final['final_price'] = fallback_enf['safe_price']
+        final['final_reason'] += f"; fallback_to_deterministic={fallback_enf['safe_price']}"
+
+    return final
@@ -0,0 +1,99 @@
+from typing import Dict, Any, List, Optional
+import gzip
+import json
+import logging
+import os
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# bodies smaller than this are sent uncompressed (headers + CPU cost more than they save)
+COMPRESS_MIN_BYTES = int(os.environ.get('JSON_COMPRESS_MIN_BYTES', 4096))
+GZIP_LEVEL = int(os.environ.get('JSON_GZIP_LEVEL', 5))
+BROTLI_QUALITY = int(os.environ.get('JSON_BROTLI_QUALITY', 4))
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize plain dict/list payloads straight to JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[List[str]]]:
+    """'order_id,intelligence_status.profit' -> [['order_id'], ['intelligence_status', 'profit']]"""
+    if not fields:
+        return None
+    paths = [f.strip().split('.') for f in fields.split(',') if f.strip()]
+    return paths or None
+
+
+def project(record: Any, paths: List[List[str]]) -> Any:
+    """Keep only the given (dotted) fields of a record; missing fields are left out."""
+    if not isinstance(record, dict):
+        return record
+    out: Dict[str, Any] = {}
+    for path in paths:
+        src, dst = record, out
+        for i, key in enumerate(path):
+            if not isinstance(src, dict) or key not in src:
+                break
+            if i == len(path) - 1:
+                dst[key] = src[key]
+            else:
+                src = src[key]
+                dst = dst.setdefault(key, {})
+    return out
+
+
+def project_records(records: Any, fields: Optional[str]) -> Any:
+    """Apply ?fields= to a list of records, or to every list in a {group: [records]} mapping."""
+    paths = parse_fields(fields)
+    if paths is None:
+        return records
+    if isinstance(records, list):
+        return [project(r, paths) for r in records]
+    if isinstance(records, dict):
+        return {k: [project(r, paths) for r in v] if isinstance(v, list) else v for k, v in records.items()}
+    return records
+
+
+def _encoding(request: Optional[Request]) -> Optional[str]:
+    accepted = (request.headers.get('accept-encoding') or '').lower() if request is not None else ''
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def fast_json(content: Any, request: Optional[Request] = None, status_code: int = 200) -> Response:
+    """JSON response for large payloads, bypassing FastAPI's jsonable_encoder pass.
+
+    `content` must already be plain JSON-able data (dicts/lists/str/numbers, datetimes are fine).
+    The body is gzip/brotli-compressed when the client accepts it and it is large enough.
+    """
+    body = dumps(content)
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = _encoding(request) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, status_code=status_code, media_type='application/json', headers=headers)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+
+from modules.core.lazy import lazy
+from modules.api.orders import OrderIn
+
+router = APIRouter(tags=['reviews'])
+
+enqueue_review_on_delivery = lazy('modules.orders.review_manager', 'enqueue_review_on_delivery')
+run_due_reviews = lazy('modules.orders.review_manager', 'run_due_reviews')
+get_pending_reviews = lazy('modules.orders.review_manager', 'get_pending_reviews')
+
+
+@router.post('/api/orders/mark_delivered')
+async def api_orders_mark_delivered(req: OrderIn):
+    try:
+        summary = enqueue_review_on_delivery(req.order)
+        return {'ok': True, 'summary': summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/reviews/pending')
+async def api_reviews_pending():
+    try:
+        data = get_pending_reviews()
+        return {'ok': True, 'pending': data}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/api/reviews/run_pending')
+async def api_reviews_run_pending():
+    try:
+        res = run_due_reviews()
+        return {'ok': True, 'result': res}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,115 @@
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from modules.core.lazy import lazy
+from modules.api.container import provide
+
+router = APIRouter(tags=['seo'])
+
+start_job = lazy('modules.seo.bulk_jobs', 'start_job')
+get_job = lazy('modules.seo.bulk_jobs', 'get_job')
+resume_job = lazy('modules.seo.bulk_jobs', 'resume_job')
+read_feed = lazy('modules.seo.bulk_jobs', 'read_feed')
+listing_text = lazy('modules.seo.dedup_index', 'listing_text')
+resolve_import_path = lazy('modules.core.import_dir', 'resolve_import_path')
+
+
+class SeoJobIn(BaseModel):
+    products: Optional[List[Dict[str, Any]]] = None
+    # JSONL / JSON feed file name relative to IMPORT_DIR
+    feed_path: Optional[str] = None
+    chunk_size: Optional[int] = None
+    workers: Optional[int] = None
+    rate_per_s: Optional[float] = None
+    max_retries: Optional[int] = None
+
+
+@router.post('/api/seo/jobs')
+async def api_seo_jobs_start(req: SeoJobIn):
+    if not req.products and not req.feed_path:
+        raise HTTPException(status_code=400, detail='products or feed_path required')
+    try:
+        feed_path = None if req.products else resolve_import_path(req.feed_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        feed = req.products if req.products else read_feed(feed_path)
+        job = start_job(feed, chunk_size=req.chunk_size, workers=req.workers, rate_per_s=req.rate_per_s, max_retries=req.max_retries)
+        return {'ok': True, 'job': job.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/api/seo/jobs/{job_id}')
+async def api_seo_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='job not found')
+    return {'ok': True, 'job': job.stats()}
+
+
+@router.post('/api/seo/jobs/{job_id}/resume')
+async def api_seo_job_resume(job_id: str):
+    job = resume_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='job not found')
+    return {'ok': True, 'job': job.stats()}
+
+
+@router.get('/api/seo/jobs/{job_id}/results')
+def api_seo_job_results(job_id: str, offset: int = 0):
+    # JSONL of finished items; poll again with offset=<lines received> for more
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='job not found')
+    return StreamingResponse(job.iter_results(offset), media_type='application/x-ndjson')
+
+
+class ListingsIn(BaseModel):
+    listings: List[Dict[str, Any]]
+
+
+@router.post('/api/seo/dedup/index')
+async def api_seo_dedup_index(req: ListingsIn, index=Depends(provide('dedup_index'))):
+    # add existing catalogue listings ({id, title, description|html_description}) to the near-duplicate index
+    try:
+        added = index.add_many((str(l.get('id') or l.get('listing_id')), listing_text(l)) for l in req.listings)
+        # listings with fewer words than one shingle have no signature and are not indexed
+        return {'ok': True, 'added': added, 'skipped': len(req.listings) - added, 'size': len(index)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/api/seo/dedup/check')
+async def api_seo_dedup_check(req: ListingsIn, index=Depends(provide('dedup_index'))):
+    return {'ok': True, 'result': [{'id': l.get('id'), 'matches': index.query(listing_text(l), exclude=[str(l.get('id'))])[:5]} for l in req.listings]}
+
+
+@router.get('/api/seo/keywords/search')
+async def api_seo_keywords_search(q: str, limit: int = 100, index=Depends(provide('keyword_index'))):
+    # boolean/prefix query over indexed listings, e.g. `sluchaw* bluetooth -przewodow`, `"sluchawki bluetooth"`
+    return {'ok': True, 'query': q, **index.search(q, limit=limit)}
+
+
+@router.get('/api/seo/keywords/cannibalization')
+async def api_seo_keywords_cannibalization(min_listings: int = 2, limit: int = 100, index=Depends(provide('keyword_index'))):
+    return {'ok': True, 'keywords': index.cannibalization(min_listings=min_listings, limit=limit)}
+
+
+@router.post('/api/seo/keywords/index')
+async def api_seo_keywords_index(req: ListingsIn, index=Depends(provide('keyword_index'))):
+    try:
+        added = index.add_many((str(l.get('id') or l.get('listing_id')), l) for l in req.listings)
+        return {'ok': True, 'added': added, 'size': len(index)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/api/seo/keywords/save')
+async def api_seo_keywords_save(index=Depends(provide('keyword_index'))):
+    try:
+        return {'ok': True, **index.save()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,24 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Server-side files the API may read (tracking event dumps, product feeds). Unset = file imports off.
+IMPORT_DIR = os.environ.get('IMPORT_DIR')
+
+
+def resolve_import_path(name: str) -> str:
+    """Absolute path of `name` inside IMPORT_DIR; raises ValueError for anything outside it.
+
+    Symlinks and `..` are resolved before the check, so a request cannot reach other files.
+    """
+    if not IMPORT_DIR:
+        raise ValueError('file imports are disabled (set IMPORT_DIR)')
+    root = os.path.realpath(IMPORT_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if path == root or os.path.commonpath([root, path]) != root:
+        logger.warning('Rejected import path outside IMPORT_DIR: %s', name)
+        raise ValueError('path must be a file inside IMPORT_DIR')
+    if not os.path.isfile(path):
+        raise ValueError(f'no such file in IMPORT_DIR: {name}')
+    return path
@@ -0,0 +1,54 @@
+from typing import Any
+import importlib
+import logging
+
+from modules.observability.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class LazyAttr:
+    """Stand-in for `from module import name` that imports the module on first use.
+
+    Calling the proxy calls the target; attribute access (INBOX.top, METRICS.record_events, ...)
+    is forwarded. The import runs at most once per process and shows up as an 'import' span in
+    the trace of the request that paid for it.
+    """
+    __slots__ = ('_module', '_attr', '_target')
+
+    def __init__(self, module: str, attr: str = None):
+        self._module = module
+        self._attr = attr
+        self._target = _UNSET
+
+    def resolve(self) -> Any:
+        target = self._target
+        if target is _UNSET:
+            with span('import', module=self._module, lazy=True):
+                mod = importlib.import_module(self._module)
+                target = getattr(mod, self._attr) if self._attr else mod
+            self._target = target
+        return target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not _UNSET
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __len__(self) -> int:
+        return len(self.resolve())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<lazy {self._module}.{self._attr or ""} ({state})>'
+
+
+def lazy(module: str, attr: str = None) -> LazyAttr:
+    return LazyAttr(module, attr)
@@ -0,0 +1,399 @@
+from typing import Dict, Any, List, Optional, Tuple
+from array import array
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_NP: Any = None  # numpy, imported on the first recompute (False = not installed)
+
+
+def _load_numpy() -> Any:
+    global _NP
+    if _NP is None:
+        try:
+            import numpy as np
+        except Exception:  # optional: pure-python recompute
+            np = False
+        _NP = np
+    return _NP or None
+
+
+DEFAULT_FEE_PCT = 0.15   # same default as the workflow's finance step
+DEFAULT_DAYS = int(os.environ.get('MARGIN_ANALYTICS_DEFAULT_DAYS', 30))
+
+MEASURES = ('orders', 'units', 'revenue', 'product_cost', 'shipping', 'fees', 'ads', 'packaging')
+_ORDERS, _UNITS, _REVENUE, _COST, _SHIPPING, _FEES, _ADS, _PACKAGING = range(len(MEASURES))
+DIMENSIONS = ('sku', 'carrier', 'day', 'hour')
+_DAY, _HOUR = 86400, 3600
+SPANS = (1, 7)   # SKU/carrier cubes are kept per day and per 7-day block (aligned to epoch days)
+
+
+def _to_ts(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _num(v: Any, default: float = 0.0) -> float:
+    try:
+        return float(v) if v is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _day_label(day: int) -> str:
+    return datetime.fromtimestamp(day * _DAY, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _hour_label(hour: int) -> str:
+    return datetime.fromtimestamp(hour * _HOUR, tz=timezone.utc).strftime('%Y-%m-%dT%H:00')
+
+
+def _parse_day(value: Any) -> Optional[int]:
+    ts = _to_ts(value)
+    return None if ts is None else int(ts // _DAY)
+
+
+class MarginAnalytics:
+    """Margin rollups over processed orders.
+
+    Every order line is kept as a row of typed-array columns (the raw fact table) and added to the
+    cubes: totals per day and per hour, and per SKU and per carrier for every day and 7-day block.
+    Queries sum the buckets covering the requested range (whole blocks plus the days at its edges),
+    so their cost depends on the number of buckets, not orders.
+    Order-level amounts (total, shipping, marketplace fee, ads, packaging) are spread over the
+    lines by revenue share, so SKU margins add up to the order margin the finance step computes.
+    Recording a new revision of an order withdraws the previous revision's lines from the cubes
+    (they stay in the fact table as dead rows until the next recompute compacts it).
+    recompute() re-derives costs from the fact table (numpy when installed) and rebuilds the cubes.
+    """
+
+    _COLUMNS = (('ts', 'd'), ('sku', 'I'), ('carrier', 'H'), ('first', 'B'), ('live', 'B'), ('weight', 'd'), ('units', 'd'),
+                ('revenue', 'd'), ('product_cost', 'd'), ('shipping', 'd'), ('fees', 'd'), ('ads', 'd'), ('packaging', 'd'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._skus: List[str] = []
+        self._sku_codes: Dict[str, int] = {}
+        self._carriers: List[Optional[str]] = [None]
+        self._carrier_codes: Dict[str, int] = {}
+        self.stats = {'orders': 0, 'revisions': 0, 'dead_lines': 0, 'recomputes': 0, 'last_recompute': None}
+        self._orders: Dict[str, Tuple[int, int]] = {}   # order_id -> (first fact row, line count) of its latest revision
+        self._reset_facts()
+        self._reset_cubes()
+
+    def _reset_facts(self):
+        self.facts: Dict[str, array] = {name: array(code) for name, code in self._COLUMNS}
+
+    def _reset_cubes(self):
+        self._by_day: Dict[int, List[float]] = {}
+        self._by_hour: Dict[int, List[float]] = {}
+        # dimension -> span in days -> block -> code -> measures
+        self._keyed: Dict[str, Dict[int, Dict[int, Dict[int, List[float]]]]] = {'sku': {s: {} for s in SPANS}, 'carrier': {s: {} for s in SPANS}}
+
+    def _sku(self, sku: str) -> int:
+        code = self._sku_codes.get(sku)
+        if code is None:
+            code = self._sku_codes[sku] = len(self._skus)
+            self._skus.append(sku)
+        return code
+
+    def _carrier(self, name: Optional[str]) -> int:
+        if name is None:
+            return 0
+        code = self._carrier_codes.get(name)
+        if code is None:
+            code = self._carrier_codes[name] = len(self._carriers)
+            self._carriers.append(name)
+        return code
+
+    # --- ingest ----------------------------------------------------------------
+
+    @staticmethod
+    def _lines(order_data: Dict[str, Any], status: Optional[Dict[str, Any]]) -> Tuple[float, Optional[str], List[Tuple]]:
+        """(ts, carrier, [(sku, weight, units, revenue, product_cost, shipping, fees, ads, packaging)])"""
+        steps = (status or {}).get('steps') or {}
+        carrier = (((steps.get('logistics') or {}).get('result') or {}).get('carrier') or {})
+        total = _num(order_data.get('total_price') or (order_data.get('summary') or {}).get('totalToPay', {}).get('amount'))
+        # as in the finance step: the order's own shipping cost, 0 when missing (see recompute(carrier_shipping=...))
+        shipping = _num(order_data.get('shipping_cost'))
+        fees = total * _num(order_data.get('marketplace_fee_pct'), DEFAULT_FEE_PCT)
+        ads = _num(order_data.get('ads_cost'))
+        packaging = _num(order_data.get('packaging_cost'))
+        ts = _to_ts(order_data.get('created_at') or order_data.get('boughtAt') or order_data.get('ts')) or time.time()
+
+        items = order_data.get('items') or [{}]
+        gross = [_num(it.get('price')) * _num(it.get('qty'), 1) for it in items]
+        basis = sum(gross)
+        weights = [g / basis for g in gross] if basis > 0 else [1.0 / len(items)] * len(items)
+        lines = []
+        for it, w in zip(items, weights):
+            sku = str(it.get('sku') or it.get('id') or it.get('product_id') or '(none)')
+            units = _num(it.get('qty'), 1)
+            lines.append((sku, w, units, total * w, _num(it.get('cost')) * units, shipping * w, fees * w, ads * w, packaging * w))
+        return ts, carrier.get('carrier_name'), lines
+
+    def record(self, order_data: Dict[str, Any], status: Dict[str, Any] = None) -> int:
+        """Add one processed order (order data + process_order_flow status); returns lines added.
+
+        An order_id seen before replaces that order's previous lines instead of adding to them.
+        """
+        ts, carrier_name, lines = self._lines(order_data, status)
+        order_id = order_data.get('order_id') or order_data.get('id') or order_data.get('orderId')
+        with self._lock:
+            carrier = self._carrier(carrier_name)
+            f = self.facts
+            previous = self._orders.get(str(order_id)) if order_id is not None else None
+            if previous is not None:
+                self._withdraw(*previous)
+                self.stats['revisions'] += 1
+            else:
+                self.stats['orders'] += 1
+            start = len(f['ts'])
+            for i, (sku, w, units, revenue, cost, shipping, fees, ads, packaging) in enumerate(lines):
+                code = self._sku(sku)
+                for name, v in (('ts', ts), ('sku', code), ('carrier', carrier), ('first', int(i == 0)), ('live', 1), ('weight', w),
+                                ('units', units), ('revenue', revenue), ('product_cost', cost), ('shipping', shipping), ('fees', fees),
+                                ('ads', ads), ('packaging', packaging)):
+                    f[name].append(v)
+                self._add(ts, code, carrier, (int(i == 0), units, revenue, cost, shipping, fees, ads, packaging))
+            if order_id is not None:
+                self._orders[str(order_id)] = (start, len(lines))
+        return len(lines)
+
+    def _withdraw(self, start: int, count: int):
+        """Take a recorded revision's lines back out of the cubes and mark them dead."""
+        f = self.facts
+        for i in range(start, start + count):
+            self._add(f['ts'][i], f['sku'][i], f['carrier'][i],
+                      (f['first'][i], f['units'][i], f['revenue'][i], f['product_cost'][i], f['shipping'][i], f['fees'][i], f['ads'][i], f['packaging'][i]),
+                      sign=-1.0)
+            f['live'][i] = 0
+        self.stats['dead_lines'] += count
+
+    @staticmethod
+    def _bump(cube: Dict[int, List[float]], key: int, vec: Tuple, sign: float):
+        bucket = cube.get(key)
+        if bucket is None:
+            bucket = cube[key] = [0.0] * len(MEASURES)
+        for k, v in enumerate(vec):
+            bucket[k] += sign * v
+        if sign < 0 and bucket[_ORDERS] < 0.5:
+            # the bucket's last order was withdrawn
+            del cube[key]
+
+    def _add(self, ts: float, sku: int, carrier: int, vec: Tuple, sign: float = 1.0):
+        day, hour = int(ts // _DAY), int(ts // _HOUR)
+        self._bump(self._by_day, day, vec, sign)
+        self._bump(self._by_hour, hour, vec, sign)
+        # per SKU, every line counts as an order containing the SKU
+        line = (1,) + tuple(vec[_UNITS:])
+        for dim, code, v in (('carrier', carrier, vec), ('sku', sku, line)):
+            for s in SPANS:
+                blocks = self._keyed[dim][s]
+                block = blocks.get(day // s)
+                if block is None:
+                    block = blocks[day // s] = {}
+                self._bump(block, code, v, sign)
+                if not block:
+                    del blocks[day // s]
+
+    @staticmethod
+    def _blocks(first: int, last: int):
+        """(span, block) pairs covering days first..last with as few buckets as possible."""
+        d = first
+        while d <= last:
+            for s in reversed(SPANS):
+                if d % s == 0 and d + s - 1 <= last:
+                    yield s, d // s
+                    d += s
+                    break
+
+    # --- queries ---------------------------------------------------------------
+
+    def _day_range(self, days: Optional[int], since: Any, until: Any) -> Optional[Tuple[int, int]]:
+        if days is None and since is None and until is None:
+            return None
+        last = _parse_day(until) if until is not None else int(time.time() // _DAY)
+        first = _parse_day(since) if since is not None else (last - days + 1 if days else min(self._by_day, default=last))
+        return first, last
+
+    @staticmethod
+    def _row(key: Any, m: List[float]) -> Dict[str, Any]:
+        revenue = m[_REVENUE]
+        profit = revenue - m[_COST] - m[_SHIPPING] - m[_FEES] - m[_ADS] - m[_PACKAGING]
+        out = {'key': key, **{name: round(m[k], 2) for k, name in enumerate(MEASURES)}}
+        out['orders'] = int(m[_ORDERS])
+        out['profit'] = round(profit, 2)
+        out['margin'] = round(profit / revenue, 4) if revenue else None
+        out['shipping_pct'] = round(m[_SHIPPING] / revenue, 4) if revenue else None
+        return out
+
+    def query(self, by: str = 'sku', days: Optional[int] = DEFAULT_DAYS, since: Any = None, until: Any = None,
+              top: Optional[int] = None) -> Dict[str, Any]:
+        """Rollup rows for one dimension over a day range (last `days` days, or since/until dates).
+
+        sku/carrier rows are sorted by profit (carrier rows carry their share of shipping spend);
+        day/hour rows are in time order. Cost is O(buckets covering the range x keys per bucket).
+        """
+        if by not in DIMENSIONS:
+            raise ValueError(f'unknown dimension {by!r} (known: {DIMENSIONS})')
+        with self._lock:
+            rng = self._day_range(days, since, until)
+            if by in ('day', 'hour'):
+                cube = self._by_day if by == 'day' else self._by_hour
+                if rng is None:
+                    keys = sorted(cube)
+                elif by == 'day':
+                    keys = [d for d in range(rng[0], rng[1] + 1) if d in cube]
+                else:
+                    keys = [h for h in range(rng[0] * 24, (rng[1] + 1) * 24) if h in cube]
+                label = _day_label if by == 'day' else _hour_label
+                rows = [self._row(label(k), cube[k]) for k in keys]
+            else:
+                cubes = self._keyed[by]
+                names = self._skus if by == 'sku' else self._carriers
+                if rng is None:
+                    blocks = [(SPANS[-1], b) for b in cubes[SPANS[-1]]]
+                else:
+                    blocks = [(s, b) for s, b in self._blocks(*rng) if b in cubes[s]]
+                acc: Dict[int, List[float]] = {}
+                for s, b in blocks:
+                    for code, m in cubes[s][b].items():
+                        a = acc.get(code)
+                        if a is None:
+                            acc[code] = list(m)
+                        else:
+                            for k, v in enumerate(m):
+                                a[k] += v
+                rows = [self._row(names[code], m) for code, m in acc.items()]
+                if by == 'carrier':
+                    total_shipping = sum(r['shipping'] for r in rows)
+                    for r in rows:
+                        r['cost_share'] = round(r['shipping'] / total_shipping, 4) if total_shipping else None
+                rows.sort(key=lambda r: r['profit'], reverse=True)
+        if top:
+            rows = rows[:top]
+        return {'by': by, 'from': _day_label(rng[0]) if rng else None, 'to': _day_label(rng[1]) if rng else None, 'rows': rows}
+
+    # --- recompute -------------------------------------------------------------
+
+    def recompute(self, sku_costs: Dict[str, float] = None, fee_pct: float = None, carrier_shipping: Dict[str, float] = None) -> Dict[str, Any]:
+        """Apply new cost data to every stored line and rebuild the cubes.
+
+        sku_costs: SKU -> unit cost; fee_pct: marketplace fee for all orders; carrier_shipping:
+        carrier name -> shipping cost per order. Orders recorded later carry their own costs.
+        """
+        start = time.perf_counter()
+        np = _load_numpy()
+        with self._lock:
+            if self.stats['dead_lines']:
+                self._compact()
+            f = self.facts
+            n = len(f['ts'])
+            if np is not None:
+                self._recompute_np(np, sku_costs, fee_pct, carrier_shipping)
+            else:
+                unit = {self._sku_codes[s]: float(c) for s, c in (sku_costs or {}).items() if s in self._sku_codes}
+                rate = {self._carrier_codes[c]: float(r) for c, r in (carrier_shipping or {}).items() if c in self._carrier_codes}
+                for i in range(n):
+                    if f['sku'][i] in unit:
+                        f['product_cost'][i] = unit[f['sku'][i]] * f['units'][i]
+                    if fee_pct is not None:
+                        f['fees'][i] = f['revenue'][i] * fee_pct
+                    if f['carrier'][i] in rate:
+                        f['shipping'][i] = rate[f['carrier'][i]] * f['weight'][i]
+                self._reset_cubes()
+                for i in range(n):
+                    self._add(f['ts'][i], f['sku'][i], f['carrier'][i],
+                              (f['first'][i], f['units'][i], f['revenue'][i], f['product_cost'][i], f['shipping'][i], f['fees'][i], f['ads'][i], f['packaging'][i]))
+            self.stats['recomputes'] += 1
+            self.stats['last_recompute'] = time.time()
+        return {'ok': True, 'lines': n, 'vectorized': np is not None, 'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+    def _compact(self):
+        """Drop the dead rows left by replaced revisions and renumber the order index."""
+        f = self.facts
+        live = f['live']
+        before = array('I', bytes(4 * len(live)))   # live rows ahead of each row = its new position
+        kept = 0
+        for i in range(len(live)):
+            before[i] = kept
+            kept += live[i]
+        keep = [i for i in range(len(live)) if live[i]]
+        self.facts = {name: array(code, (f[name][i] for i in keep)) for name, code in self._COLUMNS}
+        self._orders = {oid: (before[start], count) for oid, (start, count) in self._orders.items()}
+        self.stats['dead_lines'] = 0
+
+    def _recompute_np(self, np, sku_costs, fee_pct, carrier_shipping):
+        f = self.facts
+        col = {name: np.array(f[name], dtype=np.float64) for name, _ in self._COLUMNS}
+        sku = col['sku'].astype(np.int64)
+        carrier = col['carrier'].astype(np.int64)
+        if sku_costs:
+            unit = np.full(len(self._skus), np.nan)
+            for s, c in sku_costs.items():
+                if s in self._sku_codes:
+                    unit[self._sku_codes[s]] = float(c)
+            u = unit[sku]
+            col['product_cost'] = np.where(np.isnan(u), col['product_cost'], u * col['units'])
+        if fee_pct is not None:
+            col['fees'] = col['revenue'] * float(fee_pct)
+        if carrier_shipping:
+            rate = np.full(len(self._carriers), np.nan)
+            for c, r in carrier_shipping.items():
+                if c in self._carrier_codes:
+                    rate[self._carrier_codes[c]] = float(r)
+            r = rate[carrier]
+            col['shipping'] = np.where(np.isnan(r), col['shipping'], r * col['weight'])
+        for name in ('product_cost', 'fees', 'shipping'):
+            f[name] = array('d', col[name].tobytes())
+
+        day = (col['ts'] // _DAY).astype(np.int64)
+        hour = (col['ts'] // _HOUR).astype(np.int64)
+        vec = np.stack([col['first'], col['units'], col['revenue'], col['product_cost'], col['shipping'], col['fees'], col['ads'], col['packaging']])
+        per_line = vec.copy()
+        per_line[_ORDERS] = 1.0
+
+        def rollup(keys, values):
+            uniq, inv = np.unique(keys, return_inverse=True)
+            sums = np.stack([np.bincount(inv, weights=v, minlength=len(uniq)) for v in values], axis=1)
+            return uniq.tolist(), sums.tolist()
+
+        self._reset_cubes()
+        for cube, keys in ((self._by_day, day), (self._by_hour, hour)):
+            uniq, sums = rollup(keys, vec)
+            cube.update(zip(uniq, sums))
+        for dim, codes, values, width in (('sku', sku, per_line, len(self._skus)), ('carrier', carrier, vec, len(self._carriers))):
+            for s in SPANS:
+                cube = self._keyed[dim][s]
+                uniq, sums = rollup((day // s) * width + codes, values)
+                for key, m in zip(uniq, sums):
+                    cube.setdefault(key // width, {})[key % width] = m
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'lines': len(self.facts['ts']) - self.stats['dead_lines'], 'skus': len(self._skus), 'carriers': len(self._carriers) - 1,
+                    'day_buckets': len(self._by_day), 'hour_buckets': len(self._by_hour),
+                    **{f'{dim}_buckets': sum(len(v) for s in SPANS for v in self._keyed[dim][s].values()) for dim in self._keyed}}
+
+
+ANALYTICS = MarginAnalytics()
+
+
+def record_order(order_data: Dict[str, Any], status: Dict[str, Any] = None) -> int:
+    """Best-effort: analytics never fail order processing."""
+    try:
+        return ANALYTICS.record(order_data, status)
+    except Exception:
+        logger.exception('Margin analytics failed for order %s', order_data.get('order_id'))
+        return 0
@@ -1,5 +1,6 @@
 from typing import Dict, Any
 from modules.ai.base import BaseAIHandler
+from modules.ai.prompt_builder import build_prompt
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,7 @@ class InventoryAIHandler(BaseAIHandler):
             'lead_time_days': lead_time_days,
             'extra_context': extra_context or {}
         }
-        prompt = f"Predict stock depletion for product and consider seasonality/external events. Return JSON with predicted_depletion_date, days_to_depletion, risk, rationale.\nInput:\n{ctx}"
+        prompt = build_prompt('inventory', ctx)
         resp = self.generate(prompt)
         if not resp.get('ok'):
             logger.error('Inventory AI predict error: %s', resp.get('error'))
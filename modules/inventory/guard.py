@@ -2,6 +2,7 @@ from typing import Dict, Any, List
 import logging
 from datetime import datetime, timedelta
 
+from modules.ai.base import record_fallback
 from modules.inventory.ai_inventory_handler import InventoryAIHandler
 from modules.repricing.repricer import compute_new_price, enforce_margin_or_adjust
 from modules.finance.calculator import calculate_margin
@@ -18,6 +19,8 @@ def predict_stock_health(product_id: str, sales_history: List[Dict[str, Any]], l
     handler = InventoryAIHandler()
     ai_resp = handler.predict_stock(product_id, sales_history, lead_time_days, extra_context={'product': product})
     if not ai_resp.get('ok'):
+        # no prediction: no price / SEO action is taken for this product
+        record_fallback('inventory')
         return {'ok': False, 'error': ai_resp.get('error')}
 
     pred = ai_resp.get('prediction') or {}
@@ -74,6 +77,9 @@ def generate_restock_list(products: List[Dict[str, Any]]) -> List[Dict[str, Any]
 
         ai_resp = handler.predict_stock(product_id, sales_history, lead_time, extra_context={'product': p})
         pred = ai_resp.get('prediction') if ai_resp.get('ok') else {}
+        if not ai_resp.get('ok'):
+            # velocity-based reorder quantity only
+            record_fallback('inventory')
 
         # estimate average daily velocity
         try:
@@ -1,11 +1,21 @@
 from typing import Dict, Any, List
 import logging
-from modules.ai.base import BaseAIHandler
+from modules.ai.base import BaseAIHandler, record_fallback
+from modules.ai.prompt_builder import build_prompt
+from modules.ai.router import route_generate
 
 logger = logging.getLogger(__name__)
 
 
-_ai = BaseAIHandler()
+_ai = None
+
+
+def _get_ai() -> BaseAIHandler:
+    # created on first use, not at import
+    global _ai
+    if _ai is None:
+        _ai = BaseAIHandler()
+    return _ai
 
 
 def select_optimal_carrier(package_data: Dict[str, Any], destination: Dict[str, Any], carriers: List[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -29,14 +39,15 @@ def select_optimal_carrier(package_data: Dict[str, Any], destination: Dict[str,
     value = float(package_data.get('value', 0))
 
     # try to ask AI for recommendation (non-blocking fallback)
-    ai_prompt = f"Select optimal carrier for package {package_data} to {destination}. Available carriers: {carriers}. Return JSON with keys: carrier, cost, lead_time, reason." 
-    ai_resp = _ai.generate(ai_prompt)
+    ai_prompt = build_prompt('carrier', {'package': package_data, 'destination': destination, 'carriers': carriers})
+    ai_resp = route_generate(_get_ai(), 'carrier', ai_prompt)
     if ai_resp.get('ok') and isinstance(ai_resp.get('response'), dict):
         try:
             resp = ai_resp.get('response')
             return {'carrier_name': resp.get('carrier'), 'estimated_cost': resp.get('cost'), 'estimated_lead_time': resp.get('lead_time'), 'reason': resp.get('reason'), 'source': 'ai'}
         except Exception:
             logger.exception('AI carrier parse failed; falling back')
+    record_fallback('carrier')
 
     # deterministic scoring: lower cost better, lower lead_time better, higher reliability better
     scored = []
@@ -1,10 +1,20 @@
 from typing import Dict, Any, List
 import logging
-from modules.ai.base import BaseAIHandler
+from modules.ai.base import BaseAIHandler, record_fallback
+from modules.ai.prompt_builder import build_prompt
+from modules.ai.router import route_generate
 
 logger = logging.getLogger(__name__)
 
-_ai = BaseAIHandler()
+_ai = None
+
+
+def _get_ai() -> BaseAIHandler:
+    # created on first use, not at import
+    global _ai
+    if _ai is None:
+        _ai = BaseAIHandler()
+    return _ai
 
 
 def generate_packing_slip(order_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -19,12 +29,8 @@ def generate_packing_slip(order_data: Dict[str, Any]) -> Dict[str, Any]:
 
     # Prepare a prompt for AI to order items for efficient picking
     try:
-        prompt = {
-            'task': 'Order items for shortest warehouse route',
-            'order_id': order_data.get('order_id'),
-            'items': items
-        }
-        ai_result = _ai.generate(prompt)
+        prompt = build_prompt('packing_slip', {'order_id': order_data.get('order_id'), 'items': items})
+        ai_result = route_generate(_get_ai(), 'packing_slip', prompt)
         if ai_result.get('ok') and isinstance(ai_result.get('response'), dict):
             out = ai_result.get('response')
             out.setdefault('order_id', order_data.get('order_id'))
@@ -35,6 +41,7 @@ def generate_packing_slip(order_data: Dict[str, Any]) -> Dict[str, Any]:
         logger.exception('AI packing slip failed, falling back')
 
     # Fallback: sort by location string
+    record_fallback('packing_slip')
     sorted_items = sorted(items, key=lambda it: str(it.get('location', '')))
     packing_list = []
     for it in sorted_items:
@@ -0,0 +1,250 @@
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Set
+from datetime import datetime
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+
+from modules.orders.event_log import record_event
+
+logger = logging.getLogger(__name__)
+
+BUCKET_S = 3600
+STALL_AFTER_S = 48 * 3600
+FINAL_STATUSES = {'delivered', 'returned', 'cancelled'}
+
+
+def _to_ts(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+class _BucketIndex:
+    """Shipment ids bucketed by hour, plus a min-heap of bucket keys.
+
+    `pop_due(ts)` only touches buckets at or before ts, so a scan costs O(due shipments), not
+    O(all in-flight shipments).
+    """
+
+    def __init__(self, bucket_s: int = BUCKET_S):
+        self.bucket_s = bucket_s
+        self._buckets: Dict[int, Set[str]] = {}
+        self._keys: List[int] = []
+        self._where: Dict[str, int] = {}
+
+    def add(self, sid: str, ts: float):
+        self.discard(sid)
+        key = int(ts // self.bucket_s)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = set()
+            heapq.heappush(self._keys, key)
+        bucket.add(sid)
+        self._where[sid] = key
+
+    def discard(self, sid: str):
+        key = self._where.pop(sid, None)
+        if key is not None:
+            self._buckets[key].discard(sid)
+
+    def pop_due(self, ts: float) -> List[str]:
+        # includes the current hour: callers re-add entries that are not due yet
+        limit = int(ts // self.bucket_s)
+        out: List[str] = []
+        while self._keys and self._keys[0] <= limit:
+            key = heapq.heappop(self._keys)
+            for sid in self._buckets.pop(key, ()):
+                self._where.pop(sid, None)
+                out.append(sid)
+        return out
+
+    def __len__(self):
+        return len(self._where)
+
+
+class ShipmentTracker:
+    """In-flight shipment state built from carrier tracking events.
+
+    Shipments are indexed by expected delivery hour (late detection) and by last tracking event
+    hour (stall detection). Each shipment is reported once per problem; a new tracking event
+    re-arms stall detection.
+    """
+
+    def __init__(self, stall_after_s: int = STALL_AFTER_S):
+        self.stall_after_s = stall_after_s
+        self.shipments: Dict[str, Dict[str, Any]] = {}
+        self._due = _BucketIndex()
+        self._stall = _BucketIndex()
+        self.late: Dict[str, Dict[str, Any]] = {}
+        self.stalled: Dict[str, Dict[str, Any]] = {}
+        self.notices: Dict[str, Dict[str, Any]] = {}
+        self.rejected = 0   # events without shipment_id / tracking_number
+        self._lock = threading.Lock()
+
+    def ingest(self, event: Dict[str, Any]) -> bool:
+        """event: {shipment_id|tracking_number, status, ts, expected_delivery?, carrier?, order_id?, buyer?}
+
+        Returns False (and counts the event as rejected) when it names no shipment.
+        """
+        sid = event.get('shipment_id') or event.get('tracking_number')
+        if not sid:
+            with self._lock:
+                self.rejected += 1
+            return False
+        sid = str(sid)
+        ts = _to_ts(event.get('ts')) or time.time()
+        status = (event.get('status') or 'in_transit').lower()
+        with self._lock:
+            sh = self.shipments.get(sid)
+            new = sh is None
+            if new:
+                sh = self.shipments[sid] = {'shipment_id': sid, 'status': status, 'last_event_ts': ts, 'expected_delivery_ts': None}
+            for k in ('order_id', 'carrier', 'tracking_number', 'buyer', 'product_name', 'lang'):
+                if event.get(k) is not None:
+                    sh[k] = event[k]
+            if ts >= sh['last_event_ts']:
+                if new or status != sh['status']:
+                    # status changes only: raw tracking pings would swamp the order timeline
+                    record_event('shipment.status', sh.get('order_id'), {'shipment_id': sid, 'status': status, 'carrier': sh.get('carrier'), 'event_ts': ts})
+                sh['status'] = status
+                sh['last_event_ts'] = ts
+            expected = _to_ts(event.get('expected_delivery'))
+            if expected is not None and expected != sh['expected_delivery_ts']:
+                sh['expected_delivery_ts'] = expected
+                if sid not in self.late:
+                    self._due.add(sid, expected)
+
+            if sh['status'] in FINAL_STATUSES:
+                self._close(sid)
+            else:
+                self.stalled.pop(sid, None)
+                self._stall.add(sid, sh['last_event_ts'] + self.stall_after_s)
+        if new:
+            # first carrier scan: the shipment counts towards the dispute / late-rate denominators
+            try:
+                from modules.allegro.quality_metrics import METRICS
+                METRICS.record_event({'type': 'shipment_sent', 'ts': ts})
+            except Exception:
+                logger.exception('Recording shipment failed')
+        return True
+
+    def ingest_many(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Number of events ingested; rejected ones are counted in self.rejected."""
+        n = 0
+        for e in events:
+            n += self.ingest(e)
+        return n
+
+    def _close(self, sid: str):
+        self._due.discard(sid)
+        self._stall.discard(sid)
+        self.late.pop(sid, None)
+        self.stalled.pop(sid, None)
+        self.notices.pop(sid, None)
+        self.shipments.pop(sid, None)
+
+    def scan(self, now: float = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Return shipments that became late or stalled since the previous scan."""
+        now = now if now is not None else time.time()
+        new_late, new_stalled = [], []
+        with self._lock:
+            for sid in self._due.pop_due(now):
+                sh = self.shipments.get(sid)
+                if sh and sh['expected_delivery_ts'] is not None and sh['expected_delivery_ts'] <= now:
+                    sh['problem'] = 'late'
+                    self.late[sid] = sh
+                    new_late.append(sh)
+                elif sh and sh['expected_delivery_ts'] is not None:
+                    self._due.add(sid, sh['expected_delivery_ts'])
+            for sid in self._stall.pop_due(now):
+                sh = self.shipments.get(sid)
+                if sh and now - sh['last_event_ts'] >= self.stall_after_s:
+                    sh.setdefault('problem', 'stalled')
+                    self.stalled[sid] = sh
+                    new_stalled.append(sh)
+                elif sh:
+                    self._stall.add(sid, sh['last_event_ts'] + self.stall_after_s)
+        return {'late': new_late, 'stalled': new_stalled}
+
+    def issues(self) -> List[Dict[str, Any]]:
+        out = []
+        # under the lock: ingest() changes these dicts (and the shipments in them) from other threads
+        with self._lock:
+            for kind, group in (('shipment_late', self.late), ('shipment_stalled', self.stalled)):
+                for sid, sh in group.items():
+                    out.append({'type': kind, 'shipment_id': sid, 'order_id': sh.get('order_id'), 'carrier': sh.get('carrier'),
+                                'status': sh.get('status'), 'notice': (self.notices.get(sid) or {}).get('message')})
+        return out
+
+    def __len__(self):
+        return len(self.shipments)
+
+
+def read_events_file(path: str) -> Iterator[Dict[str, Any]]:
+    """Tracking events from a JSONL file (one event per line)."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class FakeCarrierAPI:
+    """Deterministic stand-in for a carrier tracking feed, for local runs and benchmarks."""
+
+    CARRIERS = ('DHL', 'InPost', 'DPD', 'LocalCourier')
+
+    def __init__(self, shipments: int = 1000, seed: int = 7, start_ts: float = None, late_ratio: float = 0.05, stall_ratio: float = 0.02):
+        self.rng = random.Random(seed)
+        self.count = shipments
+        self.start_ts = start_ts if start_ts is not None else time.time() - 3 * 86400
+        self.late_ratio = late_ratio
+        self.stall_ratio = stall_ratio
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        rng = self.rng
+        for i in range(self.count):
+            sent = self.start_ts + rng.uniform(0, 2 * 86400)
+            expected = sent + rng.choice((1, 2, 3)) * 86400
+            sid = f"SH{i:07d}"
+            base = {'shipment_id': sid, 'order_id': f"ORD{i:07d}", 'carrier': rng.choice(self.CARRIERS), 'lang': 'pl'}
+            yield {**base, 'status': 'created', 'ts': sent, 'expected_delivery': expected}
+            r = rng.random()
+            if r < self.stall_ratio:
+                continue  # no further scans
+            yield {**base, 'status': 'in_transit', 'ts': sent + rng.uniform(3600, 12 * 3600)}
+            if r < self.stall_ratio + self.late_ratio:
+                yield {**base, 'status': 'in_transit', 'ts': expected - 3600}
+            elif expected < time.time():
+                yield {**base, 'status': 'delivered', 'ts': expected - rng.uniform(0, 12 * 3600)}
+
+
+TRACKER = ShipmentTracker()
+
+
+def refresh_delay_notices(tracker: ShipmentTracker = None, now: float = None, batch_size: int = 50) -> Dict[str, Any]:
+    """Scan for newly late/stalled shipments and pre-generate buyer notices in batches."""
+    tracker = tracker or TRACKER
+    found = tracker.scan(now)
+    fresh = found['late'] + found['stalled']
+    if fresh:
+        try:
+            from modules.messaging.messaging_engine import generate_delay_notices
+            for notice in generate_delay_notices(fresh, batch_size=batch_size):
+                tracker.notices[notice['shipment_id']] = notice
+        except Exception:
+            logger.exception('Delay notice generation failed')
+        try:
+            from modules.allegro.quality_metrics import METRICS
+            for sh in found['late']:
+                METRICS.record_event({'type': 'shipment_late', 'ts': now})
+        except Exception:
+            logger.exception('Recording late shipments failed')
+        for kind in ('late', 'stalled'):
+            for sh in found[kind]:
+                record_event(f'shipment.{kind}', sh.get('order_id'), {'shipment_id': sh['shipment_id'], 'notice': sh['shipment_id'] in tracker.notices})
+    return {'new_late': len(found['late']), 'new_stalled': len(found['stalled']), 'in_flight': len(tracker)}
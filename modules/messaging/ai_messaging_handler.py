@@ -1,6 +1,9 @@
 import logging
 from typing import Dict, Any
-from modules.ai.base import BaseAIHandler
+from modules.ai.base import BaseAIHandler, record_fallback
+from modules.ai.prompt_builder import build_prompt
+from modules.ai.router import route_generate
+from modules.messaging.intent_classifier import classify_message
 
 logger = logging.getLogger(__name__)
 
@@ -12,32 +15,20 @@ class MessagingAIHandler(BaseAIHandler):
     def analyze_incoming_message(self, message_text: str, lang: str = 'pl') -> Dict[str, Any]:
         """Return sentiment, intent, urgency (1-10) and extracted entities.
 
-        Uses AI to analyze but falls back to heuristics if AI fails.
+        The local keyword classifier runs first and answers without a model call when confident;
+        otherwise the fast model is asked and only low-confidence answers escalate to the pro model.
         """
-        prompt = (
-            f"Analyze the following customer message and return JSON with keys: sentiment ('negative'|'neutral'|'positive'),"
-            f" intent (one of: 'product_question','complaint','shipping_question','price_inquiry','negotiation','other'),"
-            f" urgency (1-10), entities (json). Message:\n{message_text}\nReturn JSON."
-        )
-        resp = self.generate(prompt)
+        prompt = build_prompt('messaging_analyze', {'message': message_text, 'lang': lang})
+        resp = route_generate(self, 'messaging_analyze', prompt, local=lambda: classify_message(message_text))
         if not resp.get('ok'):
             logger.error('Messaging analyze AI failed: %s', resp.get('error'))
-            # fallback simple heuristics
-            text = message_text.lower()
-            sentiment = 'negative' if any(w in text for w in ['zły','nie','brak','reklamacja','psuje']) else ('positive' if any(w in text for w in ['dziękuję','super','świetnie']) else 'neutral')
-            intent = 'other'
-            if any(w in text for w in ['wysył','kiedy wysył','kiedy paczka','tracking']):
-                intent = 'shipping_question'
-            if any(w in text for w in ['wymiary','rozmiar','wymiary produktu']):
-                intent = 'product_question'
-            if any(w in text for w in ['cena','taniej','ile kosztuje']):
-                intent = 'price_inquiry'
-            urgency = 8 if any(w in text for w in ['pilne','natychmiast','teraz']) else 3
-            return {'ok': True, 'sentiment': sentiment, 'intent': intent, 'urgency': urgency, 'entities': {}}
+            record_fallback('messaging_analyze')
+            result, _ = classify_message(message_text)
+            return {'ok': True, **result}
 
         parsed = resp.get('response') or {}
         # expect keys
-        return {'ok': True, 'sentiment': parsed.get('sentiment'), 'intent': parsed.get('intent'), 'urgency': parsed.get('urgency'), 'entities': parsed.get('entities', {})}
+        return {'ok': True, 'sentiment': parsed.get('sentiment'), 'intent': parsed.get('intent'), 'urgency': parsed.get('urgency'), 'entities': parsed.get('entities', {}), 'tier': resp.get('tier')}
 
     def generate_smart_reply(self, message_data: Dict[str, Any], context_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate an empathetic, human-like reply. If required, trigger integrations.
@@ -46,13 +37,11 @@ class MessagingAIHandler(BaseAIHandler):
         context_data: { product, order_status, customer_history }
         Returns: { ok, reply_text, action: optional }
         """
-        prompt = (
-            f"You are a customer support assistant. Use empathetic, human tone. Apply Personal Touch. "
-            f"Given incoming message: {message_data} and context: {context_data}, produce JSON: {{'reply_text': string, 'action': optional_object, 'human_required': bool}}"
-        )
+        prompt = build_prompt('messaging_reply', {'message': message_data, 'context': context_data})
         resp = self.generate(prompt)
         if not resp.get('ok'):
             logger.error('Messaging reply AI failed: %s', resp.get('error'))
+            record_fallback('messaging_reply')
             # fallback generic reply
             reply = "Dziękujemy za wiadomość. Skontaktujemy się wkrótce z odpowiedzią." if context_data.get('lang','pl') == 'pl' else "Thanks for your message. We'll reply shortly."
             return {'ok': False, 'reply_text': reply}
@@ -0,0 +1,219 @@
+# Local intent/sentiment/urgency classifier for customer messages.
+# Polish stems are matched after diacritic folding; all stems are compiled into one trie-shaped
+# regex so a single scan (in C) finds every hit, which is then scored per label.
+from typing import Dict, Any, List, Tuple, Iterable, Optional
+import json
+import logging
+import re
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+_FOLD = str.maketrans('ąćęłńóśźżĄĆĘŁŃÓŚŹŻ', 'acelnoszzACELNOSZZ')
+
+INTENTS = ('product_question', 'complaint', 'shipping_question', 'price_inquiry', 'negotiation', 'other')
+
+# (group, label) -> {stem: weight}; stems are folded and matched at word start
+LEXICON: Dict[Tuple[str, str], Dict[str, float]] = {
+    ('intent', 'shipping_question'): {
+        'wysyl': 2, 'wysla': 2, 'wyslan': 2, 'paczk': 2, 'paczkomat': 2, 'kurier': 2, 'przesylk': 2,
+        'tracking': 2, 'numer nadania': 3, 'numer przesylki': 3, 'dostaw': 1.5, 'dojdzie': 2, 'doszl': 1.5,
+        'nadan': 1.5, 'inpost': 1.5, 'dpd': 1.5, 'dhl': 1.5, 'kiedy dotrze': 3, 'sledz': 2,
+    },
+    ('intent', 'product_question'): {
+        'wymiar': 2, 'rozmiar': 2, 'kolor': 1.5, 'material': 1.5, 'pasuje': 2, 'kompatybil': 2,
+        'specyfikac': 2, 'parametr': 2, 'gwarancj': 1.5, 'instrukcj': 1.5, 'czy produkt': 2, 'waga': 1, 'sklad': 1.5,
+    },
+    ('intent', 'price_inquiry'): {
+        'cena': 2, 'ceny': 2, 'cene': 2, 'ile kosztuj': 3, 'koszt': 1.5, 'taniej': 2, 'rabat': 2,
+        'znizk': 2, 'promocj': 1.5, 'faktur': 1,
+    },
+    ('intent', 'negotiation'): {
+        'oferuj': 2, 'proponuj': 2, 'propozycj': 1.5, 'czy zejdzie': 3, 'zejsc z ceny': 3, 'za ile': 2,
+        'ostateczn': 1.5, 'moge dac': 3, 'dam ': 1, 'negocj': 3, 'wezme za': 3, 'przy zakupie': 1.5,
+    },
+    ('intent', 'complaint'): {
+        'reklamac': 3, 'uszkodz': 3, 'zepsut': 3, 'nie dziala': 3, 'wadliw': 3, 'zwrot': 2, 'zwroc': 2,
+        'oszust': 3, 'rozbit': 3, 'brakuje': 2, 'niekomplet': 2, 'pekniet': 3, 'porysowan': 2, 'nie ten': 2,
+        'zamiast': 1, 'skandal': 2,
+    },
+    ('sentiment', 'negative'): {
+        'zly': 2, 'zla': 2, 'fataln': 3, 'tragedi': 3, 'beznadziej': 3, 'rozczarow': 3, 'niezadowol': 3,
+        'skandal': 3, 'oszust': 3, 'reklamac': 2, 'psuje': 2, 'zepsut': 2, 'uszkodz': 2, 'nie dziala': 2,
+        'brak': 1, 'zenujac': 3, 'nigdy wiecej': 3, 'niestety': 1,
+    },
+    ('sentiment', 'positive'): {
+        'dziekuj': 2, 'dzieki': 2, 'super': 2, 'swietn': 2, 'polecam': 3, 'zadowol': 2, 'ekstra': 2,
+        'rewelac': 3, 'idealn': 2, 'pozdrawiam': 0.5,
+    },
+    ('urgency', 'high'): {
+        'pilne': 3, 'pilnie': 3, 'natychmiast': 3, 'teraz': 1.5, 'jak najszybciej': 3, 'dzisiaj': 1.5,
+        'dzis': 1.5, 'asap': 3, 'ostatni raz': 2, 'zglosze': 2, 'rzecznik': 3, 'policj': 3,
+    },
+}
+
+_PRICE_RE = re.compile(r'(\d+(?:[.,]\d{1,2})?)\s*(?:zl|pln)\b')
+MIN_CONFIDENCE = 0.7
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip Polish diacritics."""
+    return text.lower().translate(_FOLD)
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Render a set of words as a regex whose alternations follow the trie of the words."""
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def render(node: Dict[str, Any]) -> str:
+        end = '' in node
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if end:
+            # longest match first: the engine only falls back to the shorter word if the branch fails
+            return '(?:' + body + ')?'
+        return body
+
+    return render(trie)
+
+
+class KeywordClassifier:
+    """Compiled stem matcher + per-label scoring."""
+
+    def __init__(self, lexicon: Dict[Tuple[str, str], Dict[str, float]] = None, min_confidence: float = MIN_CONFIDENCE):
+        self.lexicon = lexicon or LEXICON
+        self.min_confidence = min_confidence
+        # stem -> [(group, label, weight)]
+        self._hits: Dict[str, List[Tuple[str, str, float]]] = {}
+        for (group, label), stems in self.lexicon.items():
+            for stem, weight in stems.items():
+                self._hits.setdefault(fold(stem), []).append((group, label, float(weight)))
+        self._pattern = re.compile(r'\b(' + _trie_regex(self._hits) + ')')
+
+    def scores(self, folded: str) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {'intent': {}, 'sentiment': {}, 'urgency': {}}
+        for stem in self._pattern.findall(folded):
+            for group, label, weight in self._hits[stem]:
+                g = out[group]
+                g[label] = g.get(label, 0.0) + weight
+        return out
+
+    def classify(self, message_text: str) -> Tuple[Dict[str, Any], float]:
+        """Return ({sentiment, intent, urgency, entities}, confidence in 0-1)."""
+        folded = fold(message_text or '')
+        sc = self.scores(folded)
+
+        intents = sorted(sc['intent'].items(), key=lambda kv: kv[1], reverse=True)
+        if intents:
+            intent, top = intents[0]
+            runner_up = intents[1][1] if len(intents) > 1 else 0.0
+            # confident when one intent dominates and has more than a single weak hit
+            confidence = (top - runner_up) / (top + 0.5)
+            confidence = min(1.0, confidence + (0.25 if top >= 3 else 0.0))
+        else:
+            intent, confidence = 'other', 0.3
+
+        neg = sc['sentiment'].get('negative', 0.0)
+        pos = sc['sentiment'].get('positive', 0.0)
+        if intent == 'complaint':
+            neg += 1.0
+        sentiment = 'negative' if neg > pos else ('positive' if pos > neg else 'neutral')
+
+        urgency = 3 + min(5.0, sc['urgency'].get('high', 0.0) * 1.5)
+        if intent == 'complaint':
+            urgency += 2
+        if sentiment == 'negative' and neg >= 3:
+            urgency += 1
+        urgency = int(max(1, min(10, round(urgency))))
+
+        entities: Dict[str, Any] = {}
+        m = _PRICE_RE.search(folded)
+        if m:
+            entities['desired_price'] = float(m.group(1).replace(',', '.'))
+
+        return {'sentiment': sentiment, 'intent': intent, 'urgency': urgency, 'entities': entities}, round(confidence, 3)
+
+    def classify_batch(self, messages: Iterable[str]) -> List[Tuple[Dict[str, Any], float]]:
+        classify = self.classify
+        return [classify(m) for m in messages]
+
+
+_default: Optional[KeywordClassifier] = None
+
+
+def get_classifier() -> KeywordClassifier:
+    global _default
+    if _default is None:
+        _default = KeywordClassifier()
+    return _default
+
+
+def classify_message(message_text: str) -> Tuple[Dict[str, Any], float]:
+    return get_classifier().classify(message_text)
+
+
+def evaluate(samples: List[Dict[str, Any]], label_with_model: bool = False) -> Dict[str, Any]:
+    """Compare the local classifier with model labels on a labelled sample.
+
+    samples: [{text, intent, sentiment}] where intent/sentiment are the model's (or a human's) labels.
+    With label_with_model=True, samples missing an intent are labelled by the pro model first.
+    Reports agreement overall and on the confident subset (the part that skips the model), coverage
+    and throughput.
+    """
+    if label_with_model:
+        from modules.messaging.ai_messaging_handler import MessagingAIHandler
+        from modules.ai.prompt_builder import build_prompt
+        handler = MessagingAIHandler()
+        for s in samples:
+            if s.get('intent'):
+                continue
+            resp = handler.generate(build_prompt('messaging_analyze', {'message': s.get('text', ''), 'lang': 'pl'}))
+            if resp.get('ok') and isinstance(resp.get('response'), dict):
+                s['intent'] = resp['response'].get('intent')
+                s['sentiment'] = resp['response'].get('sentiment')
+
+    labelled = [s for s in samples if s.get('intent')]
+    clf = get_classifier()
+    start = time.perf_counter()
+    results = clf.classify_batch(s.get('text', '') for s in labelled)
+    elapsed = time.perf_counter() - start
+
+    n = len(labelled)
+    intent_ok = sentiment_ok = confident = confident_ok = 0
+    confusion: Dict[str, Dict[str, int]] = {}
+    for s, (res, conf) in zip(labelled, results):
+        hit = res['intent'] == s['intent']
+        intent_ok += hit
+        sentiment_ok += res['sentiment'] == s.get('sentiment')
+        row = confusion.setdefault(s['intent'], {})
+        row[res['intent']] = row.get(res['intent'], 0) + 1
+        if conf >= clf.min_confidence:
+            confident += 1
+            confident_ok += hit
+
+    return {
+        'samples': n,
+        'intent_agreement': intent_ok / n if n else None,
+        'sentiment_agreement': sentiment_ok / n if n else None,
+        'coverage': confident / n if n else None,
+        'confident_intent_agreement': confident_ok / confident if confident else None,
+        'confusion': confusion,
+        'elapsed_s': elapsed,
+        'messages_per_s': n / elapsed if elapsed > 0 else None,
+    }
+
+
+if __name__ == '__main__':
+    # usage: python -m modules.messaging.intent_classifier labelled.jsonl [--label-with-model]
+    path = sys.argv[1]
+    with open(path, encoding='utf-8') as f:
+        data = [json.loads(line) for line in f if line.strip()]
+    print(json.dumps(evaluate(data, label_with_model='--label-with-model' in sys.argv), indent=2, ensure_ascii=False))
@@ -1,16 +1,27 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from modules.messaging.ai_messaging_handler import MessagingAIHandler
+from modules.ai.prompt_builder import build_prompt
+from modules.ai.base import record_fallback
+from modules.ai.router import route_generate
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-handler = MessagingAIHandler()
+handler = None
+
+
+def _get_handler() -> MessagingAIHandler:
+    # created on first use, not at import
+    global handler
+    if handler is None:
+        handler = MessagingAIHandler()
+    return handler
 
 
 def analyze_incoming_message(message_text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
     context = context or {}
-    return handler.analyze_incoming_message(message_text, lang=context.get('lang','pl'))
+    return _get_handler().analyze_incoming_message(message_text, lang=context.get('lang','pl'))
 
 
 def generate_smart_reply(message_data: Dict[str, Any], context_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -21,4 +32,39 @@ def generate_smart_reply(message_data: Dict[str, Any], context_data: Dict[str, A
         # stubbed order status
         context_data.setdefault('order_status', {'status': 'shipped', 'eta': '2 dni'})
 
-    return handler.generate_smart_reply(message_data, context_data)
+    return _get_handler().generate_smart_reply(message_data, context_data)
+
+
+def _delay_notice_template(shipment: Dict[str, Any]) -> str:
+    carrier = shipment.get('carrier') or 'przewoźnika'
+    if shipment.get('lang', 'pl') != 'pl':
+        return f"We're sorry - your parcel with {carrier} is running late. We are monitoring it and will update you shortly."
+    return f"Przepraszamy, Twoja przesyłka ({carrier}) jest opóźniona. Monitorujemy ją na bieżąco i damy znać, gdy tylko będzie w drodze do Ciebie."
+
+
+def generate_delay_notices(shipments: List[Dict[str, Any]], batch_size: int = 50) -> List[Dict[str, Any]]:
+    """Pre-generate proactive delay messages, one model call per batch of shipments.
+
+    Shipments missing from the model answer (or whole failed batches) get a template message.
+    Returns: [{shipment_id, order_id, message, source}]
+    """
+    out = []
+    for i in range(0, len(shipments), batch_size):
+        batch = shipments[i:i + batch_size]
+        payload = {'shipments': [{'shipment_id': s.get('shipment_id'), 'order_id': s.get('order_id'), 'carrier': s.get('carrier'),
+                                  'status': s.get('status'), 'kind': s.get('problem', 'late')} for s in batch]}
+        resp = route_generate(_get_handler(), 'delay_notice', build_prompt('delay_notice', payload))
+        generated = {}
+        if resp.get('ok') and isinstance(resp.get('response'), dict):
+            for n in resp['response'].get('notices') or []:
+                if isinstance(n, dict) and n.get('message'):
+                    generated[str(n.get('shipment_id'))] = n['message']
+        else:
+            logger.warning('Delay notice batch failed: %s', resp.get('error'))
+        for s in batch:
+            sid = str(s.get('shipment_id'))
+            msg = generated.get(sid)
+            if not msg:
+                record_fallback('delay_notice')
+            out.append({'shipment_id': sid, 'order_id': s.get('order_id'), 'message': msg or _delay_notice_template(s), 'source': 'ai' if msg else 'template'})
+    return out
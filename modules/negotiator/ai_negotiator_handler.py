@@ -1,7 +1,7 @@
 import logging
 from typing import Dict, Any
 from modules.ai.ai_handler import call_gemini
-from prompts import MODULE_PROMPTS
+from modules.ai.prompt_builder import build_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +11,7 @@ def ask_negotiator_ai(payload: Dict[str, Any], model: str = 'models/gemini-3-pro
 
     payload should contain: client_offer, product, min_price, customer_history, inventory_count, config
     """
-    prompt_template = MODULE_PROMPTS.get('negocjator')
-    if not prompt_template:
-        raise RuntimeError('Negociator prompt not found')
-
-    prompt = prompt_template.format(persona=payload.get('persona') or '') + "\n\n" + str(payload)
+    prompt = build_prompt('negotiator', payload)
 
     try:
         resp = call_gemini(prompt, model=model, response_mime_type='application/json')
@@ -26,3 +22,22 @@ def ask_negotiator_ai(payload: Dict[str, Any], model: str = 'models/gemini-3-pro
     except Exception as e:
         logger.exception('Negociator call exception')
         return {'ok': False, 'error': str(e)}
+
+
+def write_negotiation_message(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Let the fast model word a decision the rule engine already made.
+
+    payload: { decision, proposed_price, client_offer, product, customer_history, inventory_count }
+    """
+    from modules.ai.base import BaseAIHandler
+    from modules.ai.router import route_generate
+
+    try:
+        resp = route_generate(BaseAIHandler(response_mime_type='application/json'), 'negotiator_message', build_prompt('negotiator_message', payload))
+        message = (resp.get('response') or {}).get('message') if resp.get('ok') else None
+        if not message:
+            return {'ok': False, 'error': resp.get('error') or 'empty_message'}
+        return {'ok': True, 'message': message}
+    except Exception as e:
+        logger.exception('Negotiator message call exception')
+        return {'ok': False, 'error': str(e)}
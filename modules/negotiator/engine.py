@@ -0,0 +1,96 @@
+from typing import Dict, Any, List, Iterable, Optional
+
+# Time-dependent concession: the acceptable price moves from the list price toward the floor over
+# `rounds_to_floor` counter-offers. With t = counters made so far + 1:
+# target(t) = floor + (list - floor) * (1 - (t / T) ** (1 / beta));
+# beta < 1 concedes late (Boulware), beta > 1 concedes early (Conceder).
+DEFAULT_CURVE = {
+    'rounds_to_floor': 4,
+    'beta': 0.7,
+    'low_stock': 3,            # at or below: concede half as fast
+    'overstock': 50,           # at or above: concede 1.5x faster
+    'repeat_buyer_orders': 2,  # orders_count at or above: extra concession
+    'repeat_buyer_bonus': 0.10,
+    'good_rating': 4.8,
+    'good_rating_bonus': 0.05,
+    'accept_above_floor_pct': None,  # optional: always accept offers this far above the floor
+    'lowball_pct': 0.40,       # offers this far below the floor are rejected outright
+    'round_to': 0.99,          # counter-offers end in .99
+}
+
+
+def curve_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    cfg = dict(DEFAULT_CURVE)
+    if config:
+        cfg.update({k: v for k, v in (config.get('concession_curve') or {}).items() if k in DEFAULT_CURVE})
+        if config.get('accept_above_floor_pct') is not None:
+            cfg['accept_above_floor_pct'] = float(config['accept_above_floor_pct'])
+    return cfg
+
+
+def concession_fraction(round_no: int, inventory_count: int, customer_history: Dict[str, Any], cfg: Dict[str, Any]) -> float:
+    """Fraction (0-1) of the list->floor gap we are willing to give up at this round."""
+    t = min(1.0, max(0.0, (round_no + 1) / float(cfg['rounds_to_floor'] or 1)))
+    frac = t ** (1.0 / cfg['beta'])
+    if inventory_count is not None:
+        if inventory_count <= cfg['low_stock']:
+            frac *= 0.5
+        elif inventory_count >= cfg['overstock']:
+            frac *= 1.5
+    hist = customer_history or {}
+    if int(hist.get('orders_count', hist.get('orders', 0)) or 0) >= cfg['repeat_buyer_orders']:
+        frac += cfg['repeat_buyer_bonus']
+    if float(hist.get('rating', 0) or 0) >= cfg['good_rating']:
+        frac += cfg['good_rating_bonus']
+    if hist.get('disputes'):
+        frac *= 0.5
+    return min(1.0, max(0.0, frac))
+
+
+def _price_point(p: float, round_to: float) -> float:
+    if not round_to:
+        return round(p, 2)
+    whole = int(p)
+    candidate = whole + round_to
+    return round(candidate if candidate >= p else candidate + 1, 2)
+
+
+def decide(client_offer: float, min_price: float, list_price: float, inventory_count: int = 0,
+           customer_history: Dict[str, Any] = None, round_no: int = 0, previous_counter: float = None,
+           config: Optional[Dict[str, Any]] = None, cfg: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Deterministic ACCEPT / COUNTER_OFFER / REJECT for one offer.
+
+    round_no is the number of counter-offers already made; counters never go back up above
+    previous_counter, and an offer matching our previous counter is accepted.
+    Returns: { decision, proposed_price, target_price, reason }
+    """
+    cfg = cfg or curve_config(config)
+    list_price = list_price if list_price and list_price > min_price else min_price
+    frac = concession_fraction(round_no, inventory_count, customer_history, cfg)
+    target = min_price + (list_price - min_price) * (1.0 - frac)
+    if previous_counter is not None:
+        target = max(min_price, min(target, previous_counter))
+    accept_above = cfg['accept_above_floor_pct']
+
+    if client_offer >= target or (accept_above is not None and client_offer >= min_price * (1.0 + accept_above)):
+        return {'decision': 'ACCEPT', 'proposed_price': round(min(client_offer, list_price), 2), 'target_price': round(target, 2), 'reason': 'offer_meets_target'}
+    if client_offer < min_price * (1.0 - cfg['lowball_pct']):
+        return {'decision': 'REJECT', 'proposed_price': None, 'target_price': round(target, 2), 'reason': 'lowball_offer'}
+    counter = max(min_price, min(list_price, _price_point(target, cfg['round_to'])))
+    if previous_counter is not None:
+        counter = min(counter, previous_counter)
+    return {'decision': 'COUNTER_OFFER', 'proposed_price': counter, 'target_price': round(target, 2), 'reason': f'concession_round_{round_no}'}
+
+
+def evaluate_bulk(offers: Iterable[Dict[str, Any]], config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Decide many offers at once.
+
+    offers: [{client_offer, min_price, list_price, inventory_count, customer_history, round, previous_counter?}]
+    """
+    cfg = curve_config(config)
+    out = []
+    append = out.append
+    for o in offers:
+        append(decide(float(o['client_offer']), float(o['min_price']), float(o.get('list_price') or 0), o.get('inventory_count', 0),
+                      o.get('customer_history'), int(o.get('round', 0)), o.get('previous_counter'), cfg=cfg))
+    return out
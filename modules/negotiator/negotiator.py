@@ -1,9 +1,15 @@
 from typing import Dict, Any
+import os
+from modules.ai.base import record_fallback
 from modules.finance.calculator import calculate_margin
-from modules.negotiator.ai_negotiator_handler import ask_negotiator_ai
+from modules.negotiator import engine
+from modules.negotiator.ai_negotiator_handler import ask_negotiator_ai, write_negotiation_message
+from modules.negotiator.sessions import SESSIONS, NegotiationSession, product_fingerprint
 
 
 MIN_MARGIN_PCT = 0.10
+# let the fast model word counter-offers/rejections (decisions always come from the rule engine)
+AI_MESSAGES = os.environ.get('NEGOTIATOR_AI_MESSAGE', '1') == '1'
 
 
 def get_min_price_for_product(product: Dict[str, Any], config: Dict[str, Any] = None) -> float:
@@ -33,27 +39,117 @@ def get_min_price_for_product(product: Dict[str, Any], config: Dict[str, Any] =
     return round(max(min_price, product_costs['cost'] * (1 + MIN_MARGIN_PCT)), 2)
 
 
+def _open_session(offer_id: str, product: Dict[str, Any], config: Dict[str, Any] = None) -> NegotiationSession:
+    fp = product_fingerprint(product)
+    session = SESSIONS.get(offer_id, fp)
+    if session is not None:
+        return session
+    return SESSIONS.put(new_session(offer_id, product, config=config))
+
+
+def new_session(offer_id: str, product: Dict[str, Any], config: Dict[str, Any] = None) -> NegotiationSession:
+    """Build (without caching) the per-offer session: floor, costs and the compact model context."""
+    product_costs = {
+        'cost': float(product.get('cost', 0)),
+        'packaging': float(product.get('packaging_cost', 0)),
+        'shipping': float(product.get('shipping_cost', 0)),
+        'ads': float(product.get('ads_cost', 0))
+    }
+    marketplace_fees = {'fee_pct': float(product.get('marketplace_fee_pct', 0.15))}
+    # only what the model needs, instead of the whole product record
+    product_context = {k: product.get(k) for k in ('id', 'sku', 'name', 'title', 'price', 'category') if product.get(k) is not None}
+    return NegotiationSession(str(offer_id), product_fingerprint(product), get_min_price_for_product(product, config=config),
+                              float(product.get('price', 0) or 0), product_costs, marketplace_fees, product_context)
+
+
+def _template_message(result: Dict[str, Any]) -> str:
+    price = result.get('proposed_price')
+    if result['decision'] == 'ACCEPT':
+        return f'Akceptujemy Twoją ofertę {price:.2f} zł. Zapraszamy do zakupu!'
+    if result['decision'] == 'COUNTER_OFFER':
+        return f'Dziękujemy za propozycję. Możemy zaproponować {price:.2f} zł.'
+    return 'Niestety nie możemy zejść tak nisko. Zapraszamy do zakupu w cenie z oferty.'
+
+
+def _rule_decision(session: NegotiationSession, client_offer: float, customer_history: Dict[str, Any], inventory_count: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    counters = sum(1 for r in session.rounds if r.get('decision') == 'COUNTER_OFFER')
+    verdict = engine.decide(client_offer, session.min_price, session.list_price, inventory_count, customer_history,
+                            round_no=counters, previous_counter=session.ceiling(), config=config)
+    return {'decision': verdict['decision'], 'proposed_price': verdict['proposed_price'], 'reason': verdict['reason'], 'source': 'rules'}
+
+
+def _add_message(session: NegotiationSession, result: Dict[str, Any], client_offer: float, customer_history: Dict[str, Any], inventory_count: int, config: Dict[str, Any]):
+    """The decision is final here; the model (when enabled) only words counter-offers and rejections."""
+    if result['decision'] != 'ACCEPT' and config.get('ai_message', AI_MESSAGES):
+        written = write_negotiation_message({
+            'decision': result['decision'],
+            'proposed_price': result.get('proposed_price'),
+            'client_offer': client_offer,
+            'product': session.product_context,
+            'customer_history': customer_history,
+            'inventory_count': inventory_count,
+        })
+        if written.get('ok'):
+            result['message'] = written['message']
+            result['message_source'] = 'ai'
+            return result
+        record_fallback('negotiator_message')
+    result['message'] = _template_message(result)
+    result['message_source'] = 'template'
+    return result
+
+
 def negotiate(offer_id: str, client_offer: float, product: Dict[str, Any], customer_history: Dict[str, Any], inventory_count: int, config: Dict[str, Any] = None) -> Dict[str, Any]:
-    """Run negotiation flow: call AI, validate with calculator, and return final decision.
+    """Run negotiation flow: decide with the rule engine, let the model word the message.
 
-    Returns: { decision, message, proposed_price, reason }
+    The price floor, costs and previous rounds are cached per offer_id; a retry of the last offer
+    is answered from the session. A counter never goes above the previous counter or a price
+    already accepted in the session. The concession curve (see engine.py) takes the round number,
+    inventory and customer history into account, so the decision is deterministic.
+    Set config['engine'] = 'ai' to use the previous model-decides flow.
+    Returns: { decision, message, proposed_price, reason, source }
     """
-    # compute our minimal price
-    min_price = get_min_price_for_product(product, config=config)
+    cfg = config or {}
+    client_offer = float(client_offer)
+    session = _open_session(offer_id, product, config=config)
+
+    repeated = session.replay(client_offer)
+    if repeated is not None and repeated.get('result'):
+        return {**repeated['result'], 'source': 'session'}
+
+    if cfg.get('engine') == 'ai':
+        result = _ask_model(session, client_offer, customer_history, inventory_count, cfg)
+        ceiling = session.ceiling()
+        if result.get('decision') == 'COUNTER_OFFER' and ceiling is not None and result.get('proposed_price') is not None \
+                and float(result['proposed_price']) > ceiling:
+            # the model may not walk a counter back up; its wording quoted the higher price
+            result = {**result, 'proposed_price': ceiling}
+            result['message'] = _template_message(result)
+    else:
+        result = _add_message(session, _rule_decision(session, client_offer, customer_history, inventory_count, cfg),
+                              client_offer, customer_history, inventory_count, cfg)
+    session.record(client_offer, result)
+    if result.get('source') != 'ai_error':
+        session.rounds[-1]['result'] = result
+    return result
+
 
+def _ask_model(session: NegotiationSession, client_offer: float, customer_history: Dict[str, Any], inventory_count: int, config: Dict[str, Any]) -> Dict[str, Any]:
     # build payload for AI
     payload = {
         'client_offer': client_offer,
-        'product': product,
-        'min_price': min_price,
+        'product': session.product_context,
+        'min_price': session.min_price,
         'customer_history': customer_history,
         'inventory_count': inventory_count,
-        'config': config or {}
+        'config': config,
+        'previous_rounds': [{k: r.get(k) for k in ('client_offer', 'decision', 'proposed_price')} for r in session.rounds]
     }
 
     ai_resp = ask_negotiator_ai(payload)
     if not ai_resp.get('ok'):
-        return {'decision': 'REJECT', 'message': 'AI error', 'error': ai_resp.get('error')}
+        record_fallback('negotiator')
+        return {'decision': 'REJECT', 'message': 'AI error', 'error': ai_resp.get('error'), 'source': 'ai_error'}
 
     decision_obj = ai_resp.get('decision') or {}
     # expect structure: { decision, proposed_price, reason, message, actions }
@@ -62,19 +158,12 @@ def negotiate(offer_id: str, client_offer: float, product: Dict[str, Any], custo
 
     # Validate proposed price via calculator
     if proposed_price is not None:
-        product_costs = {
-            'cost': float(product.get('cost', 0)),
-            'packaging': float(product.get('packaging_cost', 0)),
-            'shipping': float(product.get('shipping_cost', 0)),
-            'ads': float(product.get('ads_cost', 0))
-        }
-        marketplace_fees = {'fee_pct': float(product.get('marketplace_fee_pct', 0.15))}
-        margin = calculate_margin(float(proposed_price), product_costs, marketplace_fees)
+        margin = calculate_margin(float(proposed_price), session.product_costs, session.marketplace_fees)
         if margin < (config.get('min_margin_pct', 0.10) if config else MIN_MARGIN_PCT):
             # reject unsupported low offer, ask AI to produce safe counter
-            return {'decision': 'REJECT', 'message': 'Proposed price below minimal margin', 'proposed_price': proposed_price, 'reason': decision_obj.get('reason')}
+            return {'decision': 'REJECT', 'message': 'Proposed price below minimal margin', 'proposed_price': proposed_price, 'reason': decision_obj.get('reason'), 'source': 'ai'}
         else:
-            return {'decision': decision or 'COUNTER_OFFER', 'message': decision_obj.get('message'), 'proposed_price': proposed_price, 'reason': decision_obj.get('reason')}
+            return {'decision': decision or 'COUNTER_OFFER', 'message': decision_obj.get('message'), 'proposed_price': proposed_price, 'reason': decision_obj.get('reason'), 'source': 'ai'}
 
     # No proposed price -> return decision as-is
-    return {'decision': decision or 'REJECT', 'message': decision_obj.get('message'), 'reason': decision_obj.get('reason')}
+    return {'decision': decision or 'REJECT', 'message': decision_obj.get('message'), 'reason': decision_obj.get('reason'), 'source': 'ai'}
@@ -0,0 +1,130 @@
+from typing import Dict, Any, List, Iterable, Iterator
+import json
+import random
+import sys
+import time
+
+from modules.negotiator import engine
+from modules.negotiator.negotiator import new_session, _rule_decision, _ask_model
+
+# history record (one buyer offer; rounds of the same negotiation share offer_id, in order):
+# { offer_id, client_offer, product, customer_history, inventory_count, buyer_max?, config? }
+# buyer_max is the most the buyer would have paid; without it we assume only the offer itself.
+
+
+def read_history(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def synthetic_history(n: int = 1000, seed: int = 11) -> List[Dict[str, Any]]:
+    """Deterministic offers around the price floor, for local runs when no history is at hand."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        cost = round(rng.uniform(10, 200), 2)
+        product = {'id': f"P{i % 200}", 'name': f"Produkt {i % 200}", 'cost': cost, 'packaging_cost': 2.0, 'shipping_cost': 9.0,
+                   'ads_cost': round(cost * 0.05, 2), 'marketplace_fee_pct': 0.12, 'price': round(cost * rng.uniform(1.6, 2.2), 2)}
+        history = {'orders_count': rng.choice((0, 0, 1, 3)), 'rating': round(rng.uniform(4.0, 5.0), 1)}
+        buyer_max = round(product['price'] * rng.uniform(0.6, 1.0), 2)
+        offer = round(buyer_max * rng.uniform(0.6, 0.95), 2)
+        out.append({'offer_id': f"O{i}", 'client_offer': offer, 'product': product, 'customer_history': history,
+                    'inventory_count': rng.choice((1, 5, 20, 80)), 'buyer_max': buyer_max})
+    return out
+
+
+def _profit(price: float, session) -> float:
+    costs = session.product_costs
+    fixed = costs['cost'] + costs['packaging'] + costs['shipping'] + costs['ads']
+    return price * (1 - session.marketplace_fees['fee_pct']) - fixed
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def replay(records: Iterable[Dict[str, Any]], engines: Iterable[str] = ('rules', 'ai')) -> Dict[str, Any]:
+    """Run historical offers through the rule engine and/or the model engine and compare them.
+
+    Margin captured counts a deal when the engine accepts, or counters at or below buyer_max.
+    Sessions are built per engine and never touch the live session cache.
+    """
+    records = list(records)
+    report: Dict[str, Any] = {'offers': len(records)}
+    for name in engines:
+        sessions: Dict[str, Any] = {}
+        latencies: List[float] = []
+        decisions: Dict[str, int] = {}
+        deals = errors = 0
+        margin = 0.0
+        for rec in records:
+            oid = str(rec.get('offer_id'))
+            session = sessions.get(oid)
+            if session is None:
+                session = sessions[oid] = new_session(oid, rec['product'], config=rec.get('config'))
+            offer = float(rec['client_offer'])
+            cfg = rec.get('config') or {}
+            start = time.perf_counter()
+            if name == 'rules':
+                result = _rule_decision(session, offer, rec.get('customer_history'), rec.get('inventory_count', 0), cfg)
+            else:
+                result = _ask_model(session, offer, rec.get('customer_history'), rec.get('inventory_count', 0), cfg)
+            latencies.append(time.perf_counter() - start)
+            session.record(offer, result)
+
+            decision = result.get('decision') or 'REJECT'
+            decisions[decision] = decisions.get(decision, 0) + 1
+            errors += result.get('source') == 'ai_error'
+            price = result.get('proposed_price')
+            buyer_max = float(rec.get('buyer_max') or offer)
+            if decision == 'ACCEPT':
+                price = offer if price is None else float(price)
+            elif decision == 'COUNTER_OFFER' and price is not None and float(price) <= buyer_max:
+                price = float(price)
+            else:
+                price = None
+            if price is not None:
+                deals += 1
+                margin += _profit(price, session)
+
+        total = sum(latencies)
+        report[name] = {
+            'decisions': decisions,
+            'deals': deals,
+            'errors': errors,
+            'margin_captured': round(margin, 2),
+            'latency_p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+            'latency_p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+            'offers_per_s': round(len(latencies) / total, 1) if total > 0 else None,
+        }
+    return report
+
+
+def bulk_throughput(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Offers per second through engine.evaluate_bulk (floors precomputed, no sessions)."""
+    offers = []
+    for rec in records:
+        session = new_session(str(rec.get('offer_id')), rec['product'])
+        offers.append({'client_offer': rec['client_offer'], 'min_price': session.min_price, 'list_price': session.list_price,
+                       'inventory_count': rec.get('inventory_count', 0), 'customer_history': rec.get('customer_history')})
+    start = time.perf_counter()
+    engine.evaluate_bulk(offers)
+    elapsed = time.perf_counter() - start
+    return {'offers': len(offers), 'elapsed_s': round(elapsed, 4), 'offers_per_s': round(len(offers) / elapsed, 1) if elapsed > 0 else None}
+
+
+if __name__ == '__main__':
+    # usage: python -m modules.negotiator.replay (history.jsonl | --synthetic N) [--rules-only]
+    args = sys.argv[1:]
+    if args and args[0] == '--synthetic':
+        data = synthetic_history(int(args[1]) if len(args) > 1 else 1000)
+    else:
+        data = list(read_history(args[0]))
+    out = replay(data, engines=('rules',) if '--rules-only' in args else ('rules', 'ai'))
+    out['bulk'] = bulk_throughput(data)
+    print(json.dumps(out, indent=2, ensure_ascii=False))
@@ -0,0 +1,109 @@
+from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_S = float(os.environ.get('NEGOTIATION_SESSION_TTL_S', 6 * 3600))
+SESSION_MAX = int(os.environ.get('NEGOTIATION_SESSION_MAX', 20000))
+
+# product fields that change the price floor; a change invalidates the cached floor
+FLOOR_FIELDS = ('cost', 'packaging_cost', 'shipping_cost', 'ads_cost', 'marketplace_fee_pct', 'price')
+
+
+class NegotiationSession:
+    """Per-offer negotiation state: cached floor/costs, compact model context and past rounds."""
+    __slots__ = ('offer_id', 'fingerprint', 'min_price', 'list_price', 'product_costs', 'marketplace_fees',
+                 'product_context', 'rounds', 'expires')
+
+    def __init__(self, offer_id: str, fingerprint: tuple, min_price: float, list_price: float,
+                 product_costs: Dict[str, float], marketplace_fees: Dict[str, float], product_context: Dict[str, Any]):
+        self.offer_id = offer_id
+        self.fingerprint = fingerprint
+        self.min_price = min_price
+        self.list_price = list_price
+        self.product_costs = product_costs
+        self.marketplace_fees = marketplace_fees
+        self.product_context = product_context
+        self.rounds: List[Dict[str, Any]] = []
+        self.expires = 0.0
+
+    def last_counter(self) -> Optional[float]:
+        for r in reversed(self.rounds):
+            if r.get('decision') == 'COUNTER_OFFER' and r.get('proposed_price') is not None:
+                return float(r['proposed_price'])
+        return None
+
+    def ceiling(self) -> Optional[float]:
+        """Highest price we may still ask: the last counter-offer, or lower if we already accepted less."""
+        prices = [float(r['proposed_price']) for r in self.rounds
+                  if r.get('decision') == 'ACCEPT' and r.get('proposed_price') is not None]
+        last = self.last_counter()
+        if last is not None:
+            prices.append(last)
+        return min(prices) if prices else None
+
+    def replay(self, client_offer: float) -> Optional[Dict[str, Any]]:
+        """The last round when it was for this same offer (a retry); older rounds are never replayed."""
+        if self.rounds and self.rounds[-1].get('client_offer') == client_offer:
+            return self.rounds[-1]
+        return None
+
+    def record(self, client_offer: float, result: Dict[str, Any]):
+        self.rounds.append({'client_offer': client_offer, 'decision': result.get('decision'), 'proposed_price': result.get('proposed_price'),
+                            'source': result.get('source'), 'ts': time.time()})
+        # keep the model context small
+        del self.rounds[:-10]
+
+
+def product_fingerprint(product: Dict[str, Any]) -> tuple:
+    return tuple(product.get(f) for f in FLOOR_FIELDS)
+
+
+class SessionStore:
+    """TTL + size bounded session map keyed by offer_id (LRU order, expiry refreshed on use)."""
+
+    def __init__(self, ttl_s: float = SESSION_TTL_S, max_sessions: int = SESSION_MAX):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._sessions: 'OrderedDict[str, NegotiationSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, offer_id: str, fingerprint: tuple) -> Optional[NegotiationSession]:
+        now = time.monotonic()
+        with self._lock:
+            s = self._sessions.get(offer_id)
+            if s is None:
+                return None
+            if s.expires < now or s.fingerprint != fingerprint:
+                del self._sessions[offer_id]
+                return None
+            s.expires = now + self.ttl_s
+            self._sessions.move_to_end(offer_id)
+            return s
+
+    def put(self, session: NegotiationSession) -> NegotiationSession:
+        now = time.monotonic()
+        with self._lock:
+            session.expires = now + self.ttl_s
+            self._sessions[session.offer_id] = session
+            self._sessions.move_to_end(session.offer_id)
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if len(self._sessions) <= self.max_sessions and oldest.expires >= now:
+                    break
+                self._sessions.popitem(last=False)
+        return session
+
+    def drop(self, offer_id: str):
+        with self._lock:
+            self._sessions.pop(offer_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+SESSIONS = SessionStore()
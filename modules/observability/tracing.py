@@ -0,0 +1,268 @@
+from typing import Dict, Any, List, Optional
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# TRACING=0 turns span() into a no-op
+TRACING_ENABLED = os.environ.get('TRACING', '1') == '1'
+EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH')            # JSONL, one finished trace per line
+OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT')        # e.g. http://localhost:4318/v1/traces
+RECENT_TRACES = int(os.environ.get('TRACE_RECENT', 200))
+OTLP_QUEUE_MAX = int(os.environ.get('TRACE_OTLP_QUEUE', 1000))  # traces waiting for export; more are dropped
+OTLP_BATCH = 50
+
+_HEX_ID = re.compile(r'[0-9a-f]{16,32}')
+
+
+def valid_trace_id(value: Optional[str]) -> Optional[str]:
+    """Lower-cased id when it is 16-32 hex characters (safe as a key and to echo back), else None."""
+    value = (value or '').strip().lower()
+    return value if _HEX_ID.fullmatch(value) else None
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start_ts', 'duration_ms', 'attributes', 'status', '_t0', '_trace')
+
+    def __init__(self, trace: '_Trace', name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.trace_id = trace.trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else trace.parent_span_id
+        self.name = name
+        self.start_ts = time.time()
+        self.duration_ms: Optional[float] = None
+        self.attributes = attributes
+        self.status = 'ok'
+        self._t0 = time.perf_counter()
+        self._trace = trace
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id, 'name': self.name,
+                'start_ts': self.start_ts, 'duration_ms': self.duration_ms, 'status': self.status, 'attributes': self.attributes}
+
+
+class _Trace:
+    """Spans of one trace; shared by reference across the contexts (and tasks) of a request."""
+    __slots__ = ('trace_id', 'parent_span_id', 'spans', 'open', 'lock')
+
+    def __init__(self, trace_id: str = None, parent_span_id: str = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.parent_span_id = parent_span_id
+        self.spans: List[Span] = []
+        self.open = 0
+        self.lock = threading.Lock()
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def parse_traceparent(header: Optional[str]):
+    """W3C traceparent '00-<trace id>-<parent span id>-<flags>' -> (trace_id, parent_span_id)."""
+    try:
+        parts = (header or '').split('-')
+        if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and valid_trace_id(parts[1]) and valid_trace_id(parts[2]):
+            return parts[1].lower(), parts[2].lower()
+    except Exception:
+        pass
+    return None, None
+
+
+class _NoopSpan:
+    __slots__ = ()
+    duration_ms = None
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a span, nested under the current span; the outermost span ends the trace."""
+    if not TRACING_ENABLED:
+        yield _NOOP
+        return
+    trace = _current_trace.get()
+    trace_token = None
+    if trace is None:
+        trace = _Trace()
+        trace_token = _current_trace.set(trace)
+    parent = _current_span.get()
+    sp = Span(trace, name, parent, attributes)
+    with trace.lock:
+        trace.open += 1
+    token = _current_span.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.status = 'error'
+        sp.attributes['error'] = repr(e)
+        raise
+    finally:
+        sp.duration_ms = round((time.perf_counter() - sp._t0) * 1000, 3)
+        _current_span.reset(token)
+        with trace.lock:
+            trace.spans.append(sp)
+            trace.open -= 1
+            done = trace.open == 0 and parent is None
+        if trace_token is not None:
+            _current_trace.reset(trace_token)
+        if done:
+            COLLECTOR.finish(trace)
+
+
+@contextmanager
+def trace_context(trace_id: str = None, parent_span_id: str = None, name: str = 'request', **attributes):
+    """Root span for an incoming request, continuing an upstream trace id when one is given."""
+    if not TRACING_ENABLED:
+        yield _NOOP
+        return
+    token = _current_trace.set(_Trace(trace_id, parent_span_id))
+    try:
+        with span(name, **attributes) as sp:
+            yield sp
+    finally:
+        _current_trace.reset(token)
+
+
+# --- export --------------------------------------------------------------------
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str = 'allegro_app') -> Dict[str, Any]:
+    """OTLP/HTTP JSON payload (resourceSpans) for a finished trace."""
+    def attr(k, v):
+        if isinstance(v, bool):
+            return {'key': k, 'value': {'boolValue': v}}
+        if isinstance(v, int):
+            return {'key': k, 'value': {'intValue': str(v)}}
+        if isinstance(v, float):
+            return {'key': k, 'value': {'doubleValue': v}}
+        return {'key': k, 'value': {'stringValue': str(v)}}
+
+    out = []
+    for s in spans:
+        start_ns = int(s['start_ts'] * 1e9)
+        out.append({
+            'traceId': s['trace_id'],
+            'spanId': s['span_id'],
+            'parentSpanId': s['parent_id'] or '',
+            'name': s['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(start_ns + int((s['duration_ms'] or 0) * 1e6)),
+            'attributes': [attr(k, v) for k, v in s['attributes'].items()],
+            'status': {'code': 2 if s['status'] == 'error' else 1},
+        })
+    return {'resourceSpans': [{'resource': {'attributes': [attr('service.name', service_name)]},
+                               'scopeSpans': [{'scope': {'name': 'modules.observability.tracing'}, 'spans': out}]}]}
+
+
+class TraceCollector:
+    """Keeps recent finished traces in memory and exports them to a JSONL file and/or an OTLP endpoint.
+
+    OTLP export runs on one daemon thread fed by a bounded queue, posting up to OTLP_BATCH traces
+    per request; when the queue is full new traces are dropped (counted in otlp_dropped).
+    """
+
+    def __init__(self, export_path: Optional[str] = EXPORT_PATH, otlp_endpoint: Optional[str] = OTLP_ENDPOINT, keep: int = RECENT_TRACES,
+                 otlp_queue_max: int = OTLP_QUEUE_MAX):
+        self.export_path = export_path
+        self.otlp_endpoint = otlp_endpoint
+        self._recent: deque = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._otlp_queue: queue.Queue = queue.Queue(maxsize=otlp_queue_max)
+        self._otlp_thread: Optional[threading.Thread] = None
+        self.otlp_dropped = 0
+
+    def finish(self, trace: _Trace):
+        spans = [s.to_dict() for s in sorted(trace.spans, key=lambda s: s.start_ts)]
+        root = spans[0] if spans else {}
+        rec = {'trace_id': trace.trace_id, 'name': root.get('name'), 'start_ts': root.get('start_ts'),
+               'duration_ms': max((s['duration_ms'] or 0) for s in spans) if spans else 0, 'spans': spans}
+        with self._lock:
+            self._recent.append(rec)
+            if self.export_path:
+                try:
+                    with open(self.export_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(rec, ensure_ascii=False, default=str) + '\n')
+                except Exception:
+                    logger.exception('Trace export to %s failed', self.export_path)
+        if self.otlp_endpoint:
+            self._enqueue_otlp(spans)
+
+    def _enqueue_otlp(self, spans: List[Dict[str, Any]]):
+        if self._otlp_thread is None:
+            with self._lock:
+                if self._otlp_thread is None:
+                    self._otlp_thread = threading.Thread(target=self._otlp_loop, name='otlp-export', daemon=True)
+                    self._otlp_thread.start()
+        try:
+            self._otlp_queue.put_nowait(spans)
+        except queue.Full:
+            with self._lock:
+                self.otlp_dropped += 1
+
+    def _otlp_loop(self):
+        while True:
+            spans = list(self._otlp_queue.get())
+            for _ in range(OTLP_BATCH - 1):
+                try:
+                    spans.extend(self._otlp_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._post_otlp(spans)
+
+    def _post_otlp(self, spans: List[Dict[str, Any]]):
+        try:
+            body = json.dumps(to_otlp(spans), default=str).encode('utf-8')
+            req = urllib.request.Request(self.otlp_endpoint, data=body, headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(req, timeout=2).close()
+        except Exception as e:
+            logger.warning('OTLP export failed: %s', e)
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for rec in reversed(self._recent):
+                if rec['trace_id'] == trace_id:
+                    return rec
+        return None
+
+    def hot_paths(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Span names by total time across recent traces (where the time goes)."""
+        agg: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for rec in self._recent:
+                for s in rec['spans']:
+                    a = agg.setdefault(s['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                    a['count'] += 1
+                    a['total_ms'] += s['duration_ms'] or 0
+                    a['max_ms'] = max(a['max_ms'], s['duration_ms'] or 0)
+        rows = [{'name': k, **v, 'avg_ms': v['total_ms'] / v['count']} for k, v in agg.items()]
+        return sorted(rows, key=lambda r: -r['total_ms'])[:limit]
+
+
+COLLECTOR = TraceCollector()
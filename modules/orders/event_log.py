@@ -0,0 +1,449 @@
+from typing import Dict, Any, List, Optional, Iterator, Callable, Iterable, Tuple
+from array import array
+import atexit
+import bisect
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR = os.environ.get('ORDER_EVENT_LOG_DIR', os.path.join(os.getcwd(), '.order_events'))
+ENABLED = os.environ.get('ORDER_EVENT_LOG', '1') == '1'
+SEGMENT_BYTES = int(os.environ.get('ORDER_EVENT_SEGMENT_BYTES', 64 * 1024 * 1024))
+FSYNC_INTERVAL_MS = float(os.environ.get('ORDER_EVENT_FSYNC_MS', 10))
+SNAPSHOT_EVERY = int(os.environ.get('ORDER_EVENT_SNAPSHOT_EVERY', 50000))
+TIMELINE_MAX_OFFSETS = int(os.environ.get('ORDER_EVENT_TIMELINE_MAX', 1000))   # newest offsets kept per order; 0 = all
+KEEP_SNAPSHOTS = 2
+
+_FRAME = struct.Struct('<II')   # payload length, crc32 of payload
+
+
+def _encode(event: Dict[str, Any]) -> bytes:
+    payload = json.dumps(event, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _scan(data: bytes) -> Tuple[array, int]:
+    """Start positions of the intact frames in a segment, and where the intact part ends."""
+    positions = array('I')
+    pos, size = 0, len(data)
+    while pos + _FRAME.size <= size:
+        length, crc = _FRAME.unpack_from(data, pos)
+        end = pos + _FRAME.size + length
+        if end > size or zlib.crc32(data[pos + _FRAME.size:end]) != crc:
+            break
+        positions.append(pos)
+        pos = end
+    return positions, pos
+
+
+class _Segment:
+    __slots__ = ('base', 'path', 'positions', 'size')
+
+    def __init__(self, base: int, path: str, positions: array = None, size: int = 0):
+        self.base = base
+        self.path = path
+        self.positions = positions if positions is not None else array('I')
+        self.size = size
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.positions)
+
+
+class OrderTimeline:
+    """Per-order state folded from the log: first/last event time, last event type, counts per
+    event type and the offsets of the order's newest `max_offsets` events (so a timeline read never
+    scans the log). Counts stay exact when older offsets are dropped.
+
+    freeze() hands out a point-in-time view for a snapshot without copying the states; until thaw(),
+    apply() copies a frozen order's state before changing it.
+    """
+
+    def __init__(self, orders: Dict[str, Dict[str, Any]] = None, max_offsets: int = TIMELINE_MAX_OFFSETS):
+        self.orders: Dict[str, Dict[str, Any]] = orders or {}
+        self.max_offsets = max_offsets
+        self._frozen: Optional[Dict[str, Dict[str, Any]]] = None
+        self._thawed: set = set()
+
+    def apply(self, offset: int, event: Dict[str, Any]):
+        order_id = event.get('order_id')
+        if order_id is None:
+            return
+        st = self.orders.get(order_id)
+        if st is None:
+            st = self.orders[order_id] = {'order_id': order_id, 'first_ts': event['ts'], 'last_ts': event['ts'],
+                                          'last_event': None, 'counts': {}, 'offsets': array('Q')}
+        elif self._frozen is not None and order_id not in self._thawed and order_id in self._frozen:
+            st = self.orders[order_id] = {**st, 'counts': dict(st['counts']), 'offsets': array('Q', st['offsets'])}
+            self._thawed.add(order_id)
+        st['last_ts'] = event['ts']
+        st['last_event'] = event['type']
+        st['counts'][event['type']] = st['counts'].get(event['type'], 0) + 1
+        offsets = st['offsets']
+        offsets.append(offset)
+        if self.max_offsets and len(offsets) > self.max_offsets:
+            del offsets[:len(offsets) - self.max_offsets]
+
+    def freeze(self) -> Dict[str, Dict[str, Any]]:
+        self._frozen = dict(self.orders)
+        self._thawed = set()
+        return self._frozen
+
+    def thaw(self):
+        self._frozen = None
+        self._thawed = set()
+
+    @staticmethod
+    def dump(orders: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return {k: {**st, 'counts': dict(st['counts']), 'offsets': st['offsets'].tolist()} for k, st in orders.items()}
+
+    @classmethod
+    def load(cls, orders: Dict[str, Dict[str, Any]]) -> 'OrderTimeline':
+        return cls({k: {**st, 'offsets': array('Q', st['offsets'])} for k, st in orders.items()})
+
+
+class EventLog:
+    """Append-only order event log split into segment files.
+
+    Each segment `<base offset>.log` holds length+crc framed JSON events; its offset -> file position
+    index is kept in memory and written next to it (`.idx`) when the segment is sealed. Appends are
+    buffered and a background thread fsyncs them every `fsync_interval_ms`; durable appends wait for
+    the next fsync, so concurrent writers share one (group commit). The OrderTimeline projection is
+    snapshotted every `snapshot_every` events on a separate thread; reopening loads the newest
+    snapshot and replays only the events after it. A torn tail after a crash is cut off on open.
+    One writer per directory (flock): other processes opening it get OSError.
+    """
+
+    def __init__(self, path: str = LOG_DIR, segment_bytes: int = SEGMENT_BYTES, fsync_interval_ms: float = FSYNC_INTERVAL_MS,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.fsync_interval_s = fsync_interval_ms / 1000.0
+        self.snapshot_every = snapshot_every
+        self.timeline = OrderTimeline()
+        self.stats = {'appends': 0, 'durable_appends': 0, 'fsyncs': 0, 'snapshots': 0, 'replayed_on_open': 0}
+        self._segments: List[_Segment] = []
+        self._file = None
+        self._retired: List[Any] = []
+        self._next = 0
+        self._durable = 0
+        self._sync_requested = False
+        self._closed = False
+        self._snapshot_offset = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._snapshot_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._lockfile = open(os.path.join(path, 'LOCK'), 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lockfile.close()
+                raise OSError(f'event log {path} is in use by another process')
+        self._open()
+        self._flusher = threading.Thread(target=self._flush_loop, name='event-log-fsync', daemon=True)
+        self._flusher.start()
+        # snapshots run on their own thread so a long dump never delays group commit
+        self._snapshot_due = threading.Event()
+        self._snapshotter = threading.Thread(target=self._snapshot_loop, name='event-log-snapshot', daemon=True)
+        self._snapshotter.start()
+
+    # --- open / recovery ---------------------------------------------------------
+
+    def _seg_path(self, base: int, ext: str = 'log') -> str:
+        return os.path.join(self.path, f'{base:020d}.{ext}')
+
+    def _open(self):
+        bases = sorted(int(n[:-4]) for n in os.listdir(self.path) if n.endswith('.log') and n[:-4].isdigit())
+        for i, base in enumerate(bases):
+            seg = self._load_segment(base, last=i == len(bases) - 1)
+            if self._segments and seg.base != self._segments[-1].end:
+                logger.warning('Event log %s: segment %d does not follow offset %d', self.path, seg.base, self._segments[-1].end)
+            self._segments.append(seg)
+        if not self._segments:
+            self._segments.append(_Segment(0, self._seg_path(0)))
+        self._file = open(self._segments[-1].path, 'ab')
+        self._next = self._durable = self._segments[-1].end
+
+        snap = self._load_snapshot()
+        if snap is not None:
+            self.timeline = OrderTimeline.load(snap['orders'])
+            self._snapshot_offset = snap['offset']
+        for offset, event in self.read(self._snapshot_offset):
+            self.timeline.apply(offset, event)
+            self.stats['replayed_on_open'] += 1
+
+    def _load_segment(self, base: int, last: bool) -> _Segment:
+        path = self._seg_path(base)
+        size = os.path.getsize(path)
+        idx = self._seg_path(base, 'idx')
+        if not last and os.path.exists(idx):
+            positions = array('I')
+            with open(idx, 'rb') as f:
+                positions.frombytes(f.read())
+            if positions and positions[-1] < size:
+                return _Segment(base, path, positions, size)
+        with open(path, 'rb') as f:
+            positions, end = _scan(f.read())
+        if end < size:
+            logger.warning('Event log %s: dropping %d bytes of torn/corrupt records at offset %d', path, size - end, base + len(positions))
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+        return _Segment(base, path, positions, end)
+
+    def _load_snapshot(self) -> Optional[Dict[str, Any]]:
+        for name in sorted((n for n in os.listdir(self.path) if n.startswith('snapshot-') and n.endswith('.json')), reverse=True):
+            try:
+                with open(os.path.join(self.path, name), 'r', encoding='utf-8') as f:
+                    snap = json.load(f)
+                if snap['offset'] <= self._next:
+                    return snap
+            except Exception:
+                logger.warning('Event log %s: unreadable snapshot %s', self.path, name)
+        return None
+
+    # --- writes ----------------------------------------------------------------
+
+    def append(self, event_type: str, order_id: Any = None, data: Dict[str, Any] = None, ts: float = None,
+               durable: bool = False) -> int:
+        """Append one event and return its offset. durable=True returns only once it is fsynced."""
+        event = {'ts': ts or time.time(), 'type': event_type, 'order_id': None if order_id is None else str(order_id), 'data': data or {}}
+        frame = _encode(event)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('event log is closed')
+            seg = self._segments[-1]
+            if seg.size and seg.size + len(frame) > self.segment_bytes:
+                seg = self._roll()
+            self._file.write(frame)
+            seg.positions.append(seg.size)
+            seg.size += len(frame)
+            offset = self._next
+            self._next += 1
+            self.timeline.apply(offset, event)
+            self.stats['appends'] += 1
+            if durable:
+                self.stats['durable_appends'] += 1
+                self._sync_requested = True
+                self._cond.notify_all()
+                while self._durable <= offset and not self._closed:
+                    self._cond.wait()
+        return offset
+
+    def _roll(self) -> _Segment:
+        # called with the lock held; the flusher fsyncs and closes the sealed file
+        self._file.flush()
+        self._retired.append(self._file)
+        sealed = self._segments[-1]
+        with open(self._seg_path(sealed.base, 'idx'), 'wb') as f:
+            f.write(sealed.positions.tobytes())
+        seg = _Segment(self._next, self._seg_path(self._next))
+        self._segments.append(seg)
+        self._file = open(seg.path, 'ab')
+        return seg
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if not self._sync_requested and not self._closed:
+                    self._cond.wait(self.fsync_interval_s)
+                closed = self._closed
+                target = self._next
+                retired, self._retired = self._retired, []
+                self._sync_requested = False
+                if target > self._durable:
+                    self._file.flush()
+                fd = self._file.fileno()
+            for f in retired:
+                os.fsync(f.fileno())
+                f.close()
+            if target > self._durable:
+                os.fsync(fd)
+                with self._cond:
+                    self._durable = max(self._durable, target)
+                    self.stats['fsyncs'] += 1
+                    self._cond.notify_all()
+            if closed:
+                return
+            if self.snapshot_every and target - self._snapshot_offset >= self.snapshot_every:
+                self._snapshot_due.set()
+
+    def _snapshot_loop(self):
+        while True:
+            self._snapshot_due.wait()
+            self._snapshot_due.clear()
+            if self._closed:
+                return
+            # the flusher keeps signalling while a snapshot runs; skip if that one already covered it
+            if self._next - self._snapshot_offset < self.snapshot_every:
+                continue
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception('Event log %s: snapshot failed', self.path)
+
+    def flush(self):
+        """Block until everything appended so far is fsynced."""
+        with self._cond:
+            target = self._next
+            self._sync_requested = True
+            self._cond.notify_all()
+            while self._durable < target and not self._closed:
+                self._cond.wait()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Persist the timeline projection; reopening replays only the events after it.
+
+        Only the order map is copied under the log lock; the states are serialized after it is
+        released while appends copy-on-write the orders they touch.
+        """
+        with self._snapshot_lock:
+            with self._cond:
+                offset = self._next
+                frozen = self.timeline.freeze()
+            try:
+                orders = OrderTimeline.dump(frozen)
+            finally:
+                with self._cond:
+                    self.timeline.thaw()
+            path = os.path.join(self.path, f'snapshot-{offset:020d}.json')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'offset': offset, 'ts': time.time(), 'orders': orders}, f, ensure_ascii=False, separators=(',', ':'), default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+            self._snapshot_offset = offset
+            self.stats['snapshots'] += 1
+            old = sorted(n for n in os.listdir(self.path) if n.startswith('snapshot-') and n.endswith('.json'))
+            for name in old[:-KEEP_SNAPSHOTS]:
+                os.remove(os.path.join(self.path, name))
+            return {'offset': offset, 'orders': len(orders), 'path': path}
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._snapshot_due.set()
+        self._snapshotter.join()
+        self._flusher.join()
+        self._file.close()
+        self._lockfile.close()
+
+    # --- reads -----------------------------------------------------------------
+
+    def _view(self, to_offset: Optional[int]) -> Tuple[List[_Segment], int]:
+        with self._cond:
+            if not self._closed:
+                self._file.flush()
+            end = self._next if to_offset is None else min(to_offset, self._next)
+            return list(self._segments), end
+
+    def read(self, from_offset: int = 0, to_offset: int = None, types: Iterable[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(offset, event) pairs in log order, from `from_offset` up to (excluding) `to_offset`."""
+        segments, end = self._view(to_offset)
+        types = set(types) if types else None
+        offset = max(from_offset, 0)
+        for seg in segments:
+            if seg.end <= offset or seg.base >= end:
+                continue
+            offset = max(offset, seg.base)
+            with open(seg.path, 'rb') as f:
+                f.seek(seg.positions[offset - seg.base])
+                while offset < min(seg.end, end):
+                    length, _ = _FRAME.unpack(f.read(_FRAME.size))
+                    event = json.loads(f.read(length))
+                    if types is None or event['type'] in types:
+                        yield offset, event
+                    offset += 1
+
+    def get(self, offsets: Iterable[int]) -> List[Dict[str, Any]]:
+        """Random reads by offset (e.g. one order's events from its timeline)."""
+        segments, end = self._view(None)
+        bases = [s.base for s in segments]
+        out = []
+        for offset in offsets:
+            seg = segments[bisect.bisect_right(bases, offset) - 1] if 0 <= offset < end else None
+            if seg is None or offset >= seg.end:
+                continue
+            with open(seg.path, 'rb') as f:
+                f.seek(seg.positions[offset - seg.base])
+                length, _ = _FRAME.unpack(f.read(_FRAME.size))
+                out.append({'offset': offset, **json.loads(f.read(length))})
+        return out
+
+    def order_timeline(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            st = self.timeline.orders.get(str(order_id))
+            if st is None:
+                return None
+            summary = {k: v for k, v in st.items() if k != 'offsets'}
+            offsets = list(st['offsets'])
+        counts = dict(summary['counts'])
+        # only the newest TIMELINE_MAX_OFFSETS events are indexed; counts cover all of them
+        return {**summary, 'counts': counts, 'events': self.get(offsets), 'events_omitted': sum(counts.values()) - len(offsets)}
+
+    def replay(self, fold: Callable[[Any, Dict[str, Any]], Any], state: Any = None, from_offset: int = 0,
+               to_offset: int = None, types: Iterable[str] = None) -> Any:
+        """Fold events into `state` (state = fold(state, event)), e.g. to re-derive a dashboard."""
+        for offset, event in self.read(from_offset, to_offset, types):
+            state = fold(state, {'offset': offset, **event})
+        return state
+
+    def __len__(self) -> int:
+        return self._next
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self.stats, 'path': self.path, 'next_offset': self._next, 'durable_offset': self._durable,
+                    'segments': len(self._segments), 'bytes': sum(s.size for s in self._segments),
+                    'orders': len(self.timeline.orders), 'snapshot_offset': self._snapshot_offset}
+
+
+_LOG: Optional[EventLog] = None
+_LOG_LOCK = threading.Lock()
+_UNAVAILABLE = not ENABLED
+
+
+def get_log() -> Optional[EventLog]:
+    """Process-wide log in LOG_DIR, opened on first use; None when disabled or not writable."""
+    global _LOG, _UNAVAILABLE
+    if _LOG is not None or _UNAVAILABLE:
+        return _LOG
+    with _LOG_LOCK:
+        if _LOG is None and not _UNAVAILABLE:
+            try:
+                _LOG = EventLog()
+                atexit.register(_LOG.close)
+            except OSError:
+                # e.g. a second uvicorn worker: one writing process per directory
+                logger.exception('Order event log unavailable at %s; lifecycle events are not recorded by this process '
+                                 '(each worker needs its own ORDER_EVENT_LOG_DIR)', LOG_DIR)
+                _UNAVAILABLE = True
+        return _LOG
+
+
+def record_event(event_type: str, order_id: Any, data: Dict[str, Any] = None, durable: bool = False) -> Optional[int]:
+    """Best-effort append of an order lifecycle event; never fails the caller."""
+    if order_id is None:
+        return None
+    log = get_log()
+    if log is None:
+        return None
+    try:
+        return log.append(event_type, order_id, data, durable=durable)
+    except Exception:
+        logger.exception('Recording %s for order %s failed', event_type, order_id)
+        return None
@@ -0,0 +1,108 @@
+from typing import Dict, Any, Callable, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_TTL_S = float(os.environ.get('ORDER_DEDUPE_TTL_S', 24 * 3600))
+DEDUPE_MAX_ENTRIES = int(os.environ.get('ORDER_DEDUPE_MAX_ENTRIES', 50000))
+
+
+def order_event_key(order_data: Dict[str, Any]) -> Optional[str]:
+    """Build idempotency key `order_id@revision` for an Allegro order event.
+
+    Revision falls back to the event's update timestamp, then to a hash of the payload (so only an
+    identical retry is deduplicated); orders without id are not deduplicated.
+    """
+    order_id = order_data.get('order_id') or order_data.get('id') or order_data.get('orderId')
+    if not order_id:
+        return None
+    revision = (order_data.get('revision') or order_data.get('event_revision') or order_data.get('eventId')
+                or order_data.get('updatedAt') or order_data.get('updated_at'))
+    if not revision:
+        payload = json.dumps(order_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+        revision = 'sha1:' + hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+    return f"{order_id}@{revision}"
+
+
+class _InFlight:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DedupeIndex:
+    """Bounded TTL index of finished results plus coalescing of concurrent duplicates.
+
+    Entries are kept in insertion order, so with a fixed TTL the oldest entry is also the
+    first to expire; eviction and expiry are both O(1) amortized.
+    """
+
+    def __init__(self, ttl_s: float = DEDUPE_TTL_S, max_entries: int = DEDUPE_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._done: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.stats = {'runs': 0, 'replays': 0, 'coalesced': 0, 'evicted': 0}
+
+    def _purge(self, now: float):
+        while self._done:
+            key, (expires, _) = next(iter(self._done.items()))
+            if expires > now and len(self._done) <= self.max_entries:
+                break
+            self._done.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    def run_once(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, replayed). `fn` runs at most once per key within the TTL."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            hit = self._done.get(key)
+            if hit is not None:
+                self.stats['replays'] += 1
+                return hit[1], True
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = _InFlight()
+
+        if not owner:
+            pending.event.wait()
+            with self._lock:
+                self.stats['coalesced'] += 1
+            if pending.error is not None:
+                raise pending.error
+            return pending.result, True
+
+        try:
+            pending.result = fn()
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.stats['runs'] += 1
+                if pending.error is None:
+                    self._done[key] = (time.monotonic() + self.ttl_s, pending.result)
+                    self._purge(time.monotonic())
+            pending.event.set()
+        return pending.result, False
+
+    def forget(self, key: str):
+        with self._lock:
+            self._done.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'size': len(self._done), 'inflight': len(self._inflight), 'ttl_s': self.ttl_s, 'max_entries': self.max_entries}
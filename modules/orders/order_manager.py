@@ -1,22 +1,57 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 from modules.orders.workflow_engine import process_order_flow
+from modules.orders.idempotency import DedupeIndex, order_event_key
+from modules.orders.order_store import OrderStore, OrderSummary
+from modules.orders.event_log import get_log, record_event
+from modules.finance.margin_analytics import record_order
+from modules.observability.tracing import span, current_trace_id
 
 logger = logging.getLogger(__name__)
 
-# In-memory store for processed orders (simple persistence during runtime)
-_ORDERS_STORE: Dict[str, Dict[str, Any]] = {}
+# Processed orders: compact dashboard rows in memory, full summaries (raw_status) in the cold store
+_STORE = OrderStore()
+
+# Replayed webhooks (same order id + event revision) short-circuit to the stored summary;
+# the index keeps only the order id, the summary is reloaded from the store. The store holds one
+# summary per order, so a replayed older revision is answered with the latest revision's summary.
+_DEDUPE = DedupeIndex()
 
 
 def process_new_order(order_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Main entry: process a new order through the workflow and store status."""
+    """Main entry: process a new order through the workflow and store status.
+
+    Duplicate deliveries of the same order event return the stored summary (the order's latest
+    revision, not necessarily the replayed one); concurrent duplicates wait for the in-flight run
+    instead of starting another one.
+    """
+    key = order_event_key(order_data)
+    # joins the HTTP request trace when called from an endpoint, else starts its own
+    with span('order.process', order_id=order_data.get('order_id') or order_data.get('id'), event_key=key) as sp:
+        if key is None:
+            return _process_order(order_data)
+        fresh: Dict[str, Any] = {}
+
+        def run():
+            fresh['summary'] = _process_order(order_data)
+            return fresh['summary']['order_id']
+
+        order_id, replayed = _DEDUPE.run_once(key, run)
+        sp.set(replayed=replayed)
+        if replayed:
+            logger.info('Order event %s already processed, returning stored summary', key)
+        return fresh.get('summary') or _STORE.detail(order_id)
+
+
+def _process_order(order_data: Dict[str, Any]) -> Dict[str, Any]:
     order_id = order_data.get('order_id') or order_data.get('id') or order_data.get('orderId')
     if not order_id:
-        order_id = f"tmp-{len(_ORDERS_STORE)+1}"
+        order_id = f"tmp-{len(_STORE)+1}"
         order_data['order_id'] = order_id
 
     logger.info('Processing new order %s', order_id)
     status = process_order_flow(order_data)
+    record_order(order_data, status)
 
     # store a lightweight dashboard summary
     summary = {
@@ -28,11 +63,40 @@ def process_new_order(order_data: Dict[str, Any]) -> Dict[str, Any]:
             'message': status.get('steps', {}).get('communication', {}).get('reply', {}).get('reply_text') if status.get('steps', {}).get('communication') else None,
             'risk': status.get('steps', {}).get('risk_analysis')
         },
+        'trace_id': current_trace_id(),
+        'step_durations_ms': status.get('step_durations_ms', {}),
         'raw_status': status
     }
-    _ORDERS_STORE[str(order_id)] = summary
+    row = _STORE.put(summary)
+    record_event('order.processed', order_id, row.fields())
     return summary
 
 
 def get_dashboard_orders() -> List[Dict[str, Any]]:
-    return list(_ORDERS_STORE.values())
+    return _STORE.rows()
+
+
+def get_order(order_id: str) -> Optional[Dict[str, Any]]:
+    """Full summary of a processed order, raw_status included (loaded from the cold store)."""
+    return _STORE.detail(order_id)
+
+
+def get_store_stats() -> Dict[str, Any]:
+    return _STORE.stats()
+
+
+def replay_dashboard(from_offset: int = 0) -> List[Dict[str, Any]]:
+    """Re-derive dashboard rows from the event log: the latest order.processed event per order."""
+    log = get_log()
+    if log is None:
+        return []
+
+    def fold(rows: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        rows[event['order_id']] = OrderSummary(**event['data']).to_dict()
+        return rows
+
+    return list(log.replay(fold, {}, from_offset=from_offset, types=('order.processed',)).values())
+
+
+def get_dedupe_stats() -> Dict[str, Any]:
+    return _DEDUPE.snapshot()
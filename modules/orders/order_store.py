@@ -0,0 +1,276 @@
+from typing import Dict, Any, List, Optional, Tuple
+from array import array
+from collections import OrderedDict
+import json
+import logging
+import math
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: single-writer is then up to the deployment
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# append-only file for full order summaries; an empty value keeps them zlib-compressed in memory
+COLD_STORE_PATH = os.environ.get('ORDER_COLD_STORE_PATH', os.path.join(os.getcwd(), '.order_store', 'summaries.cold'))
+COLD_COMPRESS_LEVEL = int(os.environ.get('ORDER_COLD_COMPRESS_LEVEL', 1))
+# in-memory mode only: oldest summaries are dropped beyond this many compressed bytes
+COLD_MAX_MEMORY_BYTES = int(os.environ.get('ORDER_COLD_MAX_MEMORY_BYTES', 64 * 1024 * 1024))
+
+_NAN = float('nan')
+_HEADER = struct.Struct('<HI')   # key length, payload length
+
+
+class _Codes:
+    """Interns repeated strings (carrier names, statuses) as small ints; 0 stands for None."""
+
+    def __init__(self, values=()):
+        self.values: List[Optional[str]] = [None]
+        self.index: Dict[str, int] = {}
+        for v in values:
+            self.code(v)
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        c = self.index.get(value)
+        if c is None:
+            c = self.index[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+
+class OrderSummary:
+    """Dashboard fields of one processed order."""
+
+    __slots__ = ('order_id', 'total_price', 'margin', 'carrier', 'risk', 'severity', 'status')
+
+    def __init__(self, order_id: str, total_price: Optional[float] = None, margin: Optional[float] = None,
+                 carrier: Optional[str] = None, risk: bool = False, severity: Optional[str] = None, status: Optional[str] = None):
+        self.order_id = order_id
+        self.total_price = total_price
+        self.margin = margin
+        self.carrier = carrier
+        self.risk = risk
+        self.severity = severity
+        self.status = status
+
+    @classmethod
+    def from_summary(cls, summary: Dict[str, Any]) -> 'OrderSummary':
+        """Pick the dashboard fields out of an order_manager summary."""
+        raw = summary.get('raw_status') or {}
+        risk = (raw.get('steps') or {}).get('risk_analysis') or {}
+        margin = ((raw.get('steps') or {}).get('finance') or {}).get('margin')
+        return cls(str(summary['order_id']), _float(summary.get('total_price')), _float(margin),
+                   (summary.get('intelligence_status') or {}).get('carrier'),
+                   bool(risk.get('risk')), risk.get('severity'), raw.get('status'))
+
+    def fields(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'order_id': self.order_id,
+            'total_price': self.total_price,
+            'status': self.status,
+            'intelligence_status': {
+                'profit': None if self.margin is None else f"{self.margin}",
+                'carrier': self.carrier,
+                'risk': self.risk,
+                'severity': self.severity,
+            },
+        }
+
+
+def _float(v: Any) -> Optional[float]:
+    try:
+        return None if v is None else float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _opt(v: float) -> Optional[float]:
+    return None if math.isnan(v) else v
+
+
+class ColdStore:
+    """Full order summaries (step results, AI replies, packing slips), loaded one at a time on demand.
+
+    Payloads are zlib-compressed JSON. With a path they are appended to a single file and only
+    an id -> (offset, length) index stays in memory; a later record for the same id supersedes
+    the earlier one. A torn last record after a crash is cut off on load. One process writes a
+    file (flock); when the file is taken or not writable the store falls back to memory.
+    In memory, blobs are capped at `max_memory_bytes`; the oldest summaries are dropped first and
+    their detail() is then None (the dashboard row stays).
+    """
+
+    def __init__(self, path: Optional[str] = COLD_STORE_PATH, level: int = COLD_COMPRESS_LEVEL,
+                 max_memory_bytes: int = COLD_MAX_MEMORY_BYTES):
+        self.path = path or None
+        self.level = level
+        self.max_memory_bytes = max_memory_bytes
+        self._blobs: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._bytes = 0
+        self._evicted = 0
+        self._fd = None
+        self._lock = threading.Lock()
+        if self.path:
+            try:
+                self._open()
+            except OSError as e:
+                logger.warning('Cold store %s unavailable (%s); keeping summaries in memory, capped at %d bytes',
+                               self.path, e, max_memory_bytes)
+                self.path = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                raise
+        self._fd = fd
+        size = os.fstat(self._fd).st_size
+        pos = 0
+        while pos + _HEADER.size <= size:
+            klen, plen = _HEADER.unpack(os.pread(self._fd, _HEADER.size, pos))
+            end = pos + _HEADER.size + klen + plen
+            if end > size:
+                break
+            key = os.pread(self._fd, klen, pos + _HEADER.size).decode('utf-8')
+            self._offsets[key] = (pos + _HEADER.size + klen, plen)
+            pos = end
+        if pos < size:
+            logger.warning('Cold store %s: dropping torn record at offset %d', self.path, pos)
+            os.ftruncate(self._fd, pos)
+        self._bytes = pos
+
+    def put(self, key: str, payload: Dict[str, Any]):
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'), self.level)
+        with self._lock:
+            if self._fd is None:
+                old = self._blobs.pop(key, None)
+                self._blobs[key] = data
+                self._bytes += len(data) - (len(old) if old else 0)
+                while self._bytes > self.max_memory_bytes and len(self._blobs) > 1:
+                    _, dropped = self._blobs.popitem(last=False)
+                    self._bytes -= len(dropped)
+                    self._evicted += 1
+                return
+            kb = key.encode('utf-8')
+            pos = self._bytes
+            os.pwrite(self._fd, _HEADER.pack(len(kb), len(data)) + kb + data, pos)
+            self._offsets[key] = (pos + _HEADER.size + len(kb), len(data))
+            self._bytes = pos + _HEADER.size + len(kb) + len(data)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._fd is None:
+                data = self._blobs.get(key)
+            else:
+                loc = self._offsets.get(key)
+                data = os.pread(self._fd, loc[1], loc[0]) if loc else None
+        return None if data is None else json.loads(zlib.decompress(data))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._blobs or key in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) if self._fd is not None else len(self._blobs)
+
+    def stats(self) -> Dict[str, Any]:
+        out = {'path': self.path, 'records': len(self), 'bytes': self._bytes}
+        if self._fd is None:
+            out.update(max_bytes=self.max_memory_bytes, evicted=self._evicted)
+        return out
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class OrderStore:
+    """Dashboard rows kept column-wise in typed arrays, full summaries in a ColdStore.
+
+    A row costs a few dozen bytes (plus the order id); carrier names and statuses are interned.
+    Storing an order id again overwrites its row in place.
+    """
+
+    def __init__(self, cold: Optional[ColdStore] = None):
+        self.cold = cold if cold is not None else ColdStore()
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._total = array('d')
+        self._margin = array('d')
+        self._carrier = array('H')
+        self._severity = array('H')
+        self._status = array('B')
+        self._risk = array('B')
+        self._carriers = _Codes()
+        self._severities = _Codes(('low', 'medium', 'high'))
+        self._statuses = _Codes(('PROCESSING_OK', 'ORDER_STUCK_HUMAN_INTERVENTION'))
+        self._lock = threading.Lock()
+
+    def put(self, summary: Dict[str, Any]) -> OrderSummary:
+        row = OrderSummary.from_summary(summary)
+        self.cold.put(row.order_id, summary)
+        with self._lock:
+            values = (_NAN if row.total_price is None else row.total_price, _NAN if row.margin is None else row.margin,
+                      self._carriers.code(row.carrier), self._severities.code(row.severity),
+                      self._statuses.code(row.status), int(row.risk))
+            i = self._rows.get(row.order_id)
+            if i is None:
+                self._rows[row.order_id] = len(self._ids)
+                self._ids.append(row.order_id)
+                for col, v in zip(self._columns(), values):
+                    col.append(v)
+            else:
+                for col, v in zip(self._columns(), values):
+                    col[i] = v
+        return row
+
+    def _columns(self):
+        return (self._total, self._margin, self._carrier, self._severity, self._status, self._risk)
+
+    def _row(self, i: int) -> OrderSummary:
+        return OrderSummary(self._ids[i], _opt(self._total[i]), _opt(self._margin[i]), self._carriers.values[self._carrier[i]],
+                            bool(self._risk[i]), self._severities.values[self._severity[i]], self._statuses.values[self._status[i]])
+
+    def get(self, order_id: str) -> Optional[OrderSummary]:
+        i = self._rows.get(str(order_id))
+        return None if i is None else self._row(i)
+
+    def detail(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Full summary as returned by process_new_order (raw_status included).
+
+        Falls back to the dashboard row when the cold store has dropped the summary (memory cap).
+        """
+        summary = self.cold.get(str(order_id))
+        if summary is None:
+            row = self.get(order_id)
+            return None if row is None else row.to_dict()
+        return summary
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            n = len(self._ids)
+        return [self._row(i).to_dict() for i in range(n)]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, order_id: str) -> bool:
+        return str(order_id) in self._rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {'orders': len(self._ids), 'column_bytes': sum(c.itemsize * len(c) for c in self._columns()),
+                'carriers': len(self._carriers.values) - 1, 'cold': self.cold.stats()}
@@ -2,6 +2,8 @@ from typing import Dict, Any, List
 import logging
 from datetime import datetime, timedelta
 
+from modules.orders.event_log import record_event
+
 logger = logging.getLogger(__name__)
 
 # Simple in-memory queue for scheduled review messages
@@ -19,13 +21,17 @@ def enqueue_review_on_delivery(order_data: Dict[str, Any]):
     # due in 3 days
     due = datetime.utcnow() + timedelta(days=3)
     _REVIEW_QUEUE.append({'order_id': order_id, 'due': due, 'order': order_data})
+    record_event('order.delivered', order_id, {'review_due': due.isoformat()})
     logger.info('Enqueued review for %s at %s', order_id, due.isoformat())
     return {'ok': True, 'order_id': order_id, 'due': due.isoformat()}
 
 
 def run_due_reviews(now: datetime = None) -> Dict[str, Any]:
     """Process queued reviews that are due. Returns summary of sent messages."""
-    from modules.ai.base import BaseAIHandler
+    global _REVIEW_QUEUE
+    from modules.ai.base import BaseAIHandler, record_fallback
+    from modules.ai.prompt_builder import build_prompt
+    from modules.ai.router import route_generate
     now = now or datetime.utcnow()
     sent = []
     remaining = []
@@ -34,26 +40,23 @@ def run_due_reviews(now: datetime = None) -> Dict[str, Any]:
         if job['due'] <= now:
             try:
                 order = job['order']
-                prompt = {
-                    'task': 'Generate personalized friendly review request message tailored to customer tone',
-                    'order': order,
-                    'instructions': 'Return JSON: { message: string }'
-                }
-                resp = handler.generate(prompt)
+                prompt = build_prompt('review_request', {'order_id': job['order_id'], 'order': order})
+                resp = route_generate(handler, 'review_request', prompt)
                 message = None
                 if resp.get('ok') and isinstance(resp.get('response'), dict):
                     message = resp['response'].get('message')
                 if not message:
+                    record_fallback('review_request')
                     message = f"Dziękujemy za zakup {order.get('items',[{}])[0].get('product_name','produkt')}. Będziemy wdzięczni za opinię!"
                 sent.append({'order_id': job['order_id'], 'message': message})
                 _SENT.append({'order_id': job['order_id'], 'message': message, 'ts': datetime.utcnow().isoformat()})
+                record_event('review.requested', job['order_id'], {'ai': bool(resp.get('ok'))})
             except Exception:
                 logger.exception('Failed to send review for %s', job.get('order_id'))
         else:
             remaining.append(job)
 
     # replace queue with remaining
-    global _REVIEW_QUEUE
     _REVIEW_QUEUE = remaining
     return {'ok': True, 'sent': sent, 'remaining': len(_REVIEW_QUEUE)}
 
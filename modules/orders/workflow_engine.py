@@ -1,16 +1,40 @@
 from typing import Dict, Any, List
+from contextlib import contextmanager
+import importlib
 import logging
+import os
+import time
+
+from modules.observability.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Model-backed steps that never ran before _safe_import resolved attr=None modules; opt in per deployment
+INVENTORY_STEP = os.environ.get('ORDER_FLOW_INVENTORY', '0') == '1'
+CONFIRMATION_STEP = os.environ.get('ORDER_FLOW_CONFIRMATION', '0') == '1'
+
 
 def _safe_import(module_path: str, attr: str = None):
-    try:
-        mod = __import__(module_path, fromlist=[attr] if attr else [])
-        return getattr(mod, attr) if attr else mod
-    except Exception:
-        logger.exception('Optional import failed: %s.%s', module_path, attr)
-        return None
+    # import_module returns the leaf module (bare __import__ returned the top-level package,
+    # so attr=None lookups like modules.inventory.guard never resolved)
+    with span('import', module=module_path):
+        try:
+            mod = importlib.import_module(module_path)
+            return getattr(mod, attr) if attr else mod
+        except Exception:
+            logger.exception('Optional import failed: %s.%s', module_path, attr)
+            return None
+
+
+@contextmanager
+def _step(status: Dict[str, Any], name: str):
+    """Trace a workflow step and record its duration in status['step_durations_ms']."""
+    start = time.perf_counter()
+    with span(f'workflow.{name}', order_id=status.get('order_id')) as sp:
+        try:
+            yield sp
+        finally:
+            status.setdefault('step_durations_ms', {})[name] = round((time.perf_counter() - start) * 1000, 3)
 
 
 def analyze_order_risk(order_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -19,15 +43,16 @@ def analyze_order_risk(order_data: Dict[str, Any]) -> Dict[str, Any]:
     if BaseAIHandler is None:
         return {'ok': False, 'error': 'AI handler unavailable', 'risk': False}
 
+    build_prompt = _safe_import('modules.ai.prompt_builder', 'build_prompt')
+    route_generate = _safe_import('modules.ai.router', 'route_generate')
     handler = BaseAIHandler()
-    prompt = {
-        'task': 'Analyze order for risk/anomaly',
-        'order': order_data,
-        'instructions': 'Return JSON: { risk: bool, reasons: [str], severity: "low|medium|high", action: "human"|"auto" }'
-    }
-    resp = handler.generate(prompt)
+    prompt = build_prompt('order_risk', {'order': order_data})
+    resp = route_generate(handler, 'order_risk', prompt)
     if not resp.get('ok'):
         logger.warning('AI risk analysis failed: %s', resp.get('error'))
+        record_fallback = _safe_import('modules.ai.base', 'record_fallback')
+        if record_fallback is not None:
+            record_fallback('order_risk')
         # basic heuristic: negative margin or suspicious address
         margin = None
         try:
@@ -80,101 +105,102 @@ def process_order_flow(order_data: Dict[str, Any]) -> Dict[str, Any]:
     status: Dict[str, Any] = {'order_id': order_data.get('order_id') or order_data.get('id'), 'steps': {}}
 
     # Step 1: Finance
-    try:
-        calc = _safe_import('modules.finance.calculator', 'calculate_margin')
-        if calc:
-            # aggregate product costs from items if available
-            items = order_data.get('items', [])
-            total_cost = 0.0
-            for it in items:
-                total_cost += float(it.get('cost', 0)) * int(it.get('qty', 1))
-            product_costs = {'cost': total_cost, 'packaging': float(order_data.get('packaging_cost', 0)), 'shipping': float(order_data.get('shipping_cost', 0)), 'ads': float(order_data.get('ads_cost', 0))}
-            marketplace_fees = {'fee_pct': float(order_data.get('marketplace_fee_pct', 0.15))}
-            margin = calc(float(order_data.get('total_price', 0)), product_costs, marketplace_fees)
-            status['steps']['finance'] = {'ok': True, 'margin': margin}
-            order_data['calculated_margin'] = margin
-        else:
-            status['steps']['finance'] = {'ok': False, 'error': 'calculator_unavailable'}
-    except Exception:
-        logger.exception('Finance step failed')
-        status['steps']['finance'] = {'ok': False, 'error': 'exception'}
+    with _step(status, 'finance'):
+        try:
+            calc = _safe_import('modules.finance.calculator', 'calculate_margin')
+            if calc:
+                # aggregate product costs from items if available
+                items = order_data.get('items', [])
+                total_cost = 0.0
+                for it in items:
+                    total_cost += float(it.get('cost', 0)) * int(it.get('qty', 1))
+                product_costs = {'cost': total_cost, 'packaging': float(order_data.get('packaging_cost', 0)), 'shipping': float(order_data.get('shipping_cost', 0)), 'ads': float(order_data.get('ads_cost', 0))}
+                marketplace_fees = {'fee_pct': float(order_data.get('marketplace_fee_pct', 0.15))}
+                margin = calc(float(order_data.get('total_price', 0)), product_costs, marketplace_fees)
+                status['steps']['finance'] = {'ok': True, 'margin': margin}
+                order_data['calculated_margin'] = margin
+            else:
+                status['steps']['finance'] = {'ok': False, 'error': 'calculator_unavailable'}
+        except Exception:
+            logger.exception('Finance step failed')
+            status['steps']['finance'] = {'ok': False, 'error': 'exception'}
 
     # Ads integration: check margin and flag PAUSE_ADS if needed (best-effort)
-    try:
-        ads_eval = _safe_import('modules.ads.ads_integrator', 'evaluate_product_for_ads')
-        if ads_eval:
-            ads_actions = []
-            for it in order_data.get('items', []):
-                sku = it.get('sku') or it.get('id')
-                m = order_data.get('calculated_margin') or 0
-                try:
-                    res = ads_eval(it, m, config=None)
-                    if res.get('flag'):
-                        ads_actions.append(res)
-                except Exception:
-                    logger.exception('Ads evaluation failed for %s', sku)
-            status['steps']['ads'] = {'ok': True, 'actions': ads_actions}
-        else:
-            status['steps']['ads'] = {'ok': False, 'error': 'ads_integrator_unavailable'}
-    except Exception:
-        logger.exception('Ads step failed')
-        status['steps']['ads'] = {'ok': False, 'error': 'exception'}
+    with _step(status, 'ads'):
+        try:
+            ads_eval = _safe_import('modules.ads.ads_integrator', 'evaluate_products_for_ads')
+            if ads_eval:
+                ads_actions = ads_eval(order_data.get('items', []), order_data.get('calculated_margin') or 0, config=None)
+                status['steps']['ads'] = {'ok': True, 'actions': ads_actions}
+            else:
+                status['steps']['ads'] = {'ok': False, 'error': 'ads_integrator_unavailable'}
+        except Exception:
+            logger.exception('Ads step failed')
+            status['steps']['ads'] = {'ok': False, 'error': 'exception'}
 
     # Step 2: Inventory
-    try:
-        guard = _safe_import('modules.inventory.guard', None)
-        if guard:
-            # for each product call predict_stock_health asynchronously (best-effort)
-            inventory_actions = []
-            for it in order_data.get('items', []):
-                prod_id = it.get('id') or it.get('product_id') or it.get('sku')
-                sales_history = it.get('sales_history', [])
-                lead_time = int(it.get('lead_time_days', 14))
-                try:
-                    res = guard.predict_stock_health(prod_id, sales_history, lead_time, product={'price': it.get('price'), 'cost': it.get('cost')})
-                    inventory_actions.append({ 'product_id': prod_id, 'result': res })
-                except Exception:
-                    logger.exception('inventory check failed for %s', prod_id)
-            status['steps']['inventory'] = {'ok': True, 'results': inventory_actions}
-        else:
-            status['steps']['inventory'] = {'ok': False, 'error': 'inventory_guard_unavailable'}
-    except Exception:
-        logger.exception('Inventory step failed')
-        status['steps']['inventory'] = {'ok': False, 'error': 'exception'}
+    with _step(status, 'inventory'):
+        try:
+            guard = _safe_import('modules.inventory.guard', None) if INVENTORY_STEP else None
+            if not INVENTORY_STEP:
+                status['steps']['inventory'] = {'ok': False, 'error': 'disabled'}
+            elif guard:
+                # for each product call predict_stock_health asynchronously (best-effort)
+                inventory_actions = []
+                for it in order_data.get('items', []):
+                    prod_id = it.get('id') or it.get('product_id') or it.get('sku')
+                    sales_history = it.get('sales_history', [])
+                    lead_time = int(it.get('lead_time_days', 14))
+                    try:
+                        res = guard.predict_stock_health(prod_id, sales_history, lead_time, product={'price': it.get('price'), 'cost': it.get('cost')})
+                        inventory_actions.append({ 'product_id': prod_id, 'result': res })
+                    except Exception:
+                        logger.exception('inventory check failed for %s', prod_id)
+                status['steps']['inventory'] = {'ok': True, 'results': inventory_actions}
+            else:
+                status['steps']['inventory'] = {'ok': False, 'error': 'inventory_guard_unavailable'}
+        except Exception:
+            logger.exception('Inventory step failed')
+            status['steps']['inventory'] = {'ok': False, 'error': 'exception'}
 
     # Step 3: Communication - generate thank you / ETA message
-    try:
-        messaging = _safe_import('modules.messaging.messaging_engine', None)
-        if messaging:
-            message_ctx = {'order_id': order_data.get('order_id'), 'product': order_data.get('items', [])[0] if order_data.get('items') else {}, 'lang': order_data.get('lang', 'pl')}
-            message_data = {'message_text': 'order_confirmation', 'sentiment': 'positive', 'intent': 'confirmation', 'urgency': 1}
-            reply = messaging.generate_smart_reply(message_data, message_ctx)
-            status['steps']['communication'] = {'ok': True, 'reply': reply}
-        else:
-            status['steps']['communication'] = {'ok': False, 'error': 'messaging_unavailable'}
-    except Exception:
-        logger.exception('Communication step failed')
-        status['steps']['communication'] = {'ok': False, 'error': 'exception'}
+    with _step(status, 'communication'):
+        try:
+            messaging = _safe_import('modules.messaging.messaging_engine', None) if CONFIRMATION_STEP else None
+            if not CONFIRMATION_STEP:
+                status['steps']['communication'] = {'ok': False, 'error': 'disabled'}
+            elif messaging:
+                message_ctx = {'order_id': order_data.get('order_id'), 'product': order_data.get('items', [])[0] if order_data.get('items') else {}, 'lang': order_data.get('lang', 'pl')}
+                message_data = {'message_text': 'order_confirmation', 'sentiment': 'positive', 'intent': 'confirmation', 'urgency': 1}
+                reply = messaging.generate_smart_reply(message_data, message_ctx)
+                status['steps']['communication'] = {'ok': True, 'reply': reply}
+            else:
+                status['steps']['communication'] = {'ok': False, 'error': 'messaging_unavailable'}
+        except Exception:
+            logger.exception('Communication step failed')
+            status['steps']['communication'] = {'ok': False, 'error': 'exception'}
 
     # Step 4: Logistics - select carrier and prepare docs
-    try:
-        logistics = reserve_carrier_and_prepare_docs(order_data)
-        status['steps']['logistics'] = {'ok': True, 'result': logistics}
-    except Exception:
-        logger.exception('Logistics step failed')
-        status['steps']['logistics'] = {'ok': False, 'error': 'exception'}
+    with _step(status, 'logistics'):
+        try:
+            logistics = reserve_carrier_and_prepare_docs(order_data)
+            status['steps']['logistics'] = {'ok': True, 'result': logistics}
+        except Exception:
+            logger.exception('Logistics step failed')
+            status['steps']['logistics'] = {'ok': False, 'error': 'exception'}
 
     # AI Safety Net: risk analysis
-    try:
-        risk = analyze_order_risk(order_data)
-        status['steps']['risk_analysis'] = risk
-        if risk.get('risk') and risk.get('action') == 'human':
-            status['status'] = 'ORDER_STUCK_HUMAN_INTERVENTION'
-        else:
+    with _step(status, 'risk_analysis'):
+        try:
+            risk = analyze_order_risk(order_data)
+            status['steps']['risk_analysis'] = risk
+            if risk.get('risk') and risk.get('action') == 'human':
+                status['status'] = 'ORDER_STUCK_HUMAN_INTERVENTION'
+            else:
+                status['status'] = 'PROCESSING_OK'
+        except Exception:
+            logger.exception('Risk analysis failed')
+            status['steps']['risk_analysis'] = {'ok': False, 'error': 'exception'}
             status['status'] = 'PROCESSING_OK'
-    except Exception:
-        logger.exception('Risk analysis failed')
-        status['steps']['risk_analysis'] = {'ok': False, 'error': 'exception'}
-        status['status'] = 'PROCESSING_OK'
 
     return status
@@ -2,8 +2,6 @@ import os
 import json
 import logging
 from typing import Dict, Any, List
-import bcrypt
-import jwt
 import time
 
 logger = logging.getLogger(__name__)
@@ -51,10 +49,12 @@ def _save_allowed(users: List[Dict[str, Any]]):
 
 
 def _hash_password(raw: str) -> str:
+    import bcrypt  # lazy: only login/registration hash passwords
     return bcrypt.hashpw(raw.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 
 def _verify_password(raw: str, hashed: str) -> bool:
+    import bcrypt
     try:
         return bcrypt.checkpw(raw.encode('utf-8'), hashed.encode('utf-8'))
     except Exception:
@@ -62,6 +62,7 @@ def _verify_password(raw: str, hashed: str) -> bool:
 
 
 def authenticate_issue_token(email: str, password: str) -> Dict[str, Any]:
+    import jwt  # lazy: PyJWT (and its crypto backends) load on the first auth call, not at startup
     users = _load_allowed()
     # find user
     for u in users:
@@ -88,6 +89,7 @@ def authenticate_issue_token(email: str, password: str) -> Dict[str, Any]:
 
 
 def verify_token(token: str) -> Dict[str, Any]:
+    import jwt
     try:
         data = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
         return {'ok': True, 'email': data.get('sub')}
@@ -0,0 +1,301 @@
+from typing import Dict, Any, List, Iterable, Iterator, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from modules.seo.seo_engine import optimize_listing
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.environ.get('SEO_JOBS_DIR', os.path.join(os.getcwd(), '.seo_jobs'))
+CHUNK_SIZE = int(os.environ.get('SEO_JOB_CHUNK_SIZE', 100))
+WORKERS = int(os.environ.get('SEO_JOB_WORKERS', 8))
+RATE_PER_S = float(os.environ.get('SEO_JOB_RATE_PER_S', 5))
+MAX_RETRIES = int(os.environ.get('SEO_JOB_MAX_RETRIES', 2))
+
+
+def read_feed(path: str) -> Iterator[Dict[str, Any]]:
+    """Products from a JSONL feed (one product per line) or a JSON list."""
+    with open(path, encoding='utf-8') as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate_per_s apart across all worker threads (rate <= 0 disables)."""
+
+    def __init__(self, rate_per_s: float):
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))], 2)
+
+
+class SeoJob:
+    """Bulk optimize_listing over a product feed, checkpointed per chunk.
+
+    Job directory: job.json (parameters), feed.jsonl, results.jsonl (one line per product, written
+    as each chunk finishes) and checkpoint.json (chunks done, output offset, counters). On resume
+    the output is truncated back to the last checkpointed offset, so a crash mid-chunk never leaves
+    duplicate lines and the chunk is simply redone.
+    """
+
+    def __init__(self, job_id: str, jobs_dir: str = None, optimize: Callable[[Dict[str, Any]], Dict[str, Any]] = None):
+        self.job_id = job_id
+        self.dir = os.path.join(jobs_dir or JOBS_DIR, job_id)
+        self.optimize = optimize or optimize_listing
+        with open(os.path.join(self.dir, 'job.json'), encoding='utf-8') as f:
+            self.params = json.load(f)
+        self.checkpoint = self._load_checkpoint()
+        self.status = 'done' if self.checkpoint.get('finished') else 'pending'
+        self.error: Optional[str] = None
+        self._latencies: List[float] = []
+        self._run_started: Optional[float] = None
+        self._run_items = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, products: Iterable[Dict[str, Any]], job_id: str = None, jobs_dir: str = None, chunk_size: int = None,
+               workers: int = None, rate_per_s: float = None, max_retries: int = None, model: str = None, **kw) -> 'SeoJob':
+        job_id = job_id or uuid.uuid4().hex[:12]
+        path = os.path.join(jobs_dir or JOBS_DIR, job_id)
+        os.makedirs(path, exist_ok=True)
+        total = 0
+        with open(os.path.join(path, 'feed.jsonl'), 'w', encoding='utf-8') as f:
+            for p in products:
+                f.write(json.dumps(p, ensure_ascii=False) + '\n')
+                total += 1
+        _write_json(os.path.join(path, 'job.json'), {
+            'job_id': job_id,
+            'total': total,
+            'chunk_size': chunk_size or CHUNK_SIZE,
+            'workers': workers or WORKERS,
+            'rate_per_s': RATE_PER_S if rate_per_s is None else rate_per_s,
+            'max_retries': MAX_RETRIES if max_retries is None else max_retries,
+            'model': model,
+            'created_ts': time.time(),
+        })
+        return cls(job_id, jobs_dir=jobs_dir, **kw)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self._path('checkpoint.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'chunks_done': 0, 'items_done': 0, 'output_offset': 0, 'retries': 0, 'failed': 0, 'elapsed_s': 0.0, 'finished': False}
+
+    def _chunks(self, skip: int) -> Iterator[List[Dict[str, Any]]]:
+        size = self.params['chunk_size']
+        chunk: List[Dict[str, Any]] = []
+        for i, product in enumerate(read_feed(self._path('feed.jsonl'))):
+            if i < skip * size:
+                continue
+            chunk.append(product)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _optimize_one(self, limiter: RateLimiter, product: Dict[str, Any]) -> Dict[str, Any]:
+        key = str(product.get('sku') or product.get('id') or '')
+        attempts = 0
+        start = time.perf_counter()
+        result: Dict[str, Any] = {}
+        while attempts <= self.params['max_retries']:
+            if attempts:
+                time.sleep(min(8.0, 0.5 * 2 ** (attempts - 1)))
+            attempts += 1
+            limiter.wait()
+            try:
+                if self.params.get('model'):
+                    result = self.optimize(product, model=self.params['model'])
+                else:
+                    result = self.optimize(product)
+            except Exception as e:
+                logger.warning('SEO job %s item %s failed: %s', self.job_id, key, e)
+                result = {'error': str(e), 'source': 'error'}
+                continue
+            # optimize_listing returns a basic fallback listing when the model call fails
+            if result.get('source') not in ('fallback', 'error'):
+                break
+        latency_ms = (time.perf_counter() - start) * 1000
+        ok = result.get('source') not in ('fallback', 'error')
+        return {'key': key, 'ok': ok, 'attempts': attempts, 'latency_ms': round(latency_ms, 2), 'result': result}
+
+    def run(self) -> Dict[str, Any]:
+        """Process remaining chunks; safe to call again after a crash or stop()."""
+        cp = self.checkpoint
+        if cp.get('finished'):
+            self.status = 'done'
+            return self.stats()
+        if self.status != 'stopping':
+            # start_job/resume_job already claimed it; a stop() in between still wins
+            self.status = 'running'
+        self._run_started = time.monotonic()
+        self._run_items = 0
+        limiter = RateLimiter(self.params['rate_per_s'])
+        out_path = self._path('results.jsonl')
+        if not os.path.exists(out_path):
+            open(out_path, 'w').close()
+        try:
+            with open(out_path, 'r+b') as out, ThreadPoolExecutor(max_workers=self.params['workers'], thread_name_prefix=f'seo-{self.job_id}') as pool:
+                out.truncate(cp['output_offset'])
+                out.seek(cp['output_offset'])
+                for chunk in self._chunks(cp['chunks_done']):
+                    if self.status == 'stopping':
+                        break
+                    chunk_start = time.monotonic()
+                    rows = list(pool.map(lambda p: self._optimize_one(limiter, p), chunk))
+                    for row in rows:
+                        out.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+                    out.flush()
+                    os.fsync(out.fileno())
+                    with self._lock:
+                        self._latencies.extend(r['latency_ms'] for r in rows)
+                        self._run_items += len(rows)
+                        cp['chunks_done'] += 1
+                        cp['items_done'] += len(rows)
+                        cp['retries'] += sum(r['attempts'] - 1 for r in rows)
+                        cp['failed'] += sum(1 for r in rows if not r['ok'])
+                        cp['elapsed_s'] += time.monotonic() - chunk_start
+                        cp['output_offset'] = out.tell()
+                        _write_json(self._path('checkpoint.json'), cp)
+            if self.status == 'stopping':
+                self.status = 'stopped'
+            else:
+                cp['finished'] = True
+                _write_json(self._path('checkpoint.json'), cp)
+                self.status = 'done'
+        except Exception as e:
+            logger.exception('SEO job %s crashed', self.job_id)
+            self.status = 'failed'
+            self.error = str(e)
+        return self.stats()
+
+    def stop(self):
+        """Stop after the current chunk; the job can be resumed later."""
+        if self.status == 'running':
+            self.status = 'stopping'
+
+    def stats(self) -> Dict[str, Any]:
+        cp = self.checkpoint
+        with self._lock:
+            lat = list(self._latencies)
+            run_elapsed = time.monotonic() - self._run_started if self._run_started else 0.0
+            run_items = self._run_items
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'error': self.error,
+            'total': self.params['total'],
+            'done': cp['items_done'],
+            'chunks_done': cp['chunks_done'],
+            'retries': cp['retries'],
+            'failed': cp['failed'],
+            'elapsed_s': round(cp['elapsed_s'], 2),
+            'items_per_s': round(run_items / run_elapsed, 2) if run_elapsed > 0 else None,
+            'latency_ms': {'p50': _percentile(lat, 0.50), 'p95': _percentile(lat, 0.95), 'p99': _percentile(lat, 0.99)},
+            'results_path': self._path('results.jsonl'),
+        }
+
+    def iter_results(self, offset: int = 0) -> Iterator[str]:
+        """Completed result lines (JSONL) from line `offset` on, up to the last checkpoint."""
+        path = self._path('results.jsonl')
+        if not os.path.exists(path):
+            return
+        limit = self.checkpoint['output_offset']
+        with open(path, 'rb') as f:
+            n = 0
+            while f.tell() < limit:
+                line = f.readline()
+                if not line:
+                    break
+                if n >= offset:
+                    yield line.decode('utf-8')
+                n += 1
+
+
+_JOBS: Dict[str, SeoJob] = {}
+_JOBS_LOCK = threading.Lock()
+
+
+def get_job(job_id: str) -> Optional[SeoJob]:
+    """In-memory job, or one found on disk (e.g. after a restart)."""
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is None and os.path.exists(os.path.join(JOBS_DIR, job_id, 'job.json')):
+            job = _JOBS[job_id] = SeoJob(job_id)
+        return job
+
+
+def start_job(products: Iterable[Dict[str, Any]], **params) -> SeoJob:
+    """Create a job from a product feed and run it in a background thread."""
+    job = SeoJob.create(products, **params)
+    with _JOBS_LOCK:
+        _JOBS[job.job_id] = job
+        job.status = 'running'
+    threading.Thread(target=job.run, name=f'seo-job-{job.job_id}', daemon=True).start()
+    return job
+
+
+def resume_job(job_id: str) -> Optional[SeoJob]:
+    job = get_job(job_id)
+    if job is None:
+        return None
+    # claim the job before the thread starts, so a second resume cannot start another writer
+    with _JOBS_LOCK:
+        if job.status in ('running', 'stopping', 'done'):
+            return job
+        job.status = 'running'
+    threading.Thread(target=job.run, name=f'seo-job-{job.job_id}', daemon=True).start()
+    return job
+
+
+if __name__ == '__main__':
+    # usage: python -m modules.seo.bulk_jobs feed.jsonl [job_id]  (re-run with the same job_id to resume)
+    import sys
+    jid = sys.argv[2] if len(sys.argv) > 2 else None
+    if jid and os.path.exists(os.path.join(JOBS_DIR, jid, 'job.json')):
+        job = SeoJob(jid)
+    else:
+        job = SeoJob.create(read_feed(sys.argv[1]), job_id=jid)
+    print(json.dumps(job.run(), indent=2, ensure_ascii=False))
@@ -1,26 +1,60 @@
 from typing import Dict, Any, List
 from modules.ai.ai_handler import call_gemini
-from prompts import AGENT_PERSONA
+from modules.ai.base import record_fallback
+from modules.ai.prompt_builder import build_prompt
+from modules.seo.dedup_index import get_index, listing_text
+from modules.seo.keyword_index import index_listing
+import hashlib
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# extra model rounds to replace variations rejected as near-duplicates
+DEDUP_MAX_REGEN = int(os.environ.get('SEO_DEDUP_MAX_REGEN', 1))
 
-def clone_and_variate(listing_id: str, base_listing: Dict[str, Any] = None, count: int = 5, model: str = 'models/gemini-3-pro-preview') -> List[Dict[str, Any]]:
+
+def _ask_variations(base_listing: Dict[str, Any], count: int, model: str, avoid: List[str] = None) -> List[Dict[str, Any]]:
+    payload = {'count': count, 'base_listing': base_listing}
+    if avoid:
+        payload['avoid_similar_to'] = avoid
+    prompt = build_prompt('seo_clone', payload)
+
+    resp = call_gemini(prompt, model=model, response_mime_type='application/json')
+    if not resp.get('ok'):
+        logger.error('SEO cloner failed: %s', resp.get('error'))
+        return None
+
+    parsed = resp.get('response')
+    if isinstance(parsed, list):
+        return parsed
+    # if response wrapped in dict
+    if isinstance(parsed, dict) and parsed.get('variations'):
+        return parsed.get('variations')
+
+    return []
+
+
+def _variation_id(listing_id: str, variation: Dict[str, Any]) -> str:
+    return f"{listing_id}:{hashlib.sha1(listing_text(variation).encode('utf-8')).hexdigest()[:10]}"
+
+
+def clone_and_variate(listing_id: str, base_listing: Dict[str, Any] = None, count: int = 5, model: str = 'models/gemini-3-pro-preview', dedup: bool = True) -> List[Dict[str, Any]]:
     """Generate `count` unique variations of a base listing.
 
     If base_listing is None, function assumes caller will supply base data or fetch it externally.
+    With dedup, each variation is checked against the listing catalogue index (and the variations
+    accepted before it); near-duplicates are regenerated up to SEO_DEDUP_MAX_REGEN times and
+    dropped after that. Accepted variations are added to the index.
     Returns list of variations: [{title, html_description, keywords, angle}]
     """
     if base_listing is None:
         raise RuntimeError('base_listing must be provided for cloning')
 
-    prompt = f"{AGENT_PERSONA}\nModuł: SEO Cloner\nWeź poniższy opis i wygeneruj {count} unikalnych wersji. Każda wersja ma mieć inny 'kąt' sprzedaży (np. oszczędność, premium, szybkość dostawy), unikalną strukturę zdań i nagłówki. Zwróć odpowiedź w JSON jako lista obiektów z polami: title, html_description, keywords, angle.\n\nBase listing:\n{base_listing}\n"
-
-    resp = call_gemini(prompt, model=model, response_mime_type='application/json')
-    if not resp.get('ok'):
-        logger.error('SEO cloner failed: %s', resp.get('error'))
+    variations = _ask_variations(base_listing, count, model)
+    if variations is None:
         # fallback: naive variations
+        record_fallback('seo_clone')
         variations = []
         for i in range(count):
             variations.append({
@@ -30,12 +64,37 @@ def clone_and_variate(listing_id: str, base_listing: Dict[str, Any] = None, coun
                 'angle': 'fallback'
             })
         return variations
+    if not dedup:
+        return variations
 
-    parsed = resp.get('response')
-    if isinstance(parsed, list):
-        return parsed
-+    # if response wrapped in dict
-+    if isinstance(parsed, dict) and parsed.get('variations'):
-+        return parsed.get('variations')
-+
-+    return []
+    index = get_index()
+    if listing_id not in index:
+        index.add_listing(listing_id, base_listing)
+    accepted: List[Dict[str, Any]] = []
+    regen = 0
+    while True:
+        rejected = []
+        for v in variations:
+            if not isinstance(v, dict) or len(accepted) >= count:
+                continue
+            sig = index.signature(listing_text(v))
+            # too short to compare: accepted without a duplicate check and not indexed
+            hits = index.query(sig=sig) if sig is not None else []
+            if hits:
+                dup = hits[0]
+                logger.info('Variation %r of %s rejected: near-duplicate of %s (%.2f)', v.get('title'), listing_id, dup[0], dup[1])
+                rejected.append(v.get('title') or '')
+                continue
+            vid = _variation_id(listing_id, v)
+            if sig is not None:
+                index.add(vid, sig=sig)
+            index_listing(vid, v)
+            accepted.append(v)
+        missing = count - len(accepted)
+        if missing <= 0 or not rejected or regen >= DEDUP_MAX_REGEN:
+            break
+        regen += 1
+        variations = _ask_variations(base_listing, missing, model, avoid=[base_listing.get('title') or ''] + [a.get('title') or '' for a in accepted] + rejected)
+        if not variations:
+            break
+    return accepted
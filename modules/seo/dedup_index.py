@@ -0,0 +1,228 @@
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+from array import array
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+
+from modules.messaging.intent_classifier import fold
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.environ.get('SEO_DEDUP_INDEX_PATH')
+THRESHOLD = float(os.environ.get('SEO_DEDUP_THRESHOLD', 0.7))
+NUM_PERM = 128
+BANDS = 16          # 16 bands x 8 rows: candidate pairs start around Jaccard ~0.7
+SHINGLE_WORDS = 3
+
+_MERSENNE = (1 << 61) - 1
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w+')
+
+
+def listing_text(listing: Dict[str, Any]) -> str:
+    """Title plus description with HTML stripped: the text Allegro compares for duplicate content."""
+    desc = listing.get('html_description') or listing.get('description') or ''
+    return f"{listing.get('title') or ''} {_TAG_RE.sub(' ', desc)}"
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> set:
+    """k-word shingles; text shorter than one shingle has none."""
+    words = _WORD_RE.findall(fold(text))
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class MinHashLSH:
+    """MinHash signatures over word shingles, banded into LSH buckets.
+
+    A query only scores listings sharing at least one band bucket with it, so lookups stay
+    sub-linear in catalogue size. Optionally persisted as an append-only JSONL log (header line,
+    then one add/delete record per line), replayed on load; compact() rewrites it.
+    """
+
+    def __init__(self, path: Optional[str] = INDEX_PATH, threshold: float = THRESHOLD, num_perm: int = NUM_PERM,
+                 bands: int = BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+        self._sigs: Dict[str, array] = {}
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    # --- signatures ------------------------------------------------------------
+
+    def signature(self, text: str) -> Optional[array]:
+        """None for text too short to shingle: it would match every other such text."""
+        hashes = [_hash64(s) for s in shingles(text)]
+        if not hashes:
+            return None
+        return array('Q', (min((a * h + b) % _MERSENNE for h in hashes) for a, b in self._perms))
+
+    def _band_keys(self, sig: array) -> List[bytes]:
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    @staticmethod
+    def similarity(a: array, b: array) -> float:
+        return sum(1 for x, y in zip(a, b) if x == y) / float(len(a))
+
+    # --- index -----------------------------------------------------------------
+
+    def _insert(self, doc_id: str, sig: array):
+        self._remove(doc_id)
+        self._sigs[doc_id] = sig
+        for band, key in zip(self._buckets, self._band_keys(sig)):
+            band.setdefault(key, set()).add(doc_id)
+
+    def _remove(self, doc_id: str) -> bool:
+        sig = self._sigs.pop(doc_id, None)
+        if sig is None:
+            return False
+        for band, key in zip(self._buckets, self._band_keys(sig)):
+            ids = band.get(key)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del band[key]
+        return True
+
+    def add(self, doc_id: str, text: str = None, sig: array = None) -> Optional[array]:
+        """Index (or re-index) a listing; returns None and drops any old entry when the text has no signature."""
+        sig = sig if sig is not None else self.signature(text or '')
+        if sig is None:
+            self.remove(doc_id)
+            return None
+        with self._lock:
+            self._insert(doc_id, sig)
+            self._append({'id': doc_id, 'sig': base64.b64encode(sig.tobytes()).decode('ascii')})
+        return sig
+
+    def add_listing(self, doc_id: str, listing: Dict[str, Any]) -> Optional[array]:
+        return self.add(doc_id, listing_text(listing))
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> int:
+        n = 0
+        for doc_id, text in items:
+            n += self.add(doc_id, text) is not None
+        return n
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(doc_id)
+            if removed:
+                self._append({'id': doc_id, 'del': True})
+        return removed
+
+    def query(self, text: str = None, sig: array = None, threshold: float = None, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Indexed listings with estimated Jaccard similarity >= threshold, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        sig = sig if sig is not None else self.signature(text or '')
+        if sig is None:
+            return []
+        skip = set(exclude)
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._buckets, self._band_keys(sig)):
+                candidates |= band.get(key, set())
+            scored = [(cid, self.similarity(sig, self._sigs[cid])) for cid in candidates - skip]
+        return sorted([c for c in scored if c[1] >= threshold], key=lambda c: -c[1])
+
+    def is_duplicate(self, text: str, exclude: Iterable[str] = ()) -> Optional[Tuple[str, float]]:
+        hits = self.query(text, exclude=exclude)
+        return hits[0] if hits else None
+
+    def __len__(self):
+        return len(self._sigs)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._sigs
+
+    # --- persistence -----------------------------------------------------------
+
+    def _header(self) -> Dict[str, Any]:
+        return {'minhash': 1, 'num_perm': self.num_perm, 'bands': self.bands, 'seed': self.seed, 'shingle_words': SHINGLE_WORDS}
+
+    def _append(self, record: Dict[str, Any]):
+        if not self.path:
+            return
+        try:
+            new = not os.path.exists(self.path)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if new:
+                    f.write(json.dumps(self._header()) + '\n')
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception:
+            logger.exception('Failed to persist dedup index record')
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            header = json.loads(f.readline() or '{}')
+            if header == self._header():
+                self._replay(f)
+        if header != self._header():
+            # signatures from other parameters are not comparable; start a new log
+            logger.warning('Dedup index %s built with other parameters (%s); starting over', self.path, header)
+            os.replace(self.path, self.path + '.stale')
+            return
+        with open(self.path, 'rb+') as f:
+            # terminate a torn last line so the next append starts on its own line
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+    def _replay(self, f):
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                # torn last line after a crash
+                continue
+            if rec.get('del'):
+                self._remove(rec['id'])
+            else:
+                self._insert(rec['id'], array('Q', base64.b64decode(rec['sig'])))
+
+    def compact(self):
+        """Rewrite the log with one record per live listing."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(self._header()) + '\n')
+                for doc_id, sig in self._sigs.items():
+                    f.write(json.dumps({'id': doc_id, 'sig': base64.b64encode(sig.tobytes()).decode('ascii')}, ensure_ascii=False) + '\n')
+            os.replace(tmp, self.path)
+
+
+_INDEX: Optional[MinHashLSH] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index() -> MinHashLSH:
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = MinHashLSH()
+        return _INDEX
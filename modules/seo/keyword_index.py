@@ -0,0 +1,401 @@
+from typing import Dict, Any, List, Iterable, Optional, Set, Tuple
+import bisect
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+
+from modules.messaging.intent_classifier import fold
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.environ.get('SEO_KEYWORD_INDEX_PATH')
+AUTOSAVE_EVERY = int(os.environ.get('SEO_KEYWORD_INDEX_AUTOSAVE_EVERY', 1000))
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset(fold(w) for w in (
+    'i', 'w', 'z', 'na', 'do', 'od', 'dla', 'oraz', 'lub', 'albo', 'ze', 'się', 'jest', 'to', 'ten', 'ta', 'po', 'przy',
+    'bez', 'pod', 'nad', 'o', 'u', 'a', 'jak', 'tak', 'nie', 'czy', 'co', 'który', 'która', 'które', 'jego', 'jej',
+    'the', 'and', 'for', 'with', 'of',
+))
+# inflection endings stripped (longest first) when at least 4 characters of stem remain;
+# folded, so 'ów' -> 'ow', 'ą' -> 'a' etc.
+_SUFFIXES = tuple(sorted({
+    'ami', 'ach', 'ego', 'emu', 'ych', 'ymi', 'ich', 'imi', 'owi', 'owie', 'om', 'ow', 'em', 'ie', 'ej', 'a', 'e', 'i', 'o', 'u', 'y',
+}, key=len, reverse=True))
+
+# Binary format (little endian), everything after the header is read through mmap:
+#   header: magic, n_terms, n_docs, terms_off, entries_off, postings_off, docs_off, docs_len
+#   term blob: concatenated utf-8 terms, sorted
+#   entries: n_terms x (term_off u32, term_len u16, postings_off u32, postings_count u32)
+#   postings: per term, ascending doc numbers as delta varints
+#   docs: JSON list of listing ids by doc number
+_MAGIC = b'KWIDX01\x00'
+_HEADER = struct.Struct('<8sIIQQQQQ')
+_ENTRY = struct.Struct('<IHII')
+
+
+def stem(token: str) -> str:
+    for suf in _SUFFIXES:
+        if token.endswith(suf) and len(token) - len(suf) >= 4:
+            return token[:-len(suf)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded (no Polish diacritics), lowercased, stop-word free and lightly stemmed tokens."""
+    return [stem(t) for t in _WORD_RE.findall(fold(text or '')) if t not in STOPWORDS and len(t) > 1]
+
+
+def keyword_key(keyword: str) -> str:
+    """Normalized keyword phrase, used to find listings targeting the same keyword."""
+    return ' '.join(tokenize(keyword))
+
+
+def listing_terms(listing: Dict[str, Any]) -> Set[str]:
+    """Terms indexed for a listing: plain tokens from all fields, `kw:` tokens and `kwp:` phrases from keywords."""
+    desc = listing.get('html_description') or listing.get('description') or ''
+    terms = set(tokenize(listing.get('title') or ''))
+    terms.update(tokenize(_TAG_RE.sub(' ', desc)))
+    for kw in listing.get('keywords') or []:
+        if not isinstance(kw, str):
+            continue
+        toks = tokenize(kw)
+        terms.update(toks)
+        terms.update('kw:' + t for t in toks)
+        if toks:
+            terms.add('kwp:' + ' '.join(toks))
+    return terms
+
+
+def _encode_postings(ids: List[int]) -> bytes:
+    out = bytearray()
+    prev = 0
+    for i in ids:
+        d = i - prev
+        prev = i
+        while d >= 0x80:
+            out.append((d & 0x7F) | 0x80)
+            d >>= 7
+        out.append(d)
+    return bytes(out)
+
+
+def _decode_postings(buf, offset: int, count: int) -> List[int]:
+    out = []
+    val = 0
+    for _ in range(count):
+        shift = d = 0
+        while True:
+            b = buf[offset]
+            offset += 1
+            d |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        val += d
+        out.append(val)
+    return out
+
+
+class _Segment:
+    """Read-only memory-mapped index file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_terms, self.n_docs, self.terms_off, self.entries_off, self.postings_off, docs_off, docs_len = _HEADER.unpack_from(self.buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f'{path} is not a keyword index')
+        self.docs: List[Optional[str]] = json.loads(self.buf[docs_off:docs_off + docs_len].decode('utf-8'))
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self.buf, self.entries_off + i * _ENTRY.size)
+
+    def _term(self, i: int) -> bytes:
+        t_off, t_len, _, _ = self._entry(i)
+        start = self.terms_off + t_off
+        return self.buf[start:start + t_len]
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _postings_at(self, i: int) -> List[int]:
+        _, _, p_off, count = self._entry(i)
+        return _decode_postings(self.buf, self.postings_off + p_off, count)
+
+    def postings(self, term: str) -> List[int]:
+        key = term.encode('utf-8')
+        i = self._lower_bound(key)
+        if i < self.n_terms and self._term(i) == key:
+            return self._postings_at(i)
+        return []
+
+    def prefix(self, prefix: str) -> Iterable[Tuple[str, List[int]]]:
+        key = prefix.encode('utf-8')
+        i = self._lower_bound(key)
+        while i < self.n_terms:
+            term = self._term(i)
+            if not term.startswith(key):
+                break
+            yield term.decode('utf-8'), self._postings_at(i)
+            i += 1
+
+    def close(self):
+        self.buf.close()
+        self._file.close()
+
+
+class KeywordIndex:
+    """Inverted index over listing titles, descriptions and keywords.
+
+    A memory-mapped base segment (from save()) plus an in-memory delta for updates since; a
+    re-indexed or removed listing tombstones its old document number. Queries:
+      - space separated terms are ANDed, `OR` separates alternatives
+      - `-term` excludes, `term*` matches a prefix
+      - `kw:term` matches keyword tokens only, `"a b"` an exact keyword phrase
+    """
+
+    def __init__(self, path: Optional[str] = INDEX_PATH):
+        self.path = path
+        self._base: Optional[_Segment] = None
+        self._docs: List[Optional[str]] = []
+        self._doc_of: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+        self._delta: Dict[str, Set[int]] = {}
+        self._delta_terms: List[str] = []
+        self._dirty = 0
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self._open(path)
+
+    def _open(self, path: str):
+        seg = _Segment(path)
+        self._base = seg
+        self._docs = list(seg.docs)
+        self._doc_of = {d: i for i, d in enumerate(self._docs) if d is not None}
+        self._deleted = {i for i, d in enumerate(self._docs) if d is None}
+        self._delta = {}
+        self._delta_terms = []
+
+    # --- updates ---------------------------------------------------------------
+
+    def add(self, listing_id: str, listing: Dict[str, Any]):
+        """Index (or re-index) a listing: {title, description|html_description, keywords}."""
+        terms = listing_terms(listing)
+        with self._lock:
+            self._remove(listing_id)
+            doc = len(self._docs)
+            self._docs.append(listing_id)
+            self._doc_of[listing_id] = doc
+            for t in terms:
+                ids = self._delta.get(t)
+                if ids is None:
+                    ids = self._delta[t] = set()
+                    bisect.insort(self._delta_terms, t)
+                ids.add(doc)
+            self._touch()
+
+    def add_many(self, listings: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        n = 0
+        for listing_id, listing in listings:
+            self.add(listing_id, listing)
+            n += 1
+        return n
+
+    def remove(self, listing_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(listing_id)
+            if removed:
+                self._touch()
+            return removed
+
+    def _remove(self, listing_id: str) -> bool:
+        doc = self._doc_of.pop(listing_id, None)
+        if doc is None:
+            return False
+        self._deleted.add(doc)
+        self._docs[doc] = None
+        return True
+
+    def _touch(self):
+        self._dirty += 1
+        # saving rewrites the whole file, so let the delta grow with the index (amortized linear)
+        if self.path and AUTOSAVE_EVERY and self._dirty >= max(AUTOSAVE_EVERY, len(self._doc_of) // 4):
+            try:
+                self.save()
+            except Exception:
+                logger.exception('Keyword index autosave failed')
+
+    # --- queries ---------------------------------------------------------------
+
+    def _term_docs(self, term: str) -> Set[int]:
+        docs = set(self._base.postings(term)) if self._base else set()
+        docs |= self._delta.get(term, set())
+        return docs - self._deleted
+
+    def _prefix_docs(self, prefix: str) -> Set[int]:
+        docs: Set[int] = set()
+        if self._base:
+            for _, ids in self._base.prefix(prefix):
+                docs.update(ids)
+        i = bisect.bisect_left(self._delta_terms, prefix)
+        while i < len(self._delta_terms) and self._delta_terms[i].startswith(prefix):
+            docs |= self._delta[self._delta_terms[i]]
+            i += 1
+        return docs - self._deleted
+
+    def _atom_docs(self, atom: str) -> Optional[Set[int]]:
+        field = ''
+        if atom.startswith('kw:'):
+            field, atom = 'kw:', atom[3:]
+        if atom.endswith('*'):
+            # prefixes are folded but not stemmed, so 'sluchaw*' keeps matching every inflection
+            toks = _WORD_RE.findall(fold(atom[:-1]))
+            return self._prefix_docs(field + toks[0]) if toks else None
+        toks = tokenize(atom)
+        if not toks:
+            return None
+        docs = self._term_docs(field + toks[0])
+        for t in toks[1:]:
+            docs &= self._term_docs(field + t)
+        return docs
+
+    def search_docs(self, query: str) -> Set[int]:
+        result: Set[int] = set()
+        with self._lock:
+            for group in re.split(r'\s+OR\s+', query.strip()):
+                include: Optional[Set[int]] = None
+                exclude: Set[int] = set()
+                for phrase, word in re.findall(r'"([^"]+)"|(\S+)', group):
+                    if phrase:
+                        docs = self._term_docs('kwp:' + keyword_key(phrase))
+                        include = docs if include is None else include & docs
+                        continue
+                    negate = word.startswith('-') and len(word) > 1
+                    docs = self._atom_docs(word[1:] if negate else word)
+                    if docs is None:
+                        continue
+                    if negate:
+                        exclude |= docs
+                    else:
+                        include = docs if include is None else include & docs
+                if include:
+                    result |= include - exclude
+        return result
+
+    def search(self, query: str, limit: int = 100) -> Dict[str, Any]:
+        docs = self.search_docs(query)
+        ids = [self._docs[d] for d in sorted(docs)[:limit]]
+        return {'total': len(docs), 'listing_ids': ids}
+
+    def keyword_phrases(self) -> Dict[str, Set[int]]:
+        """Keyword phrase -> live documents targeting it."""
+        with self._lock:
+            out: Dict[str, Set[int]] = {}
+            if self._base:
+                for term, ids in self._base.prefix('kwp:'):
+                    out.setdefault(term[4:], set()).update(ids)
+            i = bisect.bisect_left(self._delta_terms, 'kwp:')
+            while i < len(self._delta_terms) and self._delta_terms[i].startswith('kwp:'):
+                out.setdefault(self._delta_terms[i][4:], set()).update(self._delta[self._delta_terms[i]])
+                i += 1
+            return {k: v - self._deleted for k, v in out.items()}
+
+    def cannibalization(self, min_listings: int = 2, limit: int = 100) -> List[Dict[str, Any]]:
+        """Keyword phrases targeted by `min_listings` or more listings, most contested first."""
+        rows = [(k, v) for k, v in self.keyword_phrases().items() if len(v) >= min_listings]
+        rows.sort(key=lambda kv: -len(kv[1]))
+        return [{'keyword': k, 'listings': len(v), 'listing_ids': [self._docs[d] for d in sorted(v)][:20]} for k, v in rows[:limit]]
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    # --- persistence -----------------------------------------------------------
+
+    def save(self, path: str = None):
+        """Merge base + delta into a compacted file (doc numbers renumbered) and memory-map it."""
+        path = path or self.path
+        if not path:
+            raise ValueError('no path for keyword index')
+        with self._lock:
+            live = sorted(self._doc_of.values())
+            renumber = {old: new for new, old in enumerate(live)}
+            merged: Dict[str, Set[int]] = {}
+            if self._base:
+                for term, ids in self._base.prefix(''):
+                    kept = {renumber[i] for i in ids if i in renumber}
+                    if kept:
+                        merged[term] = kept
+            for term, ids in self._delta.items():
+                kept = {renumber[i] for i in ids if i in renumber}
+                if kept:
+                    merged.setdefault(term, set()).update(kept)
+
+            terms = sorted(merged, key=lambda t: t.encode('utf-8'))
+            blob = bytearray()
+            entries = bytearray()
+            postings = bytearray()
+            for term in terms:
+                tb = term.encode('utf-8')
+                ids = sorted(merged[term])
+                entries += _ENTRY.pack(len(blob), len(tb), len(postings), len(ids))
+                blob += tb
+                postings += _encode_postings(ids)
+            docs = json.dumps([self._docs[i] for i in live], ensure_ascii=False).encode('utf-8')
+            terms_off = _HEADER.size
+            entries_off = terms_off + len(blob)
+            postings_off = entries_off + len(entries)
+            docs_off = postings_off + len(postings)
+
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, len(terms), len(live), terms_off, entries_off, postings_off, docs_off, len(docs)))
+                f.write(blob)
+                f.write(entries)
+                f.write(postings)
+                f.write(docs)
+                f.flush()
+                os.fsync(f.fileno())
+            old = self._base
+            os.replace(tmp, path)
+            self._open(path)
+            if old:
+                old.close()
+            self.path = path
+            self._dirty = 0
+        return {'path': path, 'terms': len(terms), 'docs': len(live), 'bytes': docs_off + len(docs)}
+
+
+_INDEX: Optional[KeywordIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index() -> KeywordIndex:
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = KeywordIndex()
+        return _INDEX
+
+
+def index_listing(listing_id: Any, listing: Dict[str, Any]):
+    """Hook for SEO generators; indexing problems never fail the SEO call."""
+    if not listing_id or not isinstance(listing, dict):
+        return
+    try:
+        get_index().add(str(listing_id), listing)
+    except Exception:
+        logger.exception('Keyword indexing failed for %s', listing_id)
@@ -52,5 +52,55 @@ MODULE_PROMPTS = {
   Wejście (JSON): { client_offer, product, min_price, customer_history, inventory_count, config }
 
   Odpowiedź w JSON: { decision: 'ACCEPT'|'REJECT'|'COUNTER_OFFER', proposed_price: number|null, reason: string, message: string, actions: [] }
-  """
+  """,
+
+  'negocjator_wiadomosc': """{persona}
+
+  Moduł: Auto-Negocjator — wiadomość do kupującego
+  Decyzja cenowa jest już podjęta (decision, proposed_price) i nie wolno jej zmieniać ani podawać innej ceny.
+  Napisz krótką, uprzejmą wiadomość po polsku, która ją komunikuje. Przy kontrofercie użyj jednej techniki perswazji (np. ostatnie sztuki przy niskim stanie magazynowym, podziękowanie stałemu klientowi).
+
+  Odpowiedź w JSON: { message: string }
+  """,
+
+  'seo_autopilot': """{persona}
+Moduł: SEO Autopilot
+Wygeneruj zoptymalizowany tytuł oparty na LSI, strukturę opisu HTML zastosowaniem AIDA, oraz listę słów kluczowych dla produktu podanego w danych wejściowych (JSON).
+Wymagaj formatu JSON: {'title': 'string', 'html_description': 'string', 'keywords': ['kw1','kw2']}""",
+
+  'seo_cloner': """{persona}
+Moduł: SEO Cloner
+Weź opis z pola base_listing i wygeneruj tyle unikalnych wersji, ile wskazuje pole count. Każda wersja ma mieć inny 'kąt' sprzedaży (np. oszczędność, premium, szybkość dostawy), unikalną strukturę zdań i nagłówki. Jeśli podano pole avoid_similar_to, nowe wersje muszą wyraźnie różnić się od wymienionych tytułów (inne słownictwo, inny układ). Zwróć odpowiedź w JSON jako lista obiektów z polami: title, html_description, keywords, angle.""",
+
+  'dispute': """You are an expert Allegro seller assistant. Analyze the dispute and propose a calm, conciliatory reply. Return JSON: { reply_text: string, suggested_resolution: {type: 'refund_partial'|'replace'|'full_refund'|'other', amount: number|null, note: string}, human_required: bool }
+Input JSON: { order_context, dispute_text }""",
+
+  'discussion': """Task: Prioritize and draft a de-escalating reply for an Allegro discussion. Fast response <1h.
+Return JSON: { priority: "high|medium|low", suggested_reply: string, human_required: bool, confidence: number (0-1) }
+Input JSON: { discussion }""",
+
+  'message_analysis': """Analyze the customer message given in the input JSON and return JSON with keys: sentiment ('negative'|'neutral'|'positive'), intent (one of: 'product_question','complaint','shipping_question','price_inquiry','negotiation','other'), urgency (1-10), entities (json), confidence (0-1).""",
+
+  'smart_reply': """You are a customer support assistant. Use empathetic, human tone. Apply Personal Touch.
+Given incoming message (message) and context (context) from the input JSON, produce JSON: {'reply_text': string, 'action': optional_object, 'human_required': bool}""",
+
+  'order_risk': """Task: Analyze order for risk/anomaly.
+Return JSON: { risk: bool, reasons: [str], severity: "low|medium|high", action: "human"|"auto", confidence: number (0-1) }
+Input JSON: { order }""",
+
+  'packing_slip': """Task: Order items for shortest warehouse route.
+Return JSON: { order_id, packing_list: [{sku, qty, location, name}], note }
+Input JSON: { order_id, items }""",
+
+  'carrier': """Select optimal carrier for the package and destination from the available carriers in the input JSON. Return JSON with keys: carrier, cost, lead_time, reason.""",
+
+  'inventory': """Predict stock depletion for product and consider seasonality/external events. Return JSON with predicted_depletion_date, days_to_depletion, risk, rationale.""",
+
+  'delay_notice': """Task: Write short, proactive, apologetic notices (in the buyer's language, default Polish) for delayed or stalled shipments. Include the carrier and reassure the buyer that we are monitoring the parcel.
+Return JSON: { notices: [{ shipment_id, message }] }
+Input JSON: { shipments: [{ shipment_id, order_id, carrier, status, kind }] }""",
+
+  'review_request': """Task: Generate a short, friendly, non-pushy review request tailored to the customer and transaction tone.
+Return JSON: { message: string, send: bool }
+Input JSON: { order_id, order }""",
 }
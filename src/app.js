@@ -40,13 +40,9 @@ async function renderDashboard(){
   orders.forEach(o => {
     const profit = Number(o.intelligence_status.profit) || 0;
     total += profit;
-    // heuristic: if raw_status indicates logistics
+    // dashboard rows are compact (no raw_status): an order with a carrier is ready to ship
     const carrier = (o.intelligence_status.carrier) || '';
-    if((o.raw_status||{}).steps && (o.raw_status.steps.inventory || {}).results){
-      // nothing
-    }
-    // count toShip from raw_status
-    try{ if((o.raw_status.steps || {}).logistics && (o.raw_status.steps.logistics.result || {}).carrier) toShip += 1 }catch(e){}
+    if(carrier) toShip += 1;
 
     items.push(o);
   });
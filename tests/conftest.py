@@ -0,0 +1,4 @@
+import os
+
+# keep test runs from writing the order event log into the working tree
+os.environ.setdefault('ORDER_EVENT_LOG', '0')
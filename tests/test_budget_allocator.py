@@ -0,0 +1,20 @@
+from modules.ads.budget_allocator import allocate_budget
+
+
+def _rows(n):
+    return [{'sku': f'S{i}', 'price': 100, 'margin': 0.3, 'conversion_rate': 0.05, 'cpc': 0.5, 'spend': 0.25} for i in range(n)]
+
+
+def test_identical_skus_share_the_budget_evenly():
+    out = allocate_budget(_rows(40000), 10000)
+    assert len(out['allocation']) == 40000
+    assert set(out['allocation'].values()) == {0.25}
+    assert abs(out['spent'] - 10000) < 0.01
+    assert out['profit_delta'] >= -0.01
+
+
+def test_no_budget_spends_nothing_on_either_side():
+    for budget in (0, -5):
+        out = allocate_budget(_rows(10), budget)
+        assert out['allocation'] == {} and out['spent'] == 0
+        assert out['rule_based']['spent'] == 0 and out['profit_delta'] == 0
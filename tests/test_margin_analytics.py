@@ -0,0 +1,39 @@
+from modules.finance.margin_analytics import MarginAnalytics
+
+
+def _order(revision_total, sku='SKU-1', qty=1):
+    return {'order_id': 'A1', 'created_at': 1760000000, 'total_price': revision_total, 'marketplace_fee_pct': 0.1,
+            'items': [{'sku': sku, 'price': revision_total / qty, 'qty': qty, 'cost': 20}]}
+
+
+def _status(carrier='InPost'):
+    return {'steps': {'logistics': {'result': {'carrier': {'carrier_name': carrier, 'estimated_cost': 15}}}}}
+
+
+def test_new_revision_replaces_previous_lines():
+    analytics = MarginAnalytics()
+    analytics.record(_order(100.0), _status())
+    analytics.record(_order(100.0), _status())
+    analytics.record(_order(120.0, sku='SKU-2', qty=2), _status('DHL'))
+
+    rows = analytics.query('sku', days=None)['rows']
+    assert [(r['key'], r['orders'], r['revenue']) for r in rows] == [('SKU-2', 1, 120.0)]
+    assert [(r['key'], r['orders']) for r in analytics.query('carrier', days=None)['rows']] == [('DHL', 1)]
+    day = analytics.query('day', days=None)['rows']
+    assert [(r['orders'], r['revenue'], r['product_cost']) for r in day] == [(1, 120.0, 40.0)]
+    assert analytics.status()['orders'] == 1 and analytics.status()['revisions'] == 2
+
+    # recompute compacts the dead rows and keeps following the latest revision
+    analytics.recompute(fee_pct=0.2)
+    assert analytics.status()['lines'] == 1
+    analytics.record(_order(50.0), _status())
+    rows = analytics.query('sku', days=None)['rows']
+    assert [(r['key'], r['revenue'], r['fees']) for r in rows] == [('SKU-1', 50.0, 5.0)]
+
+
+def test_sku_profit_matches_finance_margin_without_shipping_cost():
+    analytics = MarginAnalytics()
+    analytics.record(_order(100.0), _status())
+    row = analytics.query('sku', days=None)['rows'][0]
+    # finance step: 100 - 20 cost - 10 fee - 0 shipping (no shipping_cost on the order)
+    assert row['profit'] == 70.0
@@ -0,0 +1,32 @@
+from modules.negotiator.negotiator import negotiate
+from modules.negotiator.sessions import SESSIONS
+
+PRODUCT = {'id': 'P1', 'price': 100, 'cost': 45, 'marketplace_fee_pct': 0.15}
+CFG = {'ai_message': False}
+
+
+def _offer(offer_id, price):
+    return negotiate(offer_id, price, PRODUCT, {}, 10, CFG)
+
+
+def test_counters_never_go_back_up():
+    SESSIONS.drop('neg-1')
+    counters = [_offer('neg-1', p)['proposed_price'] for p in (70, 75, 70)]
+    assert counters[0] > counters[1] >= counters[2]
+
+
+def test_retry_of_last_offer_is_replayed():
+    SESSIONS.drop('neg-2')
+    first = _offer('neg-2', 70)
+    again = _offer('neg-2', 70)
+    assert again['source'] == 'session' and again['proposed_price'] == first['proposed_price']
+
+
+def test_no_counter_above_an_accepted_price():
+    SESSIONS.drop('neg-3')
+    for p in (70, 75):
+        _offer('neg-3', p)
+    accepted = _offer('neg-3', 80)
+    assert accepted['decision'] == 'ACCEPT' and accepted['proposed_price'] == 80
+    after = _offer('neg-3', 70)
+    assert after['decision'] != 'COUNTER_OFFER' or after['proposed_price'] <= 80
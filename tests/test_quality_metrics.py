@@ -0,0 +1,50 @@
+import time
+
+from modules.allegro.quality_metrics import QualityMetrics
+from modules.logistics.shipment_tracker import ShipmentTracker, refresh_delay_notices
+
+
+def test_disputes_and_late_shipments_lower_the_score(monkeypatch):
+    metrics = QualityMetrics()
+    monkeypatch.setattr('modules.allegro.quality_metrics.METRICS', metrics)
+    monkeypatch.setattr('modules.messaging.messaging_engine.generate_delay_notices', lambda shipments, batch_size=50: [])
+    now = time.time()
+    tracker = ShipmentTracker()
+    for i in range(100):
+        tracker.ingest({'shipment_id': f'S{i}', 'status': 'created', 'ts': now - 3 * 86400,
+                        'expected_delivery': now - 86400 if i < 50 else now + 86400})
+    assert metrics.score(now=now)['score'] == 100.0
+
+    refresh_delay_notices(tracker, now=now)
+    for _ in range(50):
+        metrics.record_event({'type': 'dispute_opened', 'ts': now})
+    s = metrics.score(now=now)
+    assert s['components']['shipments'] == 100
+    assert s['components']['late_rate'] == 0.5
+    assert s['score'] == 50.0
+
+
+def test_sla_warnings_keep_breaches_until_answered():
+    metrics = QualityMetrics(sla_s=3600, warn_before_s=900)
+    now = time.time()
+    metrics.record_event({'type': 'buyer_message', 'discussion_id': 'a', 'ts': now - 3600})
+    metrics.record_event({'type': 'buyer_message', 'discussion_id': 'b', 'ts': now - 3000})
+    metrics.record_event({'type': 'buyer_message', 'discussion_id': 'c', 'ts': now})
+    assert [(w['discussion_id'], w['type']) for w in metrics.sla_warnings(now=now)] == [('a', 'sla_breach'), ('b', 'sla_at_risk')]
+    assert [w['discussion_id'] for w in metrics.sla_warnings(now=now)] == ['a', 'b']
+    metrics.record_event({'type': 'seller_reply', 'discussion_id': 'a', 'ts': now})
+    assert [w['discussion_id'] for w in metrics.sla_warnings(now=now)] == ['b']
+
+
+def test_unanswered_discussions_expire_and_are_capped():
+    metrics = QualityMetrics(sla_s=3600, warn_before_s=900, max_age_s=86400, max_pending=3)
+    now = time.time()
+    metrics.record_event({'type': 'buyer_message', 'discussion_id': 'old', 'ts': now - 2 * 86400})
+    metrics.record_event({'type': 'buyer_message', 'discussion_id': None, 'ts': now})
+    assert [w['discussion_id'] for w in metrics.sla_warnings(now=now)] == []
+    for i in range(5):
+        metrics.record_event({'type': 'buyer_message', 'discussion_id': f'd{i}', 'ts': now - 7200 + i})
+    assert [w['discussion_id'] for w in metrics.sla_warnings(now=now)] == ['d2', 'd3', 'd4']
+    for i in range(2, 5):
+        metrics.record_event({'type': 'seller_reply', 'discussion_id': f'd{i}', 'ts': now})
+    assert metrics.sla_warnings(now=now) == [] and metrics.expired == 3